@@ -178,9 +178,7 @@ class AdminService:
         if level < 2:
             raise exceptions.Unauthorized
 
-        property_obj = await self.property_repository.get_or_404(property_id)
-        property_obj.approve()
-        await self.property_repository.commit()
+        await self.property_repository.approve_property(property_id)
         return {
             "detail": "Property approved",
         }
@@ -197,9 +195,7 @@ class AdminService:
         if level < 2:
             raise exceptions.Unauthorized
 
-        property_obj = await self.property_repository.get_or_404(property_id)
-        property_obj.disapprove()
-        await self.property_repository.commit()
+        await self.property_repository.disapprove_property(property_id)
         return {
             "detail": "Property disapproved",
         }
@@ -216,9 +212,7 @@ class AdminService:
         if level < 2:
             raise exceptions.Unauthorized
 
-        property_obj = await self.property_repository.get_or_404(property_id)
-        property_obj.deactivate()
-        await self.property_repository.commit()
+        await self.property_repository.deactivate_property(property_id)
         return {
             "detail": "Property deactivated",
         }
@@ -0,0 +1,101 @@
+"""PropertySearchModel read model for property search
+
+Revision ID: 2c45c32aaaca
+Revises: dd70cc27f06a
+Create Date: 2026-10-18 11:02:17.904518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c45c32aaaca'
+down_revision: Union[str, None] = 'dd70cc27f06a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "PropertySearchModel",
+        sa.Column("property_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("views", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("listing_id", sa.Integer(), nullable=True),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("total_area", sa.Float(), nullable=True),
+        sa.Column("living_area", sa.Float(), nullable=True),
+        sa.Column("rooms", sa.Integer(), nullable=True),
+        sa.Column("bedrooms", sa.Integer(), nullable=True),
+        sa.Column("bathrooms", sa.Integer(), nullable=True),
+        sa.Column("living_rooms", sa.Integer(), nullable=True),
+        sa.Column("floor", sa.Integer(), nullable=True),
+        sa.Column("floors", sa.Integer(), nullable=True),
+        sa.Column("balcony", sa.Integer(), nullable=True),
+        sa.Column("year_built", sa.Integer(), nullable=True),
+        sa.Column("elevators", sa.Boolean(), nullable=True),
+        sa.Column("parking", sa.Boolean(), nullable=True),
+        sa.Column("gym", sa.Boolean(), nullable=True),
+        sa.Column("installment", sa.Boolean(), nullable=True),
+        sa.Column("swimming_pool", sa.Boolean(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("cover_image_url", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("property_id"),
+        sa.ForeignKeyConstraint(["property_id"], ["PropertyModel.id"], ondelete="CASCADE"),
+    )
+    op.create_index(
+        "ix_PropertySearchModel_created_at", "PropertySearchModel",
+        [sa.text("created_at DESC"), sa.text("property_id DESC")],
+        postgresql_include=["price", "category", "bedrooms", "total_area"],
+    )
+    op.create_index(
+        "ix_PropertySearchModel_price", "PropertySearchModel",
+        ["price", "property_id"],
+        postgresql_include=["category", "bedrooms", "total_area"],
+    )
+    op.create_index(
+        "ix_PropertySearchModel_views", "PropertySearchModel",
+        [sa.text("views DESC"), sa.text("property_id DESC")],
+    )
+    op.create_index(
+        "ix_PropertySearchModel_category_bedrooms", "PropertySearchModel",
+        ["category", "bedrooms"],
+    )
+    op.create_index("ix_PropertySearchModel_owner_id", "PropertySearchModel", ["owner_id"])
+
+    # Building flags were created as strings by an earlier migration
+    op.execute("""
+        INSERT INTO "PropertySearchModel" (
+            property_id, created_at, price, views, owner_id, listing_id,
+            category, total_area, living_area, rooms, bedrooms, bathrooms,
+            living_rooms, floor, floors, balcony,
+            year_built, elevators, parking, gym, installment, swimming_pool,
+            address, latitude, longitude, cover_image_url
+        )
+        SELECT
+            p.id, p.created_at, p.price, coalesce(p.views, 0), p.owner_id, p.listing_id,
+            i.category, i.total_area, i.living_area, i.rooms, i.bedrooms, i.bathrooms,
+            i.living_rooms, i.floor, i.floors, i.balcony,
+            b.year_built, b.elevators::text::boolean, b.parking::text::boolean,
+            b.gym::text::boolean, b.installment::text::boolean,
+            b.swimming_pool::text::boolean,
+            l.address, l.latitude, l.longitude,
+            (SELECT image_url FROM "PropertyImageModel"
+             WHERE property_id = p.id ORDER BY id LIMIT 1)
+        FROM "PropertyModel" p
+        LEFT JOIN "PropertyInfoModel" i ON i.property_id = p.id
+        LEFT JOIN "PropertyBuildingModel" b ON b.property_id = p.id
+        LEFT JOIN "PropertyLocationModel" l ON l.property_id = p.id
+        WHERE p.is_active = true AND p.is_sold = false AND p.approved = true
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("PropertySearchModel")
@@ -0,0 +1,48 @@
+"""Spatial grid cell on PropertyLocationModel and PropertySearchModel
+
+Revision ID: 4d8a1f6c9e20
+Revises: b7e2c9a4d315
+Create Date: 2026-10-18 17:42:31.560917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8a1f6c9e20'
+down_revision: Union[str, None] = 'b7e2c9a4d315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Copy of src.property.geo.CELL_SQL at the time of this revision
+CELL_SQL = (
+    "least(floor((latitude + 90) * 100), 17999)::integer * 36000 + "
+    "least(floor((longitude + 180) * 100), 35999)::integer"
+)
+
+
+def upgrade() -> None:
+    op.add_column("PropertyLocationModel", sa.Column(
+        "cell", sa.Integer(), sa.Computed(CELL_SQL, persisted=True),
+    ))
+    op.create_index(
+        "ix_PropertyLocationModel_cell", "PropertyLocationModel", ["cell"])
+
+    op.add_column("PropertySearchModel", sa.Column("cell", sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE "PropertySearchModel" s
+        SET cell = l.cell
+        FROM "PropertyLocationModel" l
+        WHERE l.property_id = s.property_id
+    """)
+    op.create_index("ix_PropertySearchModel_cell", "PropertySearchModel", ["cell"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_PropertySearchModel_cell", "PropertySearchModel")
+    op.drop_column("PropertySearchModel", "cell")
+    op.drop_index("ix_PropertyLocationModel_cell", "PropertyLocationModel")
+    op.drop_column("PropertyLocationModel", "cell")
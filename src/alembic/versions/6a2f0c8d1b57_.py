@@ -0,0 +1,56 @@
+"""Unique likes per user and property, denormalized like counts
+
+Revision ID: 6a2f0c8d1b57
+Revises: 4d8a1f6c9e20
+Create Date: 2026-10-18 20:05:44.207318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2f0c8d1b57'
+down_revision: Union[str, None] = '4d8a1f6c9e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the first of duplicate likes
+    op.execute("""
+        DELETE FROM "PropertyLikeModel" a
+        USING "PropertyLikeModel" b
+        WHERE a.user_id = b.user_id
+          AND a.property_id = b.property_id
+          AND a.id > b.id
+    """)
+    op.drop_index("ix_PropertyLikeModel_user_id_property_id", "PropertyLikeModel")
+    op.create_index(
+        "ix_PropertyLikeModel_user_id_property_id", "PropertyLikeModel",
+        ["user_id", "property_id"], unique=True,
+    )
+
+    op.add_column("PropertyModel", sa.Column(
+        "likes_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute("""
+        UPDATE "PropertyModel" p
+        SET likes_count = l.count
+        FROM (
+            SELECT property_id, count(*) AS count
+            FROM "PropertyLikeModel"
+            GROUP BY property_id
+        ) l
+        WHERE l.property_id = p.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column("PropertyModel", "likes_count")
+    op.drop_index("ix_PropertyLikeModel_user_id_property_id", "PropertyLikeModel")
+    op.create_index(
+        "ix_PropertyLikeModel_user_id_property_id", "PropertyLikeModel",
+        ["user_id", "property_id"],
+    )
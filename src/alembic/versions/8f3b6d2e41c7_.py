@@ -0,0 +1,64 @@
+"""Full-text and trigram search over PropertySearchModel
+
+Revision ID: 8f3b6d2e41c7
+Revises: 2c45c32aaaca
+Create Date: 2026-10-18 13:21:05.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b6d2e41c7'
+down_revision: Union[str, None] = '2c45c32aaaca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column("PropertySearchModel", sa.Column("title", sa.String(), nullable=True))
+    op.add_column("PropertySearchModel", sa.Column("description", sa.String(), nullable=True))
+    op.execute("""
+        UPDATE "PropertySearchModel" s
+        SET title = p.title, description = p.description
+        FROM "PropertyModel" p
+        WHERE p.id = s.property_id
+    """)
+    op.add_column("PropertySearchModel", sa.Column(
+        "document", postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(address, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+    ))
+
+    op.create_index(
+        "ix_PropertySearchModel_document", "PropertySearchModel", ["document"],
+        postgresql_using="gin",
+    )
+    # Serve `ILIKE '%city%'` and fuzzy `<%` matches from an index
+    op.create_index(
+        "ix_PropertySearchModel_address_trgm", "PropertySearchModel", ["address"],
+        postgresql_using="gin", postgresql_ops={"address": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_PropertySearchModel_title_trgm", "PropertySearchModel", ["title"],
+        postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_PropertySearchModel_title_trgm", "PropertySearchModel")
+    op.drop_index("ix_PropertySearchModel_address_trgm", "PropertySearchModel")
+    op.drop_index("ix_PropertySearchModel_document", "PropertySearchModel")
+    op.drop_column("PropertySearchModel", "document")
+    op.drop_column("PropertySearchModel", "description")
+    op.drop_column("PropertySearchModel", "title")
@@ -0,0 +1,143 @@
+"""City dimension with folded aliases, city id on properties
+
+Revision ID: b7e2c9a4d315
+Revises: 8f3b6d2e41c7
+Create Date: 2026-10-18 14:05:52.630417
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c9a4d315'
+down_revision: Union[str, None] = '8f3b6d2e41c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, is area, aliases) in sidebar order
+CITIES = [
+    ("Lefkoşa", True, ["Nicosia", "Lefkosia"]),
+    ("Girne", True, ["Kyrenia", "Keryneia"]),
+    ("Gazimağusa", True, ["Famagusta", "Mağusa", "Ammochostos"]),
+    ("Güzelyurt", True, ["Morphou", "Morfou"]),
+    ("İskele", True, ["Trikomo"]),
+    ("Lefke", True, ["Lefka"]),
+    ("Lapta", False, ["Lapithos"]),
+    ("Koruçam", False, ["Kormakitis"]),
+    ("Alsancak", False, ["Karavas"]),
+    ("Değirmenlik", False, ["Kythrea"]),
+    ("Esentepe", False, ["Agios Amvrosios"]),
+    ("Dikmen", False, ["Dikomo"]),
+    ("Mehmetçik", False, ["Galateia"]),
+    ("Karpaz", False, ["Karpas"]),
+    ("Dipkarpaz", False, ["Rizokarpaso"]),
+    ("Yeni Erenköy", False, ["Yialousa", "Agialousa"]),
+    ("Geçitkale", False, ["Lefkoniko"]),
+    ("Beşparmak", False, ["Pentadaktylos"]),
+]
+
+TURKISH_I = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+
+def fold_name(text: str) -> str:
+    """Copy of `src.property.utils.fold_name` as of this revision"""
+    text = unicodedata.normalize("NFKD", text.translate(TURKISH_I))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+
+def find_city_key(address: str, keys: list[str]) -> str | None:
+    """Copy of `src.property.utils.find_city_key` as of this revision"""
+    folded = f" {fold_name(address)} "
+    found = None
+    for key in keys:
+        position = folded.find(f" {key} ")
+        if position < 0:
+            continue
+        if found is None or (position, -len(key)) < (found[0], -len(found[1])):
+            found = (position, key)
+    return found[1] if found else None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "CityModel",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("is_area", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("position", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("key"),
+    )
+    op.create_table(
+        "CityAliasModel",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("city_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["city_id"], ["CityModel.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("key"),
+    )
+    op.create_index("ix_CityAliasModel_city_id", "CityAliasModel", ["city_id"])
+
+    op.add_column("PropertyModel", sa.Column("city_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "PropertyModel_city_id_fkey", "PropertyModel", "CityModel", ["city_id"], ["id"])
+    op.create_index("ix_PropertyModel_city_id", "PropertyModel", ["city_id"])
+    op.add_column("PropertySearchModel", sa.Column("city_id", sa.Integer(), nullable=True))
+    op.create_index("ix_PropertySearchModel_city_id", "PropertySearchModel", ["city_id"])
+
+    conn = op.get_bind()
+    aliases = {}
+    for position, (name, is_area, names) in enumerate(CITIES):
+        city_id = conn.execute(
+            sa.text(
+                'INSERT INTO "CityModel" (name, key, is_area, position) '
+                "VALUES (:name, :key, :is_area, :position) RETURNING id"
+            ),
+            {"name": name, "key": fold_name(name), "is_area": is_area, "position": position},
+        ).scalar()
+        for alias in {fold_name(alias) for alias in [name, *names]}:
+            aliases[alias] = city_id
+    conn.execute(
+        sa.text('INSERT INTO "CityAliasModel" (key, city_id) VALUES (:key, :city_id)'),
+        [{"key": key, "city_id": city_id} for key, city_id in aliases.items()],
+    )
+
+    # Resolve the city of every property from its address
+    keys = list(aliases)
+    resolved = []
+    for property_id, address in conn.execute(sa.text(
+            'SELECT property_id, address FROM "PropertyLocationModel" '
+            "WHERE address IS NOT NULL")):
+        key = find_city_key(address, keys)
+        if key is not None:
+            resolved.append({"id": property_id, "city_id": aliases[key]})
+    if resolved:
+        conn.execute(
+            sa.text('UPDATE "PropertyModel" SET city_id = :city_id WHERE id = :id'),
+            resolved,
+        )
+    op.execute("""
+        UPDATE "PropertySearchModel" s
+        SET city_id = p.city_id
+        FROM "PropertyModel" p
+        WHERE p.id = s.property_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_PropertySearchModel_city_id", "PropertySearchModel")
+    op.drop_column("PropertySearchModel", "city_id")
+    op.drop_index("ix_PropertyModel_city_id", "PropertyModel")
+    op.drop_constraint("PropertyModel_city_id_fkey", "PropertyModel", type_="foreignkey")
+    op.drop_column("PropertyModel", "city_id")
+    op.drop_index("ix_CityAliasModel_city_id", "CityAliasModel")
+    op.drop_table("CityAliasModel")
+    op.drop_table("CityModel")
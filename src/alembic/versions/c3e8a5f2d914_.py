@@ -0,0 +1,90 @@
+"""updated_at on properties, listings, agents and their children, kept by triggers
+
+Revision ID: c3e8a5f2d914
+Revises: 6a2f0c8d1b57
+Create Date: 2026-10-18 23:12:37.584120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a5f2d914'
+down_revision: Union[str, None] = '6a2f0c8d1b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPDATED_TABLES = (
+    "PropertyModel", "PropertyImageModel", "PropertyLocationModel",
+    "PropertyInfoModel", "PropertyBuildingModel", "PropertyDocumentModel",
+    "ListingModel", "ListingImageModel", "AgentModel",
+)
+# Child table -> (parent table, child column, parent column it references).
+# A change of a child row touches its parent, so the parent's `updated_at`
+# versions everything served with it.
+TOUCHED_PARENTS = {
+    "PropertyImageModel": ("PropertyModel", "property_id", "id"),
+    "PropertyLocationModel": ("PropertyModel", "property_id", "id"),
+    "PropertyInfoModel": ("PropertyModel", "property_id", "id"),
+    "PropertyBuildingModel": ("PropertyModel", "property_id", "id"),
+    "PropertyDocumentModel": ("PropertyModel", "property_id", "id"),
+    "ListingImageModel": ("ListingModel", "listing_id", "id"),
+    "UserModel": ("AgentModel", "id", "user_id"),
+    "UserImageModel": ("AgentModel", "user_id", "user_id"),
+    "ReviewModel": ("AgentModel", "agent_id", "id"),
+}
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := clock_timestamp();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION touch_parent() RETURNS trigger AS $$
+        DECLARE
+            keys integer[];
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                keys := keys || (to_jsonb(OLD) ->> TG_ARGV[1])::integer;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                keys := keys || (to_jsonb(NEW) ->> TG_ARGV[1])::integer;
+            END IF;
+            EXECUTE format(
+                'UPDATE %I SET updated_at = clock_timestamp() WHERE %I = ANY($1)',
+                TG_ARGV[0], TG_ARGV[2]
+            ) USING keys;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in UPDATED_TABLES:
+        op.add_column(table, sa.Column(
+            "updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+        op.execute(f"""
+            CREATE TRIGGER set_updated_at BEFORE UPDATE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+        """)
+    for table, (parent, column, parent_column) in TOUCHED_PARENTS.items():
+        op.execute(f"""
+            CREATE TRIGGER touch_parent AFTER INSERT OR UPDATE OR DELETE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION touch_parent('{parent}', '{column}', '{parent_column}')
+        """)
+
+
+def downgrade() -> None:
+    for table in TOUCHED_PARENTS:
+        op.execute(f'DROP TRIGGER touch_parent ON "{table}"')
+    for table in UPDATED_TABLES:
+        op.execute(f'DROP TRIGGER set_updated_at ON "{table}"')
+        op.drop_column(table, "updated_at")
+    op.execute("DROP FUNCTION touch_parent()")
+    op.execute("DROP FUNCTION set_updated_at()")
@@ -0,0 +1,91 @@
+"""Indexes for property search, pages and child table foreign keys
+
+Revision ID: dd70cc27f06a
+Revises: 45b09f1f44fd
+Create Date: 2026-10-18 10:12:41.532107
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dd70cc27f06a'
+down_revision: Union[str, None] = '45b09f1f44fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows visible in search, popular and agent pages
+VISIBLE = sa.text("is_active = true AND is_sold = false AND approved = true")
+
+
+def upgrade() -> None:
+    # Search / popular sort orders over visible properties
+    op.create_index(
+        "ix_PropertyModel_visible_created_at", "PropertyModel",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_where=VISIBLE,
+    )
+    op.create_index(
+        "ix_PropertyModel_visible_price", "PropertyModel",
+        ["price", "id"],
+        postgresql_where=VISIBLE,
+    )
+    op.create_index(
+        "ix_PropertyModel_visible_views", "PropertyModel",
+        [sa.text("views DESC"), sa.text("id DESC")],
+        postgresql_where=VISIBLE,
+    )
+    # Agent pages and admin pages filtered by owner
+    op.create_index(
+        "ix_PropertyModel_owner_id_created_at", "PropertyModel",
+        ["owner_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_PropertyModel_listing_id", "PropertyModel", ["listing_id"])
+
+    # One-to-one / one-to-many children of PropertyModel
+    op.create_index("ix_PropertyInfoModel_property_id", "PropertyInfoModel", ["property_id"])
+    op.create_index("ix_PropertyLocationModel_property_id", "PropertyLocationModel", ["property_id"])
+    op.create_index("ix_PropertyBuildingModel_property_id", "PropertyBuildingModel", ["property_id"])
+    op.create_index("ix_PropertyImageModel_property_id", "PropertyImageModel", ["property_id", "id"])
+    op.create_index("ix_PropertyDocumentModel_property_id", "PropertyDocumentModel", ["property_id"])
+
+    # Likes: lookups by (user, property), favorites pages, likes of a property
+    op.create_index(
+        "ix_PropertyLikeModel_user_id_property_id", "PropertyLikeModel",
+        ["user_id", "property_id"],
+    )
+    op.create_index(
+        "ix_PropertyLikeModel_user_id_created_at", "PropertyLikeModel",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_PropertyLikeModel_property_id", "PropertyLikeModel", ["property_id"])
+
+    # Listings by agent and name, listing images
+    op.create_index("ix_ListingModel_agent_id_name", "ListingModel", ["agent_id", "name"])
+    op.create_index("ix_ListingImageModel_listing_id", "ListingImageModel", ["listing_id"])
+
+    # Agents are looked up by user on every authenticated agent action.
+    # UserModel.email needs no index here: its unique constraint has one.
+    op.create_index("ix_AgentModel_user_id", "AgentModel", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_AgentModel_user_id", "AgentModel")
+    op.drop_index("ix_ListingImageModel_listing_id", "ListingImageModel")
+    op.drop_index("ix_ListingModel_agent_id_name", "ListingModel")
+    op.drop_index("ix_PropertyLikeModel_property_id", "PropertyLikeModel")
+    op.drop_index("ix_PropertyLikeModel_user_id_created_at", "PropertyLikeModel")
+    op.drop_index("ix_PropertyLikeModel_user_id_property_id", "PropertyLikeModel")
+    op.drop_index("ix_PropertyDocumentModel_property_id", "PropertyDocumentModel")
+    op.drop_index("ix_PropertyImageModel_property_id", "PropertyImageModel")
+    op.drop_index("ix_PropertyBuildingModel_property_id", "PropertyBuildingModel")
+    op.drop_index("ix_PropertyLocationModel_property_id", "PropertyLocationModel")
+    op.drop_index("ix_PropertyInfoModel_property_id", "PropertyInfoModel")
+    op.drop_index("ix_PropertyModel_listing_id", "PropertyModel")
+    op.drop_index("ix_PropertyModel_owner_id_created_at", "PropertyModel")
+    op.drop_index("ix_PropertyModel_visible_views", "PropertyModel")
+    op.drop_index("ix_PropertyModel_visible_price", "PropertyModel")
+    op.drop_index("ix_PropertyModel_visible_created_at", "PropertyModel")
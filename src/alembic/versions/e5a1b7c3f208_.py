@@ -0,0 +1,32 @@
+"""Applied view batches, so a retried view flush is applied once
+
+Revision ID: e5a1b7c3f208
+Revises: c3e8a5f2d914
+Create Date: 2026-10-19 10:24:51.903417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1b7c3f208'
+down_revision: Union[str, None] = 'c3e8a5f2d914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ViewBatchModel",
+        sa.Column("batch_id", sa.String(), primary_key=True),
+        sa.Column("applied_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_ViewBatchModel_applied_at", "ViewBatchModel", ["applied_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ViewBatchModel_applied_at", "ViewBatchModel")
+    op.drop_table("ViewBatchModel")
@@ -0,0 +1,54 @@
+"""Area of each city, so a search for an area includes its cities
+
+Revision ID: f2c6d8a9b413
+Revises: e5a1b7c3f208
+Create Date: 2026-10-19 16:12:37.281905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6d8a9b413'
+down_revision: Union[str, None] = 'e5a1b7c3f208'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Folded city key and the folded key of the area it lies in
+AREAS = {
+    "lapta": "girne",
+    "korucam": "girne",
+    "alsancak": "girne",
+    "esentepe": "girne",
+    "dikmen": "girne",
+    "besparmak": "girne",
+    "degirmenlik": "lefkosa",
+    "gecitkale": "gazimagusa",
+    "mehmetcik": "iskele",
+    "karpaz": "iskele",
+    "dipkarpaz": "iskele",
+    "yeni erenkoy": "iskele",
+}
+
+
+def upgrade() -> None:
+    op.add_column("CityModel", sa.Column("area_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "CityModel_area_id_fkey", "CityModel", "CityModel", ["area_id"], ["id"])
+    op.create_index("ix_CityModel_area_id", "CityModel", ["area_id"])
+    op.get_bind().execute(
+        sa.text(
+            'UPDATE "CityModel" c SET area_id = a.id FROM "CityModel" a '
+            "WHERE c.key = :key AND a.key = :area"
+        ),
+        [{"key": key, "area": area} for key, area in AREAS.items()],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_CityModel_area_id", "CityModel")
+    op.drop_constraint("CityModel_area_id_fkey", "CityModel", type_="foreignkey")
+    op.drop_column("CityModel", "area_id")
@@ -0,0 +1,47 @@
+"""Module with in-process caches"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class TTLCache(Generic[V]):
+    """
+    Per-process cache whose entries expire `ttl` seconds after being set.
+    Holds at most `maxsize` entries, evicting the least recently used.
+    """
+
+    ttl: float
+    maxsize: int = 1024
+    _entries: OrderedDict[Hashable, tuple[float, V]] = field(
+        default_factory=OrderedDict, repr=False)
+
+    def get(self, key: Hashable) -> V | None:
+        """Returns the cached value, None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Caches the value"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Drops the entry, if any"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops every entry"""
+        self._entries.clear()
@@ -0,0 +1,28 @@
+"""Module with EXPLAIN statement construct."""
+import json
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement, executable on a session."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) {compiler.process(element.statement, **kw)}"
+
+
+def get_plan(value: str | list) -> dict:
+    """Returns the top plan node of an `EXPLAIN (FORMAT JSON)` result."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value[0]["Plan"]
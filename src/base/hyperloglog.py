@@ -0,0 +1,52 @@
+"""Module with an in-process HyperLogLog sketch"""
+import hashlib
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class HyperLogLog:
+    """
+    Cardinality sketch of `2 ** precision` one byte registers, with the
+    standard error of `1.04 / sqrt(2 ** precision)`. Counts the same way
+    as Redis PFADD/PFCOUNT, but is not byte compatible with it.
+    """
+
+    precision: int = 14
+    registers: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add(self, item: str) -> bool:
+        """Adds the item, returns whether the estimate may have changed"""
+        digest = hashlib.blake2b(item.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        index = value & ((1 << self.precision) - 1)
+        rest = value >> self.precision
+        # Position of the lowest set bit of the remaining 64 - p bits
+        rank = (rest & -rest).bit_length() if rest else 64 - self.precision + 1
+        if rank <= self.registers[index]:
+            return False
+        self.registers[index] = rank
+        return True
+
+    def count(self) -> int:
+        """Estimated number of distinct items added"""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while few registers are set
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def merge(self, *others: "HyperLogLog") -> None:
+        """Adds the items of the other sketches, of the same precision"""
+        for other in others:
+            if other.precision != self.precision:
+                raise ValueError("Cannot merge sketches of different precision")
+            np.maximum(self.registers, other.registers, out=self.registers)
@@ -37,6 +37,21 @@ class CreateTimestampMixin(CustomBase):
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
+class UpdateTimestampMixin(CustomBase):
+    """
+    Mixin for adding updated at field to the model.
+
+    Set by database triggers on every update, which also touch the
+    parent row when a child row changes. See the `updated_at` migration.
+    """
+
+    __abstract__ = True
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now()
+    )
+
+
 class ImageMixin(CustomBase):
     """Mixin for adding image to the model"""
 
@@ -0,0 +1,54 @@
+"""Module with response classes"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Sequence
+
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+
+class ModelJSONResponse(Response):
+    """
+    JSON response serialized by pydantic-core, for content made of
+    Pydantic models, dicts and lists. Routes return it directly, so
+    FastAPI skips walking the content with `jsonable_encoder`.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def version_headers(versions: Sequence[Sequence], *variant: Any) -> dict[str, str]:
+    """
+    Validator headers of a response built from the records of `versions`,
+    rows of ids and `updated_at` times. The entity tag covers the versions
+    in order and the `variant`, everything else the body depends on.
+    """
+    message = to_json([[list(version) for version in versions], variant])
+    headers = {
+        "ETag": '"' + hashlib.blake2b(message, digest_size=12).hexdigest() + '"',
+        "Cache-Control": "no-cache",
+    }
+    times = [value for version in versions for value in version
+             if isinstance(value, datetime)]
+    if times:
+        # `updated_at` columns hold UTC without a zone
+        headers["Last-Modified"] = format_datetime(
+            max(times).replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Whether `If-None-Match` lists the entity tag, by weak comparison"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """Empty 304 response carrying the validator headers"""
+    return Response(status_code=304, headers=headers)
@@ -1,11 +1,16 @@
 import os
 
 from celery import Celery
+from redis import Redis
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from src.config import Settings
 from src.celery.db_celery import get_sync_db_session
+from src.property import trending, views
+from src.property.columnar import ColumnarIndex
 from src.staticfiles.dependencies import get_static_files_manager
-from src.property.models import Property, PropertyImage
+from src.property.models import Property, PropertyImage, PropertySearch
 from src.user.models import User, Agent
 from src.listing.models import Listing, ListingImage
 
@@ -16,6 +21,22 @@ redis_url = os.getenv('REDIS_URL', 'redis://redis:6379/0')
 # Initialize the Celery app with the Redis URL
 celery_app = Celery('tasks', broker=redis_url)
 
+celery_app.conf.beat_schedule = {
+    "flush-property-views": {
+        "task": "src.celery.tasks.flush_property_views",
+        "schedule": Settings.VIEWS_FLUSH_SECONDS,
+    },
+    "refresh-trending": {
+        "task": "src.celery.tasks.refresh_trending",
+        "schedule": Settings.TRENDING_REFRESH_SECONDS,
+    },
+}
+if Settings.SEARCH_BACKEND == "columnar":
+    celery_app.conf.beat_schedule["rebuild-search-snapshot"] = {
+        "task": "src.celery.tasks.rebuild_search_snapshot",
+        "schedule": Settings.SEARCH_SNAPSHOT_INTERVAL_SECONDS,
+    }
+
 @celery_app.task
 def queue_delete_property(id: int):
     db: Session = get_sync_db_session()
@@ -47,3 +68,68 @@ def queue_delete_listing(id: int):
     db.delete(listing)
     db.commit()
     db.close()
+
+@celery_app.task
+def rebuild_search_snapshot():
+    """Publishes a fresh columnar search index snapshot for the web workers"""
+    db: Session = get_sync_db_session()
+    try:
+        index = ColumnarIndex.load_sync(db)
+    finally:
+        db.close()
+    version = index.save_snapshot(Settings.SEARCH_SNAPSHOT_DIR)
+    print(f"Published search snapshot {version} with {len(index)} properties")
+
+@celery_app.task
+def flush_property_views():
+    """
+    Applies the property views buffered in Redis to the database. The
+    batch id is recorded in the same transaction, so a batch taken again
+    by an overlapping flush, or after a flush stopped between its commit
+    and the release, is not applied twice.
+    """
+    redis = Redis.from_url(redis_url)
+    batch_id, counts = views.take_pending(redis)
+    if batch_id is None:
+        return
+    db: Session = get_sync_db_session()
+    try:
+        applied = db.execute(views.record_batch_stmt(batch_id)).first() is not None
+        if applied:
+            ids = sorted(counts)
+            for start in range(0, len(ids), Settings.VIEWS_FLUSH_BATCH):
+                batch = {id: counts[id] for id in ids[start:start + Settings.VIEWS_FLUSH_BATCH]}
+                for stmt in views.add_views_stmts(batch):
+                    db.execute(stmt)
+            db.execute(views.prune_batches_stmt())
+        db.commit()
+    finally:
+        db.close()
+    views.release_pending(redis, batch_id)
+    if applied:
+        print(f"Applied {sum(counts.values())} views of {len(counts)} properties")
+
+@celery_app.task
+def refresh_trending():
+    """
+    Rescales the trending leaderboard, scores new listings, drops hidden
+    properties and rebuilds the per-city leaderboards
+    """
+    redis = Redis.from_url(redis_url)
+    db: Session = get_sync_db_session()
+    try:
+        trending.seed_listings(redis, db.execute(
+            select(PropertySearch.property_id, PropertySearch.created_at)
+            .where(PropertySearch.created_at > trending.seeded_since(redis))
+            .order_by(PropertySearch.created_at)
+        ).all())
+        size = trending.rescale(redis)
+        scores = trending.get_scores(redis)
+        cities = dict(db.execute(
+            select(PropertySearch.property_id, PropertySearch.city_id)
+            .where(PropertySearch.property_id.in_(list(scores)))
+        ).all())
+    finally:
+        db.close()
+    trending.rebuild_cities(redis, scores, cities)
+    print(f"Trending leaderboard has {len(cities)} of {size} properties visible")
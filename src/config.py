@@ -12,6 +12,29 @@ class Settings:
     BACKEND_URL = os.getenv("BACKEND_URL")
     DEBUG = os.getenv("DEBUG", "false") == "true"
     MAX_IMAGES_PER_PROPERTY = 50
+    CARD_IMAGES_LIMIT = 5
+    # Fetch page rows and total count in one query (count(*) OVER ())
+    COMBINED_PAGE_COUNT = os.getenv("COMBINED_PAGE_COUNT", "true") == "true"
+    # Report planner estimates instead of exact counts above the threshold
+    APPROXIMATE_COUNT = os.getenv("APPROXIMATE_COUNT", "false") == "true"
+    APPROXIMATE_COUNT_THRESHOLD = int(os.getenv("APPROXIMATE_COUNT_THRESHOLD", "10000"))
+    # "sql" or "columnar" (in-memory NumPy index of the search read model)
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "sql")
+    # Versioned snapshots of the columnar index, mapped by every worker
+    SEARCH_SNAPSHOT_DIR = os.getenv("SEARCH_SNAPSHOT_DIR", "/tmp/search-index")
+    SEARCH_SNAPSHOT_POLL_SECONDS = 5
+    FACETS_CACHE_SECONDS = int(os.getenv("FACETS_CACHE_SECONDS", "60"))
+    # Map clusters per tile, individual pins from MAP_POINTS_ZOOM on
+    MAP_POINTS_ZOOM = 15
+    MAP_MAX_ZOOM = 20
+    MAP_MAX_TILES = 256
+    MAP_CACHE_SECONDS = int(os.getenv("MAP_CACHE_SECONDS", "30"))
+    # Nearest property search grows its radius from NEARBY_START_RADIUS_KM
+    NEARBY_START_RADIUS_KM = 1.0
+    NEARBY_MAX_RADIUS_KM = 50.0
+    NEARBY_MAX_RESULTS = 100
+    POLYGON_MAX_VERTICES = 500
+    SEARCH_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("SEARCH_SNAPSHOT_INTERVAL_SECONDS", "60"))
 
     # Auth
     SECRET_KEY = os.getenv("SECRET_KEY")
@@ -32,6 +55,23 @@ class Settings:
 
     # Redis
     REDIS_URL = os.getenv("REDIS_URL")
+    # Buffered property views are applied every VIEWS_FLUSH_SECONDS
+    VIEWS_FLUSH_SECONDS = int(os.getenv("VIEWS_FLUSH_SECONDS", "10"))
+    VIEWS_FLUSH_BATCH = 1000
+    # Daily unique view sketches are kept UNIQUE_VIEWS_DAYS days
+    UNIQUE_VIEWS_DAYS = 30
+    # 1 KiB per in-process sketch, about 3% error
+    LOCAL_SKETCH_PRECISION = 10
+    # Trending scores halve every TRENDING_HALF_LIFE_HOURS
+    TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "48"))
+    TRENDING_REFRESH_SECONDS = int(os.getenv("TRENDING_REFRESH_SECONDS", "300"))
+    TRENDING_MIN_SCORE = 0.01
+    TRENDING_MAX_SIZE = 10000
+    # Cached sets of the properties each user liked, dropped on like changes
+    LIKED_CACHE_SECONDS = 3600
+    # Other workers never see an in-process invalidation, keep it short
+    LIKED_LOCAL_CACHE_SECONDS = 30
+    LIKED_LOCAL_CACHE_SIZE = 10000
 
     # Google OAuth
     GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -1,16 +1,16 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Integer, String, Boolean, Float
+from sqlalchemy import ForeignKey, Index, Integer, String, Boolean, Float
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.base.models import CustomBase, ImageMixin
+from src.base.models import ImageMixin, UpdateTimestampMixin
 
 if TYPE_CHECKING:
     from src.user.models import Agent
     from src.property.models import Property
 
 
-class Listing(CustomBase):
+class Listing(UpdateTimestampMixin):
     """Listing model."""
 
     __tablename__ = "ListingModel"
@@ -53,14 +53,16 @@ class Listing(CustomBase):
         self.is_active = False
 
 
-class ListingImage(ImageMixin):
+class ListingImage(ImageMixin, UpdateTimestampMixin):
     """Listing image model."""
 
     __tablename__ = "ListingImageModel"
 
     listing_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("ListingModel.id"), nullable=False
+        Integer, ForeignKey("ListingModel.id"), nullable=False, index=True
     )
 
     listing: Mapped["Listing"] = relationship("Listing", back_populates="images")
 
+
+Index("ix_ListingModel_agent_id_name", Listing.agent_id, Listing.name)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Query
+from fastapi import APIRouter, Depends, UploadFile, File, Query, Header
+from typing import Optional
 
 from src.property.service import PropertyService
 from src.property.dependencies import get_property_service
-from src.auth.dependencies import get_current_user
+from src.auth.dependencies import get_current_user, get_current_user_optional
 from src.auth.schemas import TokenData
 from src.listing.schemas import CreateListingSchema
 from src.property.service import PropertyService
@@ -19,10 +20,13 @@ router = APIRouter(
 async def get_listings_page(
     page: int = Query(1),
     elements: int = Query(10),
-    property_service: PropertyService = Depends(get_property_service)
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    property_service: PropertyService = Depends(get_property_service),
+    current_user: Optional[TokenData] = Depends(get_current_user_optional),
     ):
     return await property_service.get_listings_page(
-        page, elements)
+        page, elements, current_user, fields, if_none_match)
 
 @router.get("/me")
 async def get_user_listings(
@@ -34,9 +38,10 @@ async def get_user_listings(
 @router.get("/record/{id}")
 async def get_listing_by_id(
     id: int,
+    if_none_match: Optional[str] = Header(None),
     property_service: PropertyService = Depends(get_property_service)
     ):
-    return await property_service.get_listing_by_id(id)
+    return await property_service.get_listing_by_id(id, if_none_match)
 
 @router.post("/")
 async def create_listing(
@@ -1,8 +1,10 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, InstanceOf
 
 from src.base.schemas import as_form
+from src.property.schemas import PropertyCard, SparseProperty
+from src.user.schemas import AgentCard
 
 @as_form
 class CreateListingSchema(BaseModel):
@@ -25,3 +27,25 @@ class CreateListingSchema(BaseModel):
     parkingSlot: Optional[bool] = None
     installment: Optional[bool] = None
     swimmingPool: Optional[bool] = None
+
+
+class ListingCard(BaseModel):
+    """Listing as shown on result pages, see `src.property.cards`"""
+
+    id: int
+    name: str
+    category: str
+    description: Optional[str] = None
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    building_area: Optional[float] = None
+    living_area: Optional[float] = None
+    objects: Optional[int] = None
+    year: Optional[int] = None
+    building_floors: Optional[int] = None
+    agent: Optional[AgentCard] = None
+    images: list[str] = []
+    # Properties of a `fields=` request are kept as `SparseProperty` dicts,
+    # `is_liked` is set on them after the card is built
+    properties: list[InstanceOf[SparseProperty] | PropertyCard] = []
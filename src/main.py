@@ -2,6 +2,7 @@ import logging
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 
 from src.auth.routes import router as auth_router
@@ -10,6 +11,8 @@ from src.property.routes import router as property_router
 from src.listing.routes import router as listing_router
 from src.admin.routes import router as admin_router
 from src.db import initialize_database, close_database
+from src.redis_client import initialize_redis, close_redis
+from src.property.columnar import initialize_search_index
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -22,9 +25,12 @@ app = FastAPI(
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await initialize_database()
+    await initialize_redis()
+    await initialize_search_index()
     try:
         yield
     finally:
+        await close_redis()
         await close_database()
 
 app.router.lifespan_context = lifespan
@@ -40,6 +46,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(property_router)
@@ -0,0 +1,324 @@
+"""
+Module with the row projections result pages are built from.
+
+Cards are selected as flat Core rows, one row per property or listing
+joined with its one-to-one children, and images as `(parent id, url)`
+rows, so no ORM object graph is loaded or walked when serializing.
+
+Every property field has a dotted path, its key in the serialized
+property. A `fields=` request selects only the columns of the requested
+paths and joins only the relationships those columns live on.
+"""
+from collections import defaultdict
+from typing import Any, Iterable, Mapping, Sequence
+
+from sqlalchemy import ColumnElement, Row, Select, func, select
+from sqlalchemy.orm import InstrumentedAttribute
+
+from src.base.models import ImageMixin
+from src.listing.models import Listing, ListingImage
+from src.listing.schemas import ListingCard
+from src.property import exceptions
+from src.property.models import (Property, PropertyBuilding, PropertyDocument,
+                                 PropertyImage, PropertyInfo, PropertyLocation,
+                                 VISIBLE_PROPERTY)
+from src.property.schemas import PropertyCard, PropertyDetail, SparseProperty
+from src.user.models import Agent, User, UserProfileImage
+
+# Relationships joined to select a field, in join order
+LOCATION = (Property.location,)
+INFO = (Property.info,)
+BUILDING = (Property.building,)
+AGENT = (Property.owner,)
+OWNER = (Property.owner, Agent.user)
+
+# Field path -> (column, relationships joined to select it)
+PROPERTY_FIELDS: dict[str, tuple[ColumnElement, tuple]] = {
+    "id": (Property.id, ()),
+    "title": (Property.title, ()),
+    "price": (Property.price, ()),
+    "currency": (Property.currency, ()),
+    "original_price": (Property.original_price, ()),
+    "views": (Property.views, ()),
+    "likes_count": (Property.likes_count, ()),
+    "created_at": (Property.created_at, ()),
+    "owner_id": (Property.owner_id, ()),
+    "listing_id": (Property.listing_id, ()),
+    "city_id": (Property.city_id, ()),
+    "description": (Property.description, ()),
+    "approved": (Property.approved, ()),
+    "is_active": (Property.is_active, ()),
+    "is_sold": (Property.is_sold, ()),
+    "cover_image": (
+        select(PropertyImage.image_url)
+        .where(PropertyImage.property_id == Property.id)
+        .order_by(PropertyImage.id)
+        .limit(1)
+        .scalar_subquery(),
+        (),
+    ),
+    "location.address": (PropertyLocation.address, LOCATION),
+    "location.latitude": (PropertyLocation.latitude, LOCATION),
+    "location.longitude": (PropertyLocation.longitude, LOCATION),
+    "info.category": (PropertyInfo.category, INFO),
+    "info.rooms": (PropertyInfo.rooms, INFO),
+    "info.bedrooms": (PropertyInfo.bedrooms, INFO),
+    "info.bathrooms": (PropertyInfo.bathrooms, INFO),
+    "info.total_area": (PropertyInfo.total_area, INFO),
+    "info.floor": (PropertyInfo.floor, INFO),
+    "info.floors": (PropertyInfo.floors, INFO),
+    "info.renovation": (PropertyInfo.renovation, INFO),
+    "info.living_area": (PropertyInfo.living_area, INFO),
+    "info.living_rooms": (PropertyInfo.living_rooms, INFO),
+    "info.balcony": (PropertyInfo.balcony, INFO),
+    "info.apartment_stories": (PropertyInfo.apartment_stories, INFO),
+    "building.year_built": (PropertyBuilding.year_built, BUILDING),
+    "building.elevators": (PropertyBuilding.elevators, BUILDING),
+    "building.parking": (PropertyBuilding.parking, BUILDING),
+    "building.gym": (PropertyBuilding.gym, BUILDING),
+    "building.installment": (PropertyBuilding.installment, BUILDING),
+    "building.swimming_pool": (PropertyBuilding.swimming_pool, BUILDING),
+    "owner.id": (Property.owner_id, ()),
+    "owner.user_id": (Agent.user_id, AGENT),
+    "owner.company": (Agent.company, AGENT),
+    "owner.name": (User.name, OWNER),
+    "owner.email": (User.email, OWNER),
+    "owner.phone": (User.phone, OWNER),
+    "owner.image_url": (
+        select(UserProfileImage.image_url)
+        .where(UserProfileImage.user_id == User.id)
+        .limit(1)
+        .scalar_subquery(),
+        OWNER,
+    ),
+}
+# Fields loaded by their own query
+IMAGES = "images"
+DOCUMENTS = "documents"
+# Set by the service for the signed-in user
+IS_LIKED = "is_liked"
+FIELD_PATHS = frozenset(PROPERTY_FIELDS) | {IMAGES, DOCUMENTS, IS_LIKED}
+
+CARD_FIELDS: tuple[str, ...] = (
+    "id", "title", "price", "currency", "original_price", "views",
+    "likes_count", "created_at", "owner_id", "listing_id", "city_id",
+    "location.address", "location.latitude", "location.longitude",
+    "info.category", "info.rooms", "info.bedrooms", "info.bathrooms",
+    "info.total_area", "info.floor", "info.floors",
+    "owner.id", "owner.user_id", "owner.company", "owner.name",
+    "owner.email", "owner.phone",
+)
+DETAIL_FIELDS: tuple[str, ...] = tuple(
+    path for path in PROPERTY_FIELDS if path != "cover_image")
+
+# Row label -> column of a listing card
+LISTING_COLUMNS: dict[str, ColumnElement] = {
+    "id": Listing.id,
+    "name": Listing.name,
+    "category": Listing.category,
+    "description": Listing.description,
+    "address": Listing.address,
+    "latitude": Listing.latitude,
+    "longitude": Listing.longitude,
+    "building_area": Listing.building_area,
+    "living_area": Listing.living_area,
+    "objects": Listing.objects,
+    "year": Listing.year,
+    "building_floors": Listing.building_floors,
+    "agent.id": Listing.agent_id,
+    "agent.user_id": Agent.user_id,
+    "agent.company": Agent.company,
+    "agent.name": User.name,
+    "agent.email": User.email,
+    "agent.phone": User.phone,
+}
+
+
+def parse_fields(value: str | None) -> frozenset[str] | None:
+    """
+    Parses a `fields` parameter of comma separated paths, None when not
+    given. A group name such as `info` stands for every field of the
+    group. `id` is always included. Raises `InvalidFields` on unknown names.
+    """
+    if value is None:
+        return None
+    fields = {"id"}
+    for name in filter(None, (part.strip() for part in value.split(","))):
+        group = [path for path in FIELD_PATHS if path.startswith(f"{name}.")]
+        if name in FIELD_PATHS:
+            fields.add(name)
+        elif group:
+            fields.update(group)
+        else:
+            raise exceptions.InvalidFields
+    return frozenset(fields)
+
+
+def with_fields(
+        fields: frozenset[str] | None,
+        *paths: str,
+        ) -> tuple[frozenset[str] | None, tuple[str, ...]]:
+    """
+    Adds top level `paths` needed internally to the requested fields.
+    Returns the fields to load and the added paths, to `drop_fields` later.
+    """
+    if fields is None:
+        return None, ()
+    added = tuple(path for path in paths if path not in fields)
+    return fields.union(added), added
+
+
+def fields_stmt(paths: Iterable[str]) -> Select:
+    """
+    Selects the column fields among `paths`, labeled by path, joining
+    only the relationships holding them
+    """
+    columns = {path: PROPERTY_FIELDS[path] for path in ("id", *paths)
+               if path in PROPERTY_FIELDS}
+    stmt = (
+        select(*(column.label(path) for path, (column, _) in columns.items()))
+        .select_from(Property)
+    )
+    for relationship in dict.fromkeys(
+            join for _, joins in columns.values() for join in joins):
+        stmt = stmt.outerjoin(relationship)
+    return stmt
+
+
+def cards_stmt(
+        ids: Sequence[int],
+        visible: bool = False,
+        paths: Iterable[str] = CARD_FIELDS,
+        ) -> Select:
+    """Selects the card rows of the properties, only visible ones if `visible`"""
+    stmt = fields_stmt(paths).where(Property.id.in_(ids))
+    return stmt.where(VISIBLE_PROPERTY) if visible else stmt
+
+
+def detail_stmt(property_id: int, paths: Iterable[str] = DETAIL_FIELDS) -> Select:
+    """Selects the detail row of the property"""
+    return fields_stmt(paths).where(Property.id == property_id)
+
+
+def listing_cards_stmt(ids: Sequence[int]) -> Select:
+    """Selects the card rows of the listings"""
+    return (
+        select(*(column.label(name) for name, column in LISTING_COLUMNS.items()))
+        .outerjoin(Listing.agent)
+        .outerjoin(Agent.user)
+        .where(Listing.id.in_(ids))
+    )
+
+
+def listing_properties_stmt(ids: Sequence[int]) -> Select:
+    """Selects `(listing_id, id)` of the properties of the listings"""
+    return (
+        select(Property.listing_id, Property.id)
+        .where(Property.listing_id.in_(ids))
+        .order_by(Property.listing_id, Property.id)
+    )
+
+
+def image_urls_stmt(
+        model: type[ImageMixin],
+        parent_id: InstrumentedAttribute,
+        ids: Sequence[int],
+        limit: int | None = None,
+        ) -> Select:
+    """
+    Selects `(parent id, url)` of the images of the parents, in upload
+    order, only the first `limit` of each parent if given
+    """
+    ranked = (
+        select(
+            parent_id.label("parent_id"),
+            model.image_url.label("url"),
+            func.row_number().over(
+                partition_by=parent_id, order_by=model.id).label("position"),
+        )
+        .where(parent_id.in_(ids))
+        .subquery()
+    )
+    stmt = select(ranked.c.parent_id, ranked.c.url)
+    if limit is not None:
+        stmt = stmt.where(ranked.c.position <= limit)
+    return stmt.order_by(ranked.c.parent_id, ranked.c.position)
+
+
+def property_images_stmt(ids: Sequence[int], limit: int | None = None) -> Select:
+    """`image_urls_stmt` of property images"""
+    return image_urls_stmt(PropertyImage, PropertyImage.property_id, ids, limit)
+
+
+def listing_images_stmt(ids: Sequence[int]) -> Select:
+    """`image_urls_stmt` of listing images"""
+    return image_urls_stmt(ListingImage, ListingImage.listing_id, ids)
+
+
+def documents_stmt(ids: Sequence[int]) -> Select:
+    """Selects `(property_id, document_url)` of the properties' documents"""
+    return (
+        select(PropertyDocument.property_id, PropertyDocument.document_url)
+        .where(PropertyDocument.property_id.in_(ids))
+        .order_by(PropertyDocument.property_id, PropertyDocument.id)
+    )
+
+
+def group_by_parent(rows: Iterable[Row]) -> dict[int, list]:
+    """Groups `(parent id, value)` rows by parent, in row order"""
+    grouped: dict[int, list] = defaultdict(list)
+    for parent_id, value in rows:
+        grouped[parent_id].append(value)
+    return grouped
+
+
+def nest(row: Row) -> dict[str, Any]:
+    """Values of a row labeled by path, nested at the dots"""
+    nested: dict[str, Any] = {}
+    for path, value in row._mapping.items():
+        *groups, name = path.split(".")
+        target = nested
+        for group in groups:
+            target = target.setdefault(group, {})
+        target[name] = value
+    return nested
+
+
+def _without_missing(values: dict[str, Any], group: str) -> dict[str, Any]:
+    """Sets the agent group None when the outer join found no agent"""
+    if values[group]["user_id"] is None:
+        values[group] = None
+    return values
+
+
+def property_card(row: Row, images: list[str]) -> PropertyCard:
+    """Builds a card from a row of `cards_stmt`"""
+    return PropertyCard(**_without_missing(nest(row), "owner"), images=images)
+
+
+def property_detail(row: Row, images: list[str], documents: list[str]) -> PropertyDetail:
+    """Builds a detail from a row of `detail_stmt`"""
+    return PropertyDetail(
+        **_without_missing(nest(row), "owner"), images=images, documents=documents)
+
+
+def sparse_property(row: Row, loaded: Mapping[str, Any]) -> SparseProperty:
+    """Builds a property of the row's fields and the separately `loaded` ones"""
+    return SparseProperty(nest(row), **loaded)
+
+
+def drop_fields(items: Iterable[SparseProperty], paths: Iterable[str]) -> None:
+    """Removes top level fields only selected for internal use"""
+    for item in items:
+        for path in paths:
+            item.pop(path, None)
+
+
+def listing_card(
+        row: Row,
+        images: list[str],
+        properties: list[PropertyCard | SparseProperty],
+        ) -> ListingCard:
+    """Builds a card from a row of `listing_cards_stmt`"""
+    return ListingCard(
+        **_without_missing(nest(row), "agent"), images=images, properties=properties)
@@ -0,0 +1,154 @@
+"""Module with map grid clustering over web mercator tiles"""
+import math
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from src.base.cache import TTLCache
+from src.config import Settings
+
+# Grid cells per tile side, a 256px tile gets 32px cells
+CELLS_PER_TILE = 8
+# Latitudes beyond the web mercator range are clamped
+MAX_LATITUDE = 85.05112878
+
+# (west, south, east, north) in degrees
+BoundingBox = tuple[float, float, float, float]
+Tile = tuple[int, int]
+WORLD: BoundingBox = (-180.0, -90.0, 180.0, 90.0)
+
+# Tile contents keyed by (filters key, zoom, tile)
+tiles_cache: TTLCache[list[dict[str, Any]]] = TTLCache(
+    Settings.MAP_CACHE_SECONDS, maxsize=8192)
+
+
+@dataclass(frozen=True)
+class MapPoints:
+    """Map pins as parallel arrays"""
+
+    ids: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    price: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _mercator_x(longitude: np.ndarray | float) -> np.ndarray | float:
+    """Longitude as web mercator x in [0, 1]"""
+    return (np.asarray(longitude) + 180.0) / 360.0
+
+
+def _mercator_y(latitude: np.ndarray | float) -> np.ndarray | float:
+    """Latitude as web mercator y in [0, 1], 0 at the north"""
+    radians = np.radians(np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE))
+    return (1.0 - np.log(np.tan(radians) + 1.0 / np.cos(radians)) / math.pi) / 2.0
+
+
+def _to_index(value: np.ndarray | float, scale: int) -> np.ndarray:
+    """Position in [0, 1] as grid index with `scale` cells per side"""
+    return np.clip(np.floor(np.asarray(value) * scale), 0, scale - 1).astype(np.int64)
+
+
+def tiles_in(bbox: BoundingBox, zoom: int) -> list[Tile]:
+    """Tiles `(x, y)` of the zoom level overlapping the bounding box"""
+    west, south, east, north = bbox
+    scale = 1 << zoom
+    x0, x1 = _to_index(_mercator_x(west), scale), _to_index(_mercator_x(east), scale)
+    y0, y1 = _to_index(_mercator_y(north), scale), _to_index(_mercator_y(south), scale)
+    return [(x, y) for x in range(int(x0), int(x1) + 1)
+            for y in range(int(y0), int(y1) + 1)]
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> BoundingBox:
+    """Bounding box of a tile"""
+    scale = 1 << zoom
+
+    def latitude(y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / scale))))
+
+    return (x / scale * 360.0 - 180.0, latitude(y + 1),
+            (x + 1) / scale * 360.0 - 180.0, latitude(y))
+
+
+def tiles_bounds(zoom: int, tiles: list[Tile]) -> BoundingBox:
+    """Bounding box covering all the tiles"""
+    bounds = [tile_bounds(zoom, x, y) for x, y in tiles]
+    return (min(b[0] for b in bounds), min(b[1] for b in bounds),
+            max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+
+def _split_by_tile(
+        tile_x: np.ndarray,
+        tile_y: np.ndarray,
+        items: list[dict[str, Any]],
+        ) -> dict[Tile, list[dict[str, Any]]]:
+    """Groups items by their tile"""
+    by_tile: dict[Tile, list[dict[str, Any]]] = {}
+    for x, y, item in zip(tile_x.tolist(), tile_y.tolist(), items):
+        by_tile.setdefault((x, y), []).append(item)
+    return by_tile
+
+
+def points_by_tile(
+        points: MapPoints,
+        zoom: int,
+        ) -> dict[Tile, list[dict[str, Any]]]:
+    """Individual pins grouped by their tile"""
+    scale = 1 << zoom
+    items = [
+        {"property_id": id, "latitude": lat, "longitude": lon, "price": price}
+        for id, lat, lon, price in zip(
+            points.ids.tolist(), points.latitude.tolist(),
+            points.longitude.tolist(), points.price.tolist())
+    ]
+    return _split_by_tile(
+        _to_index(_mercator_x(points.longitude), scale),
+        _to_index(_mercator_y(points.latitude), scale),
+        items,
+    )
+
+
+def clusters_by_tile(
+        points: MapPoints,
+        zoom: int,
+        ) -> dict[Tile, list[dict[str, Any]]]:
+    """
+    Clusters pins on a grid of `CELLS_PER_TILE` cells per tile side,
+    grouped by tile. Cells never cross tiles, so the clusters of a tile
+    do not depend on the area queried around it.
+
+    A cluster has the pin count, the centroid and the price range; one of
+    a single pin also has its property id.
+    """
+    if not len(points):
+        return {}
+    scale = (1 << zoom) * CELLS_PER_TILE
+    cell_x = _to_index(_mercator_x(points.longitude), scale)
+    cell_y = _to_index(_mercator_y(points.latitude), scale)
+
+    cells, inverse, counts = np.unique(
+        cell_x * scale + cell_y, return_inverse=True, return_counts=True)
+    latitude = np.bincount(inverse, weights=points.latitude) / counts
+    longitude = np.bincount(inverse, weights=points.longitude) / counts
+
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    prices = points.price[order]
+    min_price = np.minimum.reduceat(prices, starts)
+    max_price = np.maximum.reduceat(prices, starts)
+    first_ids = points.ids[order][starts]
+
+    items = []
+    for count, lat, lon, low, high, id in zip(
+            counts.tolist(), latitude.tolist(), longitude.tolist(),
+            min_price.tolist(), max_price.tolist(), first_ids.tolist()):
+        item = {"count": count, "latitude": lat, "longitude": lon,
+                "min_price": low, "max_price": high}
+        if count == 1:
+            item["property_id"] = id
+        items.append(item)
+    return _split_by_tile(
+        cells // scale // CELLS_PER_TILE, cells % scale // CELLS_PER_TILE, items)
@@ -0,0 +1,403 @@
+"""Module with in-memory columnar property search"""
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src import db
+from src.config import Settings
+from src.property import geo
+from src.property.clustering import BoundingBox, MapPoints
+from src.property.filters import resolve_path
+from src.property.models import PropertySearch
+from src.property.pagination import SORT_ORDERS, decode_cursor
+
+# Columns held as float64, NULL becomes NaN and fails every comparison
+NUMERIC_COLUMNS = (
+    "price", "views",
+    "total_area", "living_area", "rooms", "bedrooms", "bathrooms",
+    "living_rooms", "floor", "floors", "balcony",
+    "year_built", "elevators", "parking", "gym", "installment", "swimming_pool",
+    "latitude", "longitude", "city_id",
+)
+# Columns held as fixed width unicode, NULL becomes "", with a lowercased
+# copy for ilike
+STRING_COLUMNS = ("category", "address")
+LOADED_COLUMNS = ("property_id", "created_at") + NUMERIC_COLUMNS + STRING_COLUMNS
+
+# Snapshot directory file naming the current version
+CURRENT_FILE = "CURRENT"
+# Published versions kept on disk, older ones may still be mapped by workers
+KEPT_VERSIONS = 2
+
+OPERATORS: dict[str, Callable[["ColumnarIndex", str, Any], np.ndarray]] = {
+    ">=": lambda index, name, value: index.columns[name] >= value,
+    "<=": lambda index, name, value: index.columns[name] <= value,
+    "==": lambda index, name, value: index.columns[name] == value,
+    "in": lambda index, name, value: np.isin(index.columns[name], value),
+    "ilike": lambda index, name, value: (
+        np.char.find(index.lowered[name], value.lower()) >= 0),
+    "not_first": lambda index, name, _: (
+        (index.columns[name] != 1) & ~np.isnan(index.columns[name])),
+    "not_last": lambda index, name, _: index.columns[name] < index.columns["floors"],
+    "last": lambda index, name, _: index.columns[name] == index.columns["floors"],
+}
+
+
+def _to_micros(value: datetime) -> int:
+    """Datetime as microseconds since epoch, the unit `created_at` is held in"""
+    return int(np.datetime64(value, "us").astype(np.int64))
+
+
+def read_current_version(directory: str) -> str | None:
+    """Version named by the CURRENT file of the snapshot directory"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+@dataclass
+class ColumnarIndex:
+    """
+    Filterable and sortable `PropertySearch` columns as NumPy arrays.
+
+    Filters evaluate to one boolean mask that serves the count, the page
+    and the map. Rows are never moved on update: a changed property is
+    appended and its old row is marked dead until the next compaction.
+
+    An index opened from a snapshot holds read-only memory mapped arrays
+    shared by every process mapping the same version; updates replace
+    them with private copies.
+    """
+
+    columns: dict[str, np.ndarray]
+    lowered: dict[str, np.ndarray]
+    alive: np.ndarray
+    positions: dict[int, int]
+    # Snapshot version the arrays were loaded from or published as
+    version: str | None = None
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "ColumnarIndex":
+        """Builds index from rows of `LOADED_COLUMNS`"""
+        values = dict(zip(LOADED_COLUMNS, zip(*rows))) if rows else {
+            name: () for name in LOADED_COLUMNS}
+
+        columns = {
+            "property_id": np.array(values["property_id"], dtype=np.int64),
+            "created_at": np.array(
+                values["created_at"], dtype="datetime64[us]").astype(np.int64),
+        }
+        for name in NUMERIC_COLUMNS:
+            columns[name] = np.array(
+                [np.nan if v is None else v for v in values[name]], dtype=np.float64)
+        lowered = {}
+        for name in STRING_COLUMNS:
+            strings = [v or "" for v in values[name]]
+            columns[name] = np.array(strings, dtype=str)
+            lowered[name] = np.array([v.lower() for v in strings], dtype=str)
+        return cls._from_columns(columns, lowered)
+
+    @classmethod
+    def _from_columns(
+            cls,
+            columns: dict[str, np.ndarray],
+            lowered: dict[str, np.ndarray],
+            version: str | None = None,
+            ) -> "ColumnarIndex":
+        """Builds index of live rows from arrays"""
+        ids = columns["property_id"].tolist()
+        return cls(
+            columns=columns,
+            lowered=lowered,
+            alive=np.ones(len(ids), dtype=bool),
+            positions={id: position for position, id in enumerate(ids)},
+            version=version,
+        )
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> "ColumnarIndex":
+        """Loads the whole read model"""
+        result = await session.execute(cls._select_stmt())
+        return cls.from_rows(result.all())
+
+    @classmethod
+    def load_sync(cls, session: Session) -> "ColumnarIndex":
+        """Loads the whole read model with a synchronous session"""
+        return cls.from_rows(session.execute(cls._select_stmt()).all())
+
+    @staticmethod
+    def _select_stmt(property_ids: Sequence[int] | None = None) -> Select:
+        """Selects `LOADED_COLUMNS` of all or the given properties"""
+        stmt = select(*(getattr(PropertySearch, name) for name in LOADED_COLUMNS))
+        if property_ids is not None:
+            stmt = stmt.where(PropertySearch.property_id.in_(property_ids))
+        return stmt
+
+    @classmethod
+    def open_snapshot(cls, directory: str) -> "ColumnarIndex | None":
+        """
+        Maps the current snapshot read-only, None if there is none.
+        Only the id to row lookup is built, the columns are not read.
+        """
+        # A version may get pruned between reading CURRENT and mapping it
+        for _ in range(3):
+            version = read_current_version(directory)
+            if version is None:
+                return None
+            path = os.path.join(directory, version)
+            try:
+                columns = {
+                    name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                    for name in LOADED_COLUMNS
+                }
+                lowered = {
+                    name: np.load(os.path.join(path, f"{name}.lower.npy"), mmap_mode="r")
+                    for name in STRING_COLUMNS
+                }
+            except FileNotFoundError:
+                continue
+            return cls._from_columns(columns, lowered, version)
+        return None
+
+    def save_snapshot(self, directory: str) -> str:
+        """
+        Writes live rows as a new snapshot version, then atomically makes
+        it current by replacing the CURRENT file. Returns the version.
+        """
+        if not self.alive.all():
+            self._compact()
+        version = str(time.time_ns())
+        os.makedirs(directory, exist_ok=True)
+
+        staging = os.path.join(directory, f".{version}.tmp")
+        os.makedirs(staging)
+        for name, column in self.columns.items():
+            np.save(os.path.join(staging, f"{name}.npy"), column)
+        for name, column in self.lowered.items():
+            np.save(os.path.join(staging, f"{name}.lower.npy"), column)
+        os.rename(staging, os.path.join(directory, version))
+
+        current = os.path.join(directory, f".{CURRENT_FILE}.{version}")
+        with open(current, "w") as file:
+            file.write(version)
+        os.replace(current, os.path.join(directory, CURRENT_FILE))
+
+        self.version = version
+        self._prune_snapshots(directory)
+        return version
+
+    @staticmethod
+    def _prune_snapshots(directory: str) -> None:
+        """Removes all but the newest `KEPT_VERSIONS` versions"""
+        versions = sorted(
+            (name for name in os.listdir(directory) if name.isdigit()), key=int)
+        for version in versions[:-KEPT_VERSIONS]:
+            shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    async def refresh(
+            self,
+            session: AsyncSession,
+            property_ids: Sequence[int],
+            ) -> None:
+        """Reloads the given properties, dropping those no longer visible"""
+        result = await session.execute(self._select_stmt(property_ids))
+        rows = result.all()
+        self.remove(property_ids)
+        self.append(rows)
+
+    def remove(self, property_ids: Sequence[int]) -> None:
+        """Marks rows of the given properties dead"""
+        for id in property_ids:
+            position = self.positions.pop(id, None)
+            if position is not None:
+                self.alive[position] = False
+        if len(self.positions) * 4 < len(self.alive) * 3:
+            self._compact()
+
+    def append(self, rows: Sequence[Sequence[Any]]) -> None:
+        """Appends rows of `LOADED_COLUMNS`, properties must not be present"""
+        if not rows:
+            return
+        added = ColumnarIndex.from_rows(rows)
+        offset = len(self.alive)
+        for name, column in added.columns.items():
+            self.columns[name] = np.concatenate((self.columns[name], column))
+        for name, column in added.lowered.items():
+            self.lowered[name] = np.concatenate((self.lowered[name], column))
+        self.alive = np.concatenate((self.alive, added.alive))
+        for id, position in added.positions.items():
+            self.positions[id] = offset + position
+
+    def viewed(self, property_id: int) -> None:
+        """Counts a view of the property in place"""
+        position = self.positions.get(property_id)
+        if position is None:
+            return
+        if not self.columns["views"].flags.writeable:
+            self.columns["views"] = self.columns["views"].copy()
+        self.columns["views"][position] += 1
+
+    def _compact(self) -> None:
+        """Drops dead rows"""
+        self.columns = {name: c[self.alive] for name, c in self.columns.items()}
+        self.lowered = {name: c[self.alive] for name, c in self.lowered.items()}
+        self.alive = np.ones(len(self.columns["property_id"]), dtype=bool)
+        self.positions = {
+            id: position
+            for position, id in enumerate(self.columns["property_id"].tolist())
+        }
+
+    def mask(self, filters: list[tuple]) -> np.ndarray:
+        """Rows matching every filter"""
+        mask = self.alive.copy()
+        for value, path, op in filters:
+            mask &= OPERATORS[op](self, resolve_path(path).key, value)
+        return mask
+
+    def _sort_keys(self, sort: str, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Sort key and id of rows, negated for descending orders"""
+        column, descending = SORT_ORDERS[sort]
+        keys = self.columns[column.key][rows]
+        ids = self.columns["property_id"][rows]
+        if descending:
+            return -keys, -ids
+        return keys, ids
+
+    def search(
+            self,
+            filters: list[tuple],
+            sort: str,
+            limit: int,
+            offset: int = 0,
+            cursor: str | None = None,
+            ) -> tuple[list[int], int]:
+        """
+        Returns the page of property ids and the total number of matches.
+
+        With a cursor the page starts right after it and offset is ignored,
+        the total still counts every match.
+        """
+        mask = self.mask(filters)
+        count = int(mask.sum())
+        rows = np.flatnonzero(mask)
+        keys, ids = self._sort_keys(sort, rows)
+
+        if cursor:
+            offset = 0
+            key, id = decode_cursor(sort, cursor)
+            if isinstance(key, datetime):
+                key = _to_micros(key)
+            _, descending = SORT_ORDERS[sort]
+            if descending:
+                key, id = -key, -id
+            after = (keys > key) | ((keys == key) & (ids > id))
+            rows, keys, ids = rows[after], keys[after], ids[after]
+
+        # Only the first `end` rows are sorted: partition on the key first,
+        # keeping every row tied with the last one for the id tie-breaker
+        end = offset + limit
+        if end < len(rows):
+            kth = np.partition(keys, end - 1)[end - 1]
+            head = keys <= kth
+            rows, keys, ids = rows[head], keys[head], ids[head]
+        order = np.lexsort((ids, keys))[offset:end]
+        return self.columns["property_id"][rows[order]].tolist(), count
+
+    def points(self, filters: list[tuple], bbox: BoundingBox) -> MapPoints:
+        """Map pins of the matching properties inside the bounding box"""
+        west, south, east, north = bbox
+        latitude, longitude = self.columns["latitude"], self.columns["longitude"]
+        rows = np.flatnonzero(
+            self.mask(filters)
+            & (latitude >= south) & (latitude <= north)
+            & (longitude >= west) & (longitude <= east)
+        )
+        return MapPoints(
+            ids=self.columns["property_id"][rows],
+            latitude=latitude[rows],
+            longitude=longitude[rows],
+            price=self.columns["price"][rows],
+        )
+
+    def ids_in_polygon(self, filters: list[tuple], ring: np.ndarray) -> list[int]:
+        """Ids of the matching properties inside the polygon ring"""
+        points = self.points(filters, geo.polygon_bbox(ring))
+        inside = geo.points_in_polygon(points.latitude, points.longitude, ring)
+        return points.ids[inside].tolist()
+
+    def locations(self, filters: list[tuple]) -> list[dict[str, Any]]:
+        """Map pins of the matching properties, newest first"""
+        latitude = self.columns["latitude"]
+        rows = np.flatnonzero(self.mask(filters) & ~np.isnan(latitude))
+        rows = rows[np.argsort(-self.columns["created_at"][rows], kind="stable")]
+        return [
+            {
+                "property_id": property_id,
+                "latitude": lat,
+                "longitude": lon,
+                "address": address or None,
+            }
+            for property_id, lat, lon, address in zip(
+                self.columns["property_id"][rows].tolist(),
+                latitude[rows].tolist(),
+                self.columns["longitude"][rows].tolist(),
+                self.columns["address"][rows].tolist(),
+            )
+        ]
+
+
+# Global index of this process, loaded on startup when enabled
+search_index: ColumnarIndex | None = None
+# Monotonic time of the last check for a newer snapshot
+_checked_at = 0.0
+
+
+async def initialize_search_index() -> None:
+    """
+    Maps the current search index snapshot if the columnar backend is
+    configured. Without a snapshot the index is loaded from the database
+    and published for the other workers.
+    This function should be called on application startup, after the
+    database is initialized.
+    """
+    global search_index
+    if Settings.SEARCH_BACKEND != "columnar":
+        return
+    search_index = ColumnarIndex.open_snapshot(Settings.SEARCH_SNAPSHOT_DIR)
+    if search_index is None:
+        async with db.AsyncSessionLocal() as session:
+            search_index = await ColumnarIndex.load(session)
+        search_index.save_snapshot(Settings.SEARCH_SNAPSHOT_DIR)
+
+
+def get_search_index() -> ColumnarIndex | None:
+    """
+    Returns the index of this process, None with the SQL backend.
+    Switches to a newer published snapshot, checked at most once every
+    `SEARCH_SNAPSHOT_POLL_SECONDS`.
+    """
+    global search_index, _checked_at
+    if search_index is None:
+        return None
+    now = time.monotonic()
+    if now - _checked_at >= Settings.SEARCH_SNAPSHOT_POLL_SECONDS:
+        _checked_at = now
+        version = read_current_version(Settings.SEARCH_SNAPSHOT_DIR)
+        if version is not None and version != search_index.version:
+            search_index = (
+                ColumnarIndex.open_snapshot(Settings.SEARCH_SNAPSHOT_DIR)
+                or search_index)
+    return search_index
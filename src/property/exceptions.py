@@ -28,3 +28,45 @@ class PropertyImageUploadError(HTTPException):
             status_code=400,
             detail="Property image upload error",
         )
+
+class InvalidCursor(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="Invalid pagination cursor",
+        )
+
+class InvalidMapViewport(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="Invalid map viewport",
+        )
+
+class InvalidLocation(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="Invalid location or radius",
+        )
+
+class InvalidPolygon(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="Invalid search polygon",
+        )
+
+class InvalidViewStatsPeriod(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="Invalid view statistics period",
+        )
+
+class InvalidFields(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail="Unknown field requested",
+        )
@@ -0,0 +1,88 @@
+"""Module with search sidebar facet counts"""
+from typing import Any, Sequence
+
+from sqlalchemy import Row, Select, and_, func, select, true, tuple_
+
+from src.base.cache import TTLCache
+from src.config import Settings
+from src.property.filters import get_conditions, resolve_path
+from src.property.models import PropertySearch
+
+# (search schema field, filter path) of facets counted per column value
+GROUPED_FACETS = (
+    ("roomNumber", "info.bedrooms"),
+    ("category", "info.category"),
+    ("city", "city_id"),
+)
+# Facets counting the properties having the flag set
+FLAG_FACETS = (
+    ("installment", "building.installment"),
+    ("swimmingPool", "building.swimming_pool"),
+    ("gym", "building.gym"),
+    ("elevator", "building.elevators"),
+    ("parkingSlot", "building.parking"),
+)
+FACET_PATHS = frozenset(path for _, path in GROUPED_FACETS + FLAG_FACETS)
+
+facets_cache: TTLCache[dict] = TTLCache(Settings.FACETS_CACHE_SECONDS)
+
+
+def facets_stmt(filters: list[tuple]) -> Select:
+    """
+    Counts every facet in one scan of `PropertySearch`.
+
+    Each facet is counted over the properties matching every filter except
+    its own, so a count is the number of results after toggling that value.
+    Filters of no facet narrow the scan itself. The grouped facets are
+    grouping sets; the flags and total come from the `()` set.
+    """
+    conditions = list(zip(
+        (path for _, path, _ in filters), get_conditions(filters)))
+
+    def matching(excluded: str | None = None):
+        return and_(true(), *(
+            condition for path, condition in conditions if path != excluded))
+
+    grouped = [resolve_path(path) for _, path in GROUPED_FACETS]
+    columns = [
+        *grouped,
+        func.grouping(*grouped).label("grouping"),
+        func.count().filter(matching()).label("results"),
+    ]
+    for field, path in GROUPED_FACETS:
+        columns.append(func.count().filter(matching(path)).label(f"{field}_count"))
+    for field, path in FLAG_FACETS:
+        columns.append(func.count().filter(
+            and_(matching(path), resolve_path(path) == True)).label(field))
+    return (
+        select(*columns)
+        .where(*(condition for path, condition in conditions
+                 if path not in FACET_PATHS))
+        .group_by(func.grouping_sets(
+            *(tuple_(column) for column in grouped), tuple_()))
+    )
+
+
+def facet_counts(rows: Sequence[Row]) -> dict[str, Any]:
+    """Shapes rows of `facets_stmt` into the response"""
+    totals_grouping = (1 << len(GROUPED_FACETS)) - 1
+    facets: dict[str, Any] = {field: [] for field, _ in GROUPED_FACETS}
+    results = 0
+
+    for row in rows:
+        if row.grouping == totals_grouping:
+            results = row.results
+            for field, _ in FLAG_FACETS:
+                facets[field] = row._mapping[field]
+            continue
+        for position, (field, _) in enumerate(GROUPED_FACETS):
+            # GROUPING() has a zero bit for the grouped column, first is highest
+            bit = 1 << (len(GROUPED_FACETS) - 1 - position)
+            if row.grouping == totals_grouping ^ bit:
+                value, count = row[position], row._mapping[f"{field}_count"]
+                if value is not None and count:
+                    facets[field].append({"value": value, "count": count})
+
+    for field, _ in GROUPED_FACETS:
+        facets[field].sort(key=lambda facet: facet["value"])
+    return {"results": results, "facets": facets}
@@ -0,0 +1,116 @@
+"""Module with property search filter compiler"""
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import Select, and_, any_, bindparam, func, literal, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import ColumnProperty, InstrumentedAttribute
+
+from src.property.models import PropertySearch
+from src.property.schemas import MapSearchSchema
+
+OPERATORS: dict[str, Callable[[InstrumentedAttribute, Any], Any]] = {
+    ">=": lambda column, value: column >= value,
+    "<=": lambda column, value: column <= value,
+    "==": lambda column, value: column == value,
+    # One array parameter however long the list, e.g. ids inside a polygon
+    "in": lambda column, value: column == any_(
+        bindparam(None, list(value), type_=ARRAY(column.type))),
+    "ilike": lambda column, value: column.ilike(f"%{value}%"),
+    "not_first": lambda column, _: column != 1,
+    "not_last": lambda column, _: column < PropertySearch.floors,
+    "last": lambda column, _: column == PropertySearch.floors,
+    "search": lambda column, value: or_(
+        column.op("@@")(search_query(value)),
+        # Fuzzy word match, tolerates typos in titles and city names
+        literal(value).op("<%")(PropertySearch.address),
+        literal(value).op("<%")(PropertySearch.title),
+    ),
+}
+
+
+def search_query(text: str):
+    """Free text as a tsquery, accepting the web search syntax"""
+    return func.websearch_to_tsquery("simple", text)
+
+
+def search_rank(filters: list[tuple]):
+    """Full-text rank of the search filter, None without one"""
+    for value, path, op in filters:
+        if op == "search":
+            return func.ts_rank(resolve_path(path), search_query(value))
+    return None
+
+
+@dataclass(frozen=True)
+class FilterPlan:
+    """Compiled plan for one filter shape"""
+
+    builders: tuple[Callable[[Any], Any], ...]
+
+    def conditions(self, filters: list[tuple]) -> list:
+        """Binds filter values to the plan predicates"""
+        return [
+            build(value) for build, (value, _, _) in zip(self.builders, filters)
+        ]
+
+
+def resolve_path(path: str) -> InstrumentedAttribute:
+    """
+    Resolves "relationship.column" path to its `PropertySearch` column.
+
+    The read model flattens `Property` and its one-to-one children, so the
+    column keeps the name it has on the related model.
+    """
+    name = path.rpartition(".")[2]
+    column = getattr(PropertySearch, name, None)
+    if not isinstance(getattr(column, "property", None), ColumnProperty):
+        raise ValueError(f"Unknown filter path: {path}")
+    return column
+
+
+@lru_cache(maxsize=256)
+def compile_plan(shape: tuple[tuple[str, str], ...]) -> FilterPlan:
+    """Compiles `(path, operator)` shape into a reusable plan"""
+    return FilterPlan(tuple(
+        partial(OPERATORS[op], resolve_path(path)) for path, op in shape
+    ))
+
+
+def get_plan(filters: list[tuple]) -> FilterPlan:
+    """Returns cached plan for the shape of the given filters"""
+    return compile_plan(tuple((path, op) for _, path, op in filters))
+
+
+def get_conditions(filters: list[tuple]) -> list:
+    """Returns the predicates of the filters on `PropertySearch`"""
+    return get_plan(filters).conditions(filters)
+
+
+def cache_key(filters: list[tuple]) -> Hashable:
+    """Key of filters equal regardless of the order of listed values"""
+    return tuple(
+        (path, op, tuple(sorted(value)) if isinstance(value, list) else value)
+        for value, path, op in filters
+    )
+
+
+def apply_filters(stmt: Select, filters: list[tuple]) -> Select:
+    """
+    Applies the filters to a statement selecting from `PropertySearch`.
+
+    The read model only holds visible properties, so no further
+    conditions are needed.
+    """
+    conditions = get_conditions(filters)
+    if not conditions:
+        return stmt
+    return stmt.where(and_(*conditions))
+
+
+# Validate every path and operator the search schema can emit at import time
+for _field, _path, _op in MapSearchSchema.FILTER_FIELDS:
+    resolve_path(_path)
+    if _op not in OPERATORS:
+        raise ValueError(f"Unknown filter operator: {_op}")
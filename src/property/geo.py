@@ -0,0 +1,117 @@
+"""Module with a spatial grid index over latitude and longitude"""
+import math
+from typing import Any
+
+import numpy as np
+from sqlalchemy import ColumnElement, and_, func, or_
+
+from src.property.clustering import BoundingBox
+
+# Grid cells per degree, a cell is about 1.1 km high
+CELLS_PER_DEGREE = 100
+GRID_ROWS = 180 * CELLS_PER_DEGREE
+GRID_COLUMNS = 360 * CELLS_PER_DEGREE
+# Viewports spanning more rows are prefiltered by a single cell range
+MAX_CELL_RANGES = 64
+EARTH_RADIUS_KM = 6371.0088
+
+# Generated column expression, must compute the same cell as `cell_of`
+CELL_SQL = (
+    f"least(floor((latitude + 90) * {CELLS_PER_DEGREE}), {GRID_ROWS - 1})::integer"
+    f" * {GRID_COLUMNS} + "
+    f"least(floor((longitude + 180) * {CELLS_PER_DEGREE}), {GRID_COLUMNS - 1})::integer"
+)
+
+
+def _row(latitude: float) -> int:
+    return min(max(math.floor((latitude + 90) * CELLS_PER_DEGREE), 0), GRID_ROWS - 1)
+
+
+def _column(longitude: float) -> int:
+    return min(max(math.floor((longitude + 180) * CELLS_PER_DEGREE), 0), GRID_COLUMNS - 1)
+
+
+def cell_of(latitude: float, longitude: float) -> int:
+    """Grid cell of a location, cells are numbered row by row from the south-west"""
+    return _row(latitude) * GRID_COLUMNS + _column(longitude)
+
+
+def cell_ranges(bbox: BoundingBox) -> list[tuple[int, int]]:
+    """
+    Inclusive cell ranges covering the bounding box, one per grid row.
+    A row's cells are consecutive, so each range is one index range scan.
+    """
+    west, south, east, north = bbox
+    first_row, last_row = _row(south), _row(north)
+    first_column, last_column = _column(west), _column(east)
+    if last_row - first_row >= MAX_CELL_RANGES:
+        return [(first_row * GRID_COLUMNS + first_column,
+                 last_row * GRID_COLUMNS + last_column)]
+    return [(row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+            for row in range(first_row, last_row + 1)]
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> BoundingBox:
+    """
+    Smallest bounding box holding the circle. Longitudes are clamped
+    rather than wrapped around the antimeridian.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = max(latitude - math.degrees(angle), -90.0)
+    north = min(latitude + math.degrees(angle), 90.0)
+    if south <= -90.0 or north >= 90.0 or angle >= math.pi / 2:
+        return -180.0, south, 180.0, north
+    spread = math.degrees(math.asin(
+        min(math.sin(angle) / math.cos(math.radians(latitude)), 1.0)))
+    return max(longitude - spread, -180.0), south, min(longitude + spread, 180.0), north
+
+
+def within_bbox(model: Any, bbox: BoundingBox) -> ColumnElement[bool]:
+    """
+    Condition of the `cell`, `latitude` and `longitude` columns of the
+    model being inside the bounding box, prefiltered by grid cells.
+    """
+    west, south, east, north = bbox
+    return and_(
+        or_(*(model.cell.between(low, high) for low, high in cell_ranges(bbox))),
+        model.latitude.between(south, north),
+        model.longitude.between(west, east),
+    )
+
+
+def distance_km(model: Any, latitude: float, longitude: float) -> ColumnElement[float]:
+    """Haversine distance in km from the point to the model's location"""
+    point_latitude = math.radians(latitude)
+    row_latitude = func.radians(model.latitude)
+    half_chord = (
+        func.power(func.sin((row_latitude - point_latitude) / 2), 2)
+        + math.cos(point_latitude) * func.cos(row_latitude)
+        * func.power(func.sin((func.radians(model.longitude) - math.radians(longitude)) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(half_chord, 1.0)))
+
+
+def polygon_bbox(ring: np.ndarray) -> BoundingBox:
+    """Bounding box of a ring of `(longitude, latitude)` vertices"""
+    (west, south), (east, north) = ring.min(axis=0), ring.max(axis=0)
+    return float(west), float(south), float(east), float(north)
+
+
+def points_in_polygon(
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        ring: np.ndarray,
+        ) -> np.ndarray:
+    """
+    Mask of the points inside the ring of `(longitude, latitude)` vertices,
+    by the even-odd rule: a point is inside when a ray going east from it
+    crosses the edges an odd number of times. Loops over the edges, each
+    edge is tested against every point at once.
+    """
+    inside = np.zeros(len(latitude), dtype=bool)
+    for (x0, y0), (x1, y1) in zip(ring, np.roll(ring, -1, axis=0)):
+        crosses = (y0 > latitude) != (y1 > latitude)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing_x = x0 + (latitude - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (longitude < crossing_x)
+    return inside
@@ -0,0 +1,113 @@
+"""
+Module with the cached sets of the properties each user liked, used to
+mark liked properties on result pages
+"""
+import uuid
+from typing import Awaitable, Callable, Sequence
+
+import numpy as np
+from redis.asyncio import Redis as AsyncRedis
+
+from src.base.cache import TTLCache
+from src.config import Settings
+
+# Member of every cached set, so users without likes are cached too.
+# Property ids start at 1.
+EMPTY_MEMBER = 0
+
+# Sorted liked ids by user id, used when Redis is not configured
+local_liked: TTLCache[np.ndarray] = TTLCache(
+    Settings.LIKED_LOCAL_CACHE_SECONDS, Settings.LIKED_LOCAL_CACHE_SIZE)
+# Token by user id replaced on every invalidation, a set loaded under an
+# older token is not cached
+local_generations: TTLCache[object] = TTLCache(
+    Settings.LIKED_LOCAL_CACHE_SECONDS, Settings.LIKED_LOCAL_CACHE_SIZE)
+
+# KEYS: liked set, generation; ARGV: generation read before loading, ttl,
+# members. Fills the set only if no invalidation happened since.
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV, 1000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+LoadLiked = Callable[[], Awaitable[Sequence[int]]]
+
+
+def liked_key(user_id: int) -> str:
+    """Redis key of the set of properties the user liked"""
+    return f"user:liked:{user_id}"
+
+
+def generation_key(user_id: int) -> str:
+    """Redis key of the token replaced whenever the user's likes change"""
+    return f"user:liked:{user_id}:generation"
+
+
+async def get_liked(
+        redis: AsyncRedis,
+        user_id: int,
+        property_ids: Sequence[int],
+        load: LoadLiked,
+        ) -> list[bool]:
+    """
+    Whether the user liked each property, in one round trip when the set
+    is cached. Otherwise `load` reads the liked ids and caches them, unless
+    the likes changed meanwhile.
+    """
+    if not property_ids:
+        return []
+    key = liked_key(user_id)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.exists(key)
+        pipe.smismember(key, property_ids)
+        pipe.get(generation_key(user_id))
+        cached, members, generation = await pipe.execute()
+    if cached:
+        return [bool(member) for member in members]
+
+    liked = await load()
+    await redis.register_script(FILL_SCRIPT)(
+        keys=[key, generation_key(user_id)],
+        args=[generation or "", Settings.LIKED_CACHE_SECONDS, EMPTY_MEMBER, *liked],
+    )
+    liked_ids = set(liked)
+    return [property_id in liked_ids for property_id in property_ids]
+
+
+async def get_liked_local(
+        user_id: int,
+        property_ids: Sequence[int],
+        load: LoadLiked,
+        ) -> list[bool]:
+    """`get_liked` on the in-process cache"""
+    if not property_ids:
+        return []
+    liked = local_liked.get(user_id)
+    if liked is None:
+        generation = local_generations.get(user_id)
+        liked = np.unique(np.fromiter(await load(), dtype=np.int64))
+        if local_generations.get(user_id) is generation:
+            local_liked.set(user_id, liked)
+    return np.isin(np.asarray(property_ids, dtype=np.int64), liked).tolist()
+
+
+async def invalidate(redis: AsyncRedis | None, user_id: int) -> None:
+    """
+    Drops the cached liked set of the user and replaces their generation,
+    so sets loaded before are not cached
+    """
+    local_generations.set(user_id, object())
+    local_liked.delete(user_id)
+    if redis is not None:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(generation_key(user_id), uuid.uuid4().hex,
+                     ex=Settings.LIKED_CACHE_SECONDS)
+            pipe.delete(liked_key(user_id))
+            await pipe.execute()
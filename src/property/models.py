@@ -1,16 +1,22 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Integer, Float, String, Boolean
+from sqlalchemy import (ForeignKey, Index, Integer, Float, String, Boolean,
+                        DateTime, Computed, and_, func)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.base.models import CustomBase, CreateTimestampMixin, ImageMixin, LocationMixin
+from src.base.models import (CustomBase, CreateTimestampMixin, ImageMixin,
+                             LocationMixin, UpdateTimestampMixin)
+from src.db import Base
+from src.property.geo import CELL_SQL
 
 if TYPE_CHECKING:
     from src.user.models import Agent, User
     from src.listing.models import Listing
 
 
-class Property(CreateTimestampMixin):
+class Property(CreateTimestampMixin, UpdateTimestampMixin):
     """Property model."""
 
     __tablename__ = "PropertyModel"
@@ -18,6 +24,10 @@ class Property(CreateTimestampMixin):
     title: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
     views: Mapped[int] = mapped_column(Integer, default=0)
+    # Maintained by `PropertyRepository` in the statement toggling a like
+    likes_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
     price: Mapped[float] = mapped_column(Float, nullable=False)
     currency: Mapped[str] = mapped_column(String, nullable=False, default="$")
     original_price: Mapped[float] = mapped_column(Float, nullable=True)
@@ -25,11 +35,15 @@ class Property(CreateTimestampMixin):
     is_sold: Mapped[bool] = mapped_column(Boolean, default=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     listing_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("ListingModel.id"), nullable=True
+        Integer, ForeignKey("ListingModel.id"), nullable=True, index=True
     )
     owner_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("AgentModel.id"), nullable=False
     )
+    # Resolved from the address on create and update
+    city_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("CityModel.id"), nullable=True, index=True
+    )
 
     location: Mapped["PropertyLocation"] = relationship(
         "PropertyLocation", uselist=False, back_populates="property", cascade="all, delete-orphan"
@@ -65,7 +79,7 @@ class Property(CreateTimestampMixin):
         self.views += 1
 
 
-class PropertyImage(ImageMixin):
+class PropertyImage(ImageMixin, UpdateTimestampMixin):
     """Property image model."""
 
     __tablename__ = "PropertyImageModel"
@@ -77,26 +91,30 @@ class PropertyImage(ImageMixin):
     property: Mapped["Property"] = relationship("Property", back_populates="images")
 
 
-class PropertyLocation(LocationMixin):
+class PropertyLocation(LocationMixin, UpdateTimestampMixin):
     """Property location model."""
 
     __tablename__ = "PropertyLocationModel"
 
     address: Mapped[str] = mapped_column(String, nullable=True)
     property_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("PropertyModel.id"), nullable=False
+        Integer, ForeignKey("PropertyModel.id"), nullable=False, index=True
+    )
+    # Spatial grid cell, see src.property.geo
+    cell: Mapped[int] = mapped_column(
+        Integer, Computed(CELL_SQL, persisted=True), index=True
     )
 
     property: Mapped["Property"] = relationship("Property", back_populates="location")
 
 
-class PropertyInfo(CustomBase):
+class PropertyInfo(UpdateTimestampMixin):
     """Property info model."""
 
     __tablename__ = "PropertyInfoModel"
 
     property_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("PropertyModel.id"), nullable=False
+        Integer, ForeignKey("PropertyModel.id"), nullable=False, index=True
     )
     category: Mapped[str] = mapped_column(String, nullable=True)
     renovation: Mapped[str] = mapped_column(String, nullable=True)
@@ -113,13 +131,13 @@ class PropertyInfo(CustomBase):
 
     property: Mapped["Property"] = relationship("Property", back_populates="info")
 
-class PropertyBuilding(CustomBase):
+class PropertyBuilding(UpdateTimestampMixin):
     """Information on property building"""
 
     __tablename__ = "PropertyBuildingModel"
 
     property_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("PropertyModel.id"), nullable=False
+        Integer, ForeignKey("PropertyModel.id"), nullable=False, index=True
     )
 
     year_built: Mapped[int] = mapped_column(Integer, nullable=True)
@@ -150,13 +168,13 @@ class PropertyReport(CreateTimestampMixin):
     user: Mapped["User"] = relationship("User")
 
 
-class PropertyDocument(CustomBase):
+class PropertyDocument(UpdateTimestampMixin):
     """Property document model."""
 
     __tablename__ = "PropertyDocumentModel"
 
     property_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("PropertyModel.id"), nullable=False
+        Integer, ForeignKey("PropertyModel.id"), nullable=False, index=True
     )
     document_url: Mapped[str] = mapped_column(String, nullable=False)
 
@@ -177,3 +195,174 @@ class PropertyLike(CreateTimestampMixin):
 
     property: Mapped["Property"] = relationship("Property")
     user: Mapped["User"] = relationship("User")
+
+
+class City(CustomBase):
+    """City or area properties are grouped by."""
+
+    __tablename__ = "CityModel"
+
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    # Folded name, see `src.property.utils.fold_name`
+    key: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    # Areas are the districts listed first in the search sidebar
+    is_area: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Area the city lies in, a search for the area includes its cities
+    area_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("CityModel.id"), nullable=True, index=True
+    )
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    aliases: Mapped[list["CityAlias"]] = relationship(
+        "CityAlias", back_populates="city", cascade="all, delete-orphan"
+    )
+
+
+class CityAlias(CustomBase):
+    """Folded name a city is known by, its own name included."""
+
+    __tablename__ = "CityAliasModel"
+
+    key: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    city_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("CityModel.id"), nullable=False, index=True
+    )
+
+    city: Mapped["City"] = relationship("City", back_populates="aliases")
+
+
+class ViewBatch(Base):
+    """
+    Batch of buffered views applied to the database, recorded in the
+    transaction applying it so a retried batch is applied once
+    """
+
+    __tablename__ = "ViewBatchModel"
+
+    batch_id: Mapped[str] = mapped_column(String, primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now(), index=True
+    )
+
+
+class PropertySearch(Base):
+    """
+    Flat read model of the properties visible in search.
+
+    Holds the filterable and sortable columns of `Property` and its
+    one-to-one children. Kept in sync by `PropertyRepository` on writes.
+    `document` is the full-text search vector of title, address and
+    description, generated by the database. `cell` is the location's
+    spatial grid cell.
+    """
+
+    __tablename__ = "PropertySearchModel"
+
+    property_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("PropertyModel.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    price: Mapped[float] = mapped_column(Float, nullable=False)
+    views: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    owner_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    listing_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    city_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    title: Mapped[str] = mapped_column(String, nullable=True)
+    description: Mapped[str] = mapped_column(String, nullable=True)
+    # Info
+    category: Mapped[str] = mapped_column(String, nullable=True)
+    total_area: Mapped[float] = mapped_column(Float, nullable=True)
+    living_area: Mapped[float] = mapped_column(Float, nullable=True)
+    rooms: Mapped[int] = mapped_column(Integer, nullable=True)
+    bedrooms: Mapped[int] = mapped_column(Integer, nullable=True)
+    bathrooms: Mapped[int] = mapped_column(Integer, nullable=True)
+    living_rooms: Mapped[int] = mapped_column(Integer, nullable=True)
+    floor: Mapped[int] = mapped_column(Integer, nullable=True)
+    floors: Mapped[int] = mapped_column(Integer, nullable=True)
+    balcony: Mapped[int] = mapped_column(Integer, nullable=True)
+    # Building
+    year_built: Mapped[int] = mapped_column(Integer, nullable=True)
+    elevators: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    parking: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    gym: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    installment: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    swimming_pool: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    # Location
+    address: Mapped[str] = mapped_column(String, nullable=True)
+    latitude: Mapped[float] = mapped_column(Float, nullable=True)
+    longitude: Mapped[float] = mapped_column(Float, nullable=True)
+    cell: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    cover_image_url: Mapped[str] = mapped_column(String, nullable=True)
+
+    document: Mapped[str] = mapped_column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(address, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+        persisted=True,
+    ))
+
+
+# Rows visible in search, popular and agent pages
+VISIBLE_PROPERTY = and_(
+    Property.is_active == True,
+    Property.is_sold == False,
+    Property.approved == True,
+)
+
+Index(
+    "ix_PropertyModel_visible_created_at",
+    Property.created_at.desc(), Property.id.desc(),
+    postgresql_where=VISIBLE_PROPERTY,
+)
+Index(
+    "ix_PropertyModel_visible_price",
+    Property.price, Property.id,
+    postgresql_where=VISIBLE_PROPERTY,
+)
+Index(
+    "ix_PropertyModel_visible_views",
+    Property.views.desc(), Property.id.desc(),
+    postgresql_where=VISIBLE_PROPERTY,
+)
+Index(
+    "ix_PropertyModel_owner_id_created_at",
+    Property.owner_id, Property.created_at.desc(), Property.id.desc(),
+)
+Index("ix_PropertyImageModel_property_id", PropertyImage.property_id, PropertyImage.id)
+Index(
+    "ix_PropertyLikeModel_user_id_property_id",
+    PropertyLike.user_id, PropertyLike.property_id, unique=True,
+)
+Index(
+    "ix_PropertyLikeModel_user_id_created_at",
+    PropertyLike.user_id, PropertyLike.created_at.desc(), PropertyLike.id.desc(),
+)
+Index("ix_PropertyLikeModel_property_id", PropertyLike.property_id)
+Index(
+    "ix_PropertySearchModel_created_at",
+    PropertySearch.created_at.desc(), PropertySearch.property_id.desc(),
+    postgresql_include=["price", "category", "bedrooms", "total_area"],
+)
+Index(
+    "ix_PropertySearchModel_price",
+    PropertySearch.price, PropertySearch.property_id,
+    postgresql_include=["category", "bedrooms", "total_area"],
+)
+Index(
+    "ix_PropertySearchModel_views",
+    PropertySearch.views.desc(), PropertySearch.property_id.desc(),
+)
+Index("ix_PropertySearchModel_category_bedrooms", PropertySearch.category, PropertySearch.bedrooms)
+Index("ix_PropertySearchModel_owner_id", PropertySearch.owner_id)
+Index("ix_PropertySearchModel_city_id", PropertySearch.city_id)
+Index("ix_PropertySearchModel_cell", PropertySearch.cell)
+Index("ix_PropertySearchModel_document", PropertySearch.document, postgresql_using="gin")
+Index(
+    "ix_PropertySearchModel_address_trgm", PropertySearch.address,
+    postgresql_using="gin", postgresql_ops={"address": "gin_trgm_ops"},
+)
+Index(
+    "ix_PropertySearchModel_title_trgm", PropertySearch.title,
+    postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+)
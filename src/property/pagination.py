@@ -0,0 +1,107 @@
+"""Module with keyset (cursor) pagination helpers"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import ColumnElement, Row, Select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from src.property import exceptions
+from src.property.models import Property, PropertyLike, PropertySearch
+
+# Sort name -> (`PropertySearch` sort key column, descending)
+SORT_ORDERS: dict[str, tuple[InstrumentedAttribute, bool]] = {
+    "newest": (PropertySearch.created_at, True),
+    "oldest": (PropertySearch.created_at, False),
+    "cheapest": (PropertySearch.price, False),
+    "expensive": (PropertySearch.price, True),
+    "popular": (PropertySearch.views, True),
+}
+# Cursor name of favorites, ordered by `PropertyLike` newest first
+LIKES_CURSOR = "liked"
+# Cursor name -> sort key column
+CURSOR_KEYS: dict[str, InstrumentedAttribute] = {
+    **{sort: column for sort, (column, _) in SORT_ORDERS.items()},
+    LIKES_CURSOR: PropertyLike.created_at,
+}
+
+
+def encode_cursor(sort: str, key: Any, id: int) -> str:
+    """Encodes the position after `(key, id)` into an opaque cursor"""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps([sort, key, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> tuple[Any, int]:
+    """Decodes cursor into `(key, id)`, validating it against the sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, id = json.loads(base64.urlsafe_b64decode(padded))
+        column = CURSOR_KEYS[cursor_sort]
+        if column.type.python_type is datetime:
+            key = datetime.fromisoformat(key)
+    except (binascii.Error, json.JSONDecodeError, KeyError,
+            TypeError, ValueError, UnicodeDecodeError) as e:
+        raise exceptions.InvalidCursor from e
+    if cursor_sort != sort or not isinstance(id, int):
+        raise exceptions.InvalidCursor
+    return key, id
+
+
+def order_page(
+        stmt: Select,
+        sort: str,
+        cursor: str | None = None,
+        rank: ColumnElement | None = None,
+        ) -> Select:
+    """Orders statement selecting from `PropertySearch` by the sort key and
+    property id tie-breaker, starting after the cursor position if given.
+
+    "relevance" orders by `rank`, newest first without one. It is not a
+    column so it only supports offset pagination.
+    """
+    if sort == "relevance":
+        if cursor:
+            raise exceptions.InvalidCursor
+        if rank is None:
+            return order_page(stmt, "newest")
+        return stmt.order_by(rank.desc(), PropertySearch.property_id.desc())
+    column, descending = SORT_ORDERS[sort]
+    if cursor:
+        key, id = decode_cursor(sort, cursor)
+        row = tuple_(column, PropertySearch.property_id)
+        stmt = stmt.where(row < tuple_(key, id) if descending else row > tuple_(key, id))
+    if descending:
+        return stmt.order_by(column.desc(), PropertySearch.property_id.desc())
+    return stmt.order_by(column.asc(), PropertySearch.property_id.asc())
+
+
+def next_cursor(sort: str, items: list[Property], limit: int) -> str | None:
+    """Returns cursor for the page after `items`, None on the last page"""
+    if len(items) < limit or sort not in SORT_ORDERS:
+        return None
+    column, _ = SORT_ORDERS[sort]
+    last = items[-1]
+    return encode_cursor(sort, getattr(last, column.key), last.id)
+
+
+def order_likes(stmt: Select, cursor: str | None = None) -> Select:
+    """Orders statement selecting from `PropertyLike` newest first,
+    starting after the cursor position if given"""
+    if cursor:
+        key, id = decode_cursor(LIKES_CURSOR, cursor)
+        stmt = stmt.where(
+            tuple_(PropertyLike.created_at, PropertyLike.id) < tuple_(key, id))
+    return stmt.order_by(PropertyLike.created_at.desc(), PropertyLike.id.desc())
+
+
+def next_likes_cursor(rows: Sequence[Row], limit: int) -> str | None:
+    """Returns cursor for the page after rows of `(created_at, id)` likes"""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(LIKES_CURSOR, last.created_at, last.id)
@@ -0,0 +1,125 @@
+"""
+Module with the compact binary map pin format.
+
+A message is little-endian, a 16 byte header then one array per field:
+
+    offset  type        field
+    0       4 bytes     magic b"PINS"
+    4       uint16      format version, 1
+    6       uint16      flags, bit 0 set when the `count` array is present
+    8       uint32      N, number of pins
+    12      int32       quantization, units per degree of latitude/longitude
+    16      int32[N]    latitude, quantized, first absolute then deltas
+    ..      int32[N]    longitude, quantized, first absolute then deltas
+    ..      uint32[N]   property id, 0 on clusters of several pins
+    ..      uint32[N]   count, pins in the cluster, only with flag bit 0
+    ..      uint8[N]    price bucket, the lowest price of a cluster
+
+Pins are ordered by latitude so the deltas stay small and the message
+compresses well. A price bucket `b` stands for prices from
+`PRICE_BUCKET_BASE * 2 ** (b / PRICE_BUCKETS_PER_DOUBLING)`, bucket 0
+also holds every lower price.
+"""
+import hashlib
+import struct
+from typing import Any
+
+import numpy as np
+
+from src.property.clustering import MapPoints
+
+MEDIA_TYPE = "application/vnd.realestate.pins"
+MAGIC = b"PINS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIi")
+FLAG_COUNTS = 1
+# 1e-6 degrees, about 11 cm
+UNITS_PER_DEGREE = 1_000_000
+PRICE_BUCKET_BASE = 1000.0
+PRICE_BUCKETS_PER_DOUBLING = 8
+
+
+def accepts_pins(accept: str | None) -> bool:
+    """Whether the Accept header asks for the binary format"""
+    if not accept:
+        return False
+    return any(media.split(";")[0].strip() == MEDIA_TYPE for media in accept.split(","))
+
+
+def price_buckets(price: np.ndarray) -> np.ndarray:
+    """Prices as log scale buckets, NaN goes to bucket 0"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buckets = np.floor(
+            np.log2(price / PRICE_BUCKET_BASE) * PRICE_BUCKETS_PER_DOUBLING)
+    return np.clip(np.nan_to_num(buckets, nan=0.0), 0, 255).astype(np.uint8)
+
+
+def _deltas(values: np.ndarray) -> np.ndarray:
+    """Quantized coordinates, first absolute then differences"""
+    quantized = np.round(values * UNITS_PER_DEGREE).astype(np.int64)
+    return np.diff(quantized, prepend=0).astype("<i4")
+
+
+def encode(
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        ids: np.ndarray,
+        price: np.ndarray,
+        counts: np.ndarray | None = None,
+        ) -> bytes:
+    """Packs the pins, or clusters when `counts` is given"""
+    order = np.argsort(latitude, kind="stable")
+    header = HEADER.pack(
+        MAGIC, VERSION, 0 if counts is None else FLAG_COUNTS,
+        len(order), UNITS_PER_DEGREE)
+    arrays = [
+        _deltas(latitude[order]),
+        _deltas(longitude[order]),
+        ids[order].astype("<u4"),
+    ]
+    if counts is not None:
+        arrays.append(counts[order].astype("<u4"))
+    arrays.append(price_buckets(price[order]))
+    return header + b"".join(array.tobytes() for array in arrays)
+
+
+def encode_points(points: MapPoints) -> bytes:
+    """Packs map pins"""
+    return encode(points.latitude, points.longitude, points.ids, points.price)
+
+
+def encode_items(items: list[dict[str, Any]], clustered: bool) -> bytes:
+    """Packs the pins or clusters of `clustering` as served in JSON"""
+    def column(name: str, dtype: type, default: Any = None) -> np.ndarray:
+        return np.array([item.get(name, default) for item in items], dtype=dtype)
+
+    if not clustered:
+        return encode(column("latitude", np.float64), column("longitude", np.float64),
+                      column("property_id", np.int64), column("price", np.float64))
+    return encode(column("latitude", np.float64), column("longitude", np.float64),
+                  column("property_id", np.int64, 0), column("min_price", np.float64),
+                  column("count", np.int64))
+
+
+def decode(message: bytes) -> dict[str, np.ndarray]:
+    """Unpacks a message into absolute coordinates and its arrays"""
+    magic, version, flags, count, units = HEADER.unpack_from(message)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a map pins message")
+    fields = [("latitude", "<i4"), ("longitude", "<i4"), ("property_id", "<u4")]
+    if flags & FLAG_COUNTS:
+        fields.append(("count", "<u4"))
+    fields.append(("price_bucket", "<u1"))
+
+    decoded, offset = {}, HEADER.size
+    for name, dtype in fields:
+        decoded[name] = np.frombuffer(message, dtype, count, offset)
+        offset += decoded[name].nbytes
+    for name in ("latitude", "longitude"):
+        decoded[name] = np.cumsum(decoded[name], dtype=np.int64) / units
+    return decoded
+
+
+def etag(message: bytes) -> str:
+    """Strong entity tag of a message"""
+    return '"' + hashlib.blake2b(message, digest_size=12).hexdigest() + '"'
@@ -1,23 +1,37 @@
 """Module with property repository"""
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Awaitable, Callable, Iterable, Mapping, Sequence
 
-from sqlalchemy import func, and_, delete, or_
+import numpy as np
+from sqlalchemy import (Boolean, ColumnElement, Row, Select, Text, func, and_,
+                        cast, delete, exists, insert, literal, or_, update)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from sqlalchemy.future import select
 from fastapi import UploadFile
 
+from src.config import Settings
 from src.base.repository import BaseRepository
+from src.base.explain import Explain, get_plan
 from src.staticfiles.manager import BaseStaticFilesManager
 from src.property.models import (Property, PropertyImage,
                                  PropertyInfo, PropertyLocation,
                                  PropertyBuilding, PropertyLike,
-                                 PropertyDocument)
+                                 PropertyDocument, PropertySearch,
+                                 City, CityAlias, VISIBLE_PROPERTY)
 from src.user.models import Approval, User, Agent
-from src.property import exceptions
+from src.property import cards, columnar, exceptions, geo, versions, views
+from src.property.clustering import BoundingBox, MapPoints
+from src.property.facets import facet_counts, facets_stmt
+from src.property.filters import apply_filters, search_rank
+from src.property.pagination import order_likes, order_page
+from src.property.utils import find_city_key, fold_name
 from src.listing import exceptions as listing_exceptions
-from src.property.schemas import CreatePropertySchema, MapSearchSchema
-from src.listing.schemas import CreateListingSchema
+from src.auth import exceptions as auth_exceptions
+from src.property.schemas import (CreatePropertySchema, PropertyCard,
+                                  PropertyDetail, SparseProperty)
+from src.listing.schemas import CreateListingSchema, ListingCard
 from src.listing.models import Listing, ListingImage
 from src.celery.tasks import queue_delete_property
 
@@ -27,73 +41,157 @@ class PropertyRepository(BaseRepository[Property]):
 
     staticFilesManager: BaseStaticFilesManager
 
-    @staticmethod
-    def _get_filter_conditions(filters: list[tuple]) -> list:
+    async def commit(self) -> None:
+        """Commits changes, then applies them to the columnar search index"""
+        await super().commit()
+        property_ids = self.session.info.pop("search_refresh", None)
+        search_index = columnar.get_search_index()
+        if property_ids and search_index is not None:
+            await search_index.refresh(self.session, list(property_ids))
+
+    async def _get_counted_ids(
+            self,
+            id_stmt: Select,
+            count: Callable[[], Awaitable[int]],
+            ) -> tuple[Sequence[int], int]:
+        """
+        Selects the page of ids together with `count(*) OVER ()`, the total
+        number of matching rows. `count` is only awaited when the page is
+        empty and the window therefore has no row to report the total on.
+        """
+        result = await self.session.execute(
+            id_stmt.add_columns(func.count().over()))
+        rows = result.all()
+        if not rows:
+            return [], await count()
+        return [row[0] for row in rows], rows[0][1]
+
+    async def _load_cards(
+            self,
+            ids: Sequence[int],
+            visible: bool = False,
+            fields: frozenset[str] | None = None,
+            ) -> list[PropertyCard | SparseProperty]:
+        """
+        Loads property cards by ids preserving the order of ids, from one
+        row per property and the first `CARD_IMAGES_LIMIT` image urls of
+        each. Only visible properties if `visible`. Given `fields`, loads
+        sparse properties of just those fields.
+        """
+        if not ids:
+            return []
 
-        filter_conditions = [
-            Property.is_active == True,
-            Property.is_sold == False,
-            Property.approved == True,
+        result = await self.session.execute(
+            cards.cards_stmt(ids, visible, fields or cards.CARD_FIELDS))
+        rows = {row.id: row for row in result}
+        if not rows:
+            return []
+        urls = await self._load_urls(
+            list(rows), {cards.IMAGES} if fields is None else fields,
+            Settings.CARD_IMAGES_LIMIT)
+        if fields is None:
+            return [cards.property_card(rows[id], urls[cards.IMAGES][id])
+                    for id in ids if id in rows]
+        return [
+            cards.sparse_property(rows[id], {name: values[id] for name, values in urls.items()})
+            for id in ids if id in rows
         ]
 
-        operator_mapping = {
-            ">=": "__ge__",
-            "<=": "__le__",
-            "==": "__eq__",
-            "in": "in_",
+    async def _load_urls(
+            self,
+            ids: Sequence[int],
+            names: Iterable[str],
+            images_limit: int | None = None,
+            ) -> dict[str, dict[int, list[str]]]:
+        """Loads the image and document url fields among `names` by property"""
+        stmts = {
+            cards.IMAGES: cards.property_images_stmt(ids, images_limit),
+            cards.DOCUMENTS: cards.documents_stmt(ids),
+        }
+        return {
+            name: cards.group_by_parent(await self.session.execute(stmt))
+            for name, stmt in stmts.items() if name in names
         }
 
-        for value, attr_path, op in filters:
-            if attr_path == "room_number":
-                or_conditions = []
-                for single_bedroom_count in value:
-                    # info relationship => .has() on a related column
-                    cond = Property.info.has(PropertyInfo.bedrooms == single_bedroom_count)
-                    or_conditions.append(cond)
-
-                # Combine them with an OR
-                filter_conditions.append(or_(*or_conditions))
-            elif attr_path == "info.floor":
-                if value == "NotLastFloor":
-                    filter_conditions.append(Property.info.has(PropertyInfo.floor < PropertyInfo.floors))
-                elif value == "LastFloor":
-                    filter_conditions.append(Property.info.has(PropertyInfo.floor == PropertyInfo.floors))
-                elif value == "NotFirstFloor":
-                    filter_conditions.append(Property.info.has(PropertyInfo.floor != 1))
-                else:
-                    base_attr, related_attr = attr_path.split(".")
-                    print("BASE", base_attr, "RELATED", related_attr)
-                    print("BASE", getattr(Property, base_attr))
-                    print("RELATED", getattr(Property, base_attr).property.mapper.class_)
-                    attr = getattr(
-                        getattr(Property, base_attr).property.mapper.class_,
-                        related_attr
-                    )
-                    filter_conditions.append(
-                        getattr(attr, operator_mapping[op])(value)
-                    )
-            else:
-                if "." in attr_path:
-                    #print("HERE ", getattr(Property, attr_path))
-                    base_attr, related_attr = attr_path.split(".")
-                    print("BASE", base_attr, "RELATED", related_attr)
-                    print("BASE", getattr(Property, base_attr))
-                    print("RELATED", getattr(Property, base_attr).property.mapper.class_)
-                    attr = getattr(
-                        getattr(Property, base_attr).property.mapper.class_,
-                        related_attr
-                    )
-                else:
-                    attr = getattr(Property, attr_path)
-
-                if op == "ilike":
-                    filter_conditions.append(attr.ilike(f"%{value}%"))
-                else:
-                    filter_conditions.append(
-                        getattr(attr, operator_mapping[op])(value)
-                    )
-
-        return filter_conditions
+    async def _refresh_search(
+            self,
+            property_ids: Sequence[int],
+            ) -> None:
+        """
+        Rewrites the `PropertySearch` rows of the given properties from
+        their current state, dropping those no longer visible.
+        Runs in the caller's transaction, before its commit.
+        """
+        if not property_ids:
+            return
+        self.session.info.setdefault("search_refresh", set()).update(property_ids)
+        await self.flush()
+        await self.session.execute(
+            delete(PropertySearch)
+            .where(PropertySearch.property_id.in_(property_ids))
+        )
+        cover_image = (
+            select(PropertyImage.image_url)
+            .where(PropertyImage.property_id == Property.id)
+            .order_by(PropertyImage.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        columns = {
+            "property_id": Property.id,
+            "created_at": Property.created_at,
+            "price": Property.price,
+            "views": func.coalesce(Property.views, 0),
+            "owner_id": Property.owner_id,
+            "listing_id": Property.listing_id,
+            "city_id": Property.city_id,
+            "title": Property.title,
+            "description": Property.description,
+            "category": PropertyInfo.category,
+            "total_area": PropertyInfo.total_area,
+            "living_area": PropertyInfo.living_area,
+            "rooms": PropertyInfo.rooms,
+            "bedrooms": PropertyInfo.bedrooms,
+            "bathrooms": PropertyInfo.bathrooms,
+            "living_rooms": PropertyInfo.living_rooms,
+            "floor": PropertyInfo.floor,
+            "floors": PropertyInfo.floors,
+            "balcony": PropertyInfo.balcony,
+            "year_built": PropertyBuilding.year_built,
+            "elevators": PropertyBuilding.elevators,
+            # Created as strings by an earlier migration, see 2c45c32aaaca
+            "parking": cast(cast(PropertyBuilding.parking, Text), Boolean),
+            "gym": PropertyBuilding.gym,
+            "installment": cast(cast(PropertyBuilding.installment, Text), Boolean),
+            "swimming_pool": cast(cast(PropertyBuilding.swimming_pool, Text), Boolean),
+            "address": PropertyLocation.address,
+            "latitude": PropertyLocation.latitude,
+            "longitude": PropertyLocation.longitude,
+            "cell": PropertyLocation.cell,
+            "cover_image_url": cover_image,
+        }
+        await self.session.execute(
+            insert(PropertySearch).from_select(
+                list(columns),
+                select(*columns.values())
+                .outerjoin(Property.info)
+                .outerjoin(Property.building)
+                .outerjoin(Property.location)
+                .where(Property.id.in_(property_ids), VISIBLE_PROPERTY)
+            )
+        )
+
+    async def get_properties_by_ids(
+            self,
+            ids: Sequence[int],
+            visible: bool = False,
+            fields: frozenset[str] | None = None,
+            ) -> list[PropertyCard | SparseProperty]:
+        """
+        Get property cards by ids in the order of ids, only visible ones if
+        `visible`, sparse given `fields`
+        """
+        return await self._load_cards(ids, visible, fields)
 
     async def get_map_locations(
             self,
@@ -101,20 +199,14 @@ class PropertyRepository(BaseRepository[Property]):
     ) -> Sequence[PropertyLocation]:
         """
         Get map locations from PropertyLocation.
-        Joins Property to apply filters, but doesn't select everything.
+        Filters on the search read model, but doesn't select everything.
         """
-        # Convert your filter list into valid SQLAlchemy conditions
-        filter_conditions = PropertyRepository._get_filter_conditions(filters)
-        stmt = (
+        stmt = apply_filters(
             select(PropertyLocation)
-            # If you have a relationship from PropertyLocation to Property
-            .join(PropertyLocation.property)
-            # then from Property to PropertyInfo, if needed
-            .join(Property.info)
-            .join(Property.building)
-            .where(and_(*filter_conditions))
-            .order_by(Property.created_at.desc())
-        )
+            .join(PropertySearch,
+                  PropertySearch.property_id == PropertyLocation.property_id),
+            filters,
+        ).order_by(PropertySearch.created_at.desc())
 
         # Execute the statement
         result = await self.session.execute(stmt)
@@ -122,6 +214,96 @@ class PropertyRepository(BaseRepository[Property]):
         # Return unique location objects
         return result.scalars().unique().all()
 
+    async def get_map_points(
+            self,
+            filters: list[tuple],
+            bbox: BoundingBox,
+            ) -> MapPoints:
+        """Get map pins of the matching properties inside the bounding box"""
+        result = await self.session.execute(
+            apply_filters(
+                select(
+                    PropertySearch.property_id,
+                    PropertySearch.latitude,
+                    PropertySearch.longitude,
+                    PropertySearch.price,
+                ),
+                filters,
+            ).where(geo.within_bbox(PropertySearch, bbox))
+        )
+        rows = result.all()
+        ids, latitude, longitude, price = zip(*rows) if rows else ((), (), (), ())
+        return MapPoints(
+            ids=np.array(ids, dtype=np.int64),
+            latitude=np.array(latitude, dtype=np.float64),
+            longitude=np.array(longitude, dtype=np.float64),
+            price=np.array(price, dtype=np.float64),
+        )
+
+    async def get_ids_in_polygon(
+            self,
+            filters: list[tuple],
+            ring: np.ndarray,
+            ) -> list[int]:
+        """
+        Get ids of the matching properties inside the polygon ring. The
+        bounding box is selected through the cell index, the exact test
+        runs vectorized over the candidates.
+        """
+        points = await self.get_map_points(filters, geo.polygon_bbox(ring))
+        inside = geo.points_in_polygon(points.latitude, points.longitude, ring)
+        return points.ids[inside].tolist()
+
+    async def get_within_radius(
+            self,
+            filters: list[tuple],
+            latitude: float,
+            longitude: float,
+            radius_km: float,
+            limit: int,
+            ) -> Sequence[Row]:
+        """
+        Get `(property_id, distance)` of the matching properties within
+        `radius_km` of the point, nearest first. Candidates come from the
+        grid cells around the circle, the haversine distance is exact.
+        """
+        distance = geo.distance_km(PropertySearch, latitude, longitude)
+        result = await self.session.execute(
+            apply_filters(
+                select(PropertySearch.property_id, distance.label("distance")),
+                filters,
+            ).where(
+                geo.within_bbox(
+                    PropertySearch, geo.radius_bbox(latitude, longitude, radius_km)),
+                distance <= radius_km,
+            ).order_by(distance, PropertySearch.property_id)
+            .limit(limit)
+        )
+        return result.all()
+
+    async def get_nearest(
+            self,
+            filters: list[tuple],
+            latitude: float,
+            longitude: float,
+            limit: int,
+            max_radius_km: float,
+            ) -> Sequence[Row]:
+        """
+        Get `(property_id, distance)` of the `limit` matching properties
+        nearest to the point, up to `max_radius_km` away.
+
+        Searches a growing radius until it holds `limit` properties, any
+        property outside the radius is farther than those inside.
+        """
+        radius_km = min(Settings.NEARBY_START_RADIUS_KM, max_radius_km)
+        while True:
+            rows = await self.get_within_radius(
+                filters, latitude, longitude, radius_km, limit)
+            if len(rows) >= limit or radius_km >= max_radius_km:
+                return rows
+            radius_km = min(radius_km * 4, max_radius_km)
+
     async def get_at_location(
             self,
             latitude: float,
@@ -136,6 +318,7 @@ class PropertyRepository(BaseRepository[Property]):
                     Property.is_active == True,
                     Property.is_sold == False,
                     Property.approved == True,
+                    PropertyLocation.cell == geo.cell_of(latitude, longitude),
                     PropertyLocation.latitude == latitude,
                     PropertyLocation.longitude == longitude,
                 )                
@@ -159,54 +342,104 @@ class PropertyRepository(BaseRepository[Property]):
             .filter_by(**kwargs))
         return result.scalars().first()
 
+    @staticmethod
+    def _listings_page_stmt() -> Select:
+        """Active listings having at least one property, newest first"""
+        return (
+            select(Listing.id)
+            .filter(
+                Listing.is_active == True,
+                Listing.properties.any(),
+            )
+            .order_by(Listing.id.desc())
+        )
+
+    async def get_listings_page_ids(
+            self,
+            limit: int,
+            offset: int,
+            ) -> Sequence[int]:
+        """Get the listing ids of a listings page"""
+        result = await self.session.execute(
+            self._listings_page_stmt().limit(limit).offset(offset))
+        return result.scalars().all()
+
+    async def get_listings_page_ids_counted(
+            self,
+            limit: int,
+            offset: int,
+            ) -> tuple[Sequence[int], int]:
+        """Get the listing ids of a listings page and total count in one round trip"""
+        return await self._get_counted_ids(
+            self._listings_page_stmt().limit(limit).offset(offset),
+            self.get_listings_count,
+        )
+
     async def get_listings_page(
             self,
             limit: int,
             offset: int,
-            ) -> Sequence[Listing]:
+            fields: frozenset[str] | None = None,
+            ) -> list[ListingCard]:
         """Get listings page"""
-        # subquery = (
-        #     select(Listing.id)
-        #     .filter
-        # )
+        return await self._load_listing_cards(
+            await self.get_listings_page_ids(limit, offset), fields)
 
-        result = await self.session.execute(
-            select(Listing)
-            .options(
-                joinedload(Listing.agent),
-                joinedload(Listing.properties)
-                .options(
-                    joinedload(Property.location),
-                    joinedload(Property.info),
-                    joinedload(Property.images)
-                ),
-                joinedload(Listing.images)
-            )
-            .filter_by(
-                is_active = True,
-            )
-            .order_by(Listing.id.desc())
-            .limit(limit)
-            .offset(offset)
-        )
+    async def get_listings_page_counted(
+            self,
+            limit: int,
+            offset: int,
+            fields: frozenset[str] | None = None,
+            ) -> tuple[list[ListingCard], int]:
+        """Get listings page and total count in one round trip"""
+        ids, count = await self.get_listings_page_ids_counted(limit, offset)
+        return await self._load_listing_cards(ids, fields), count
 
-        return result.scalars().unique().all()
+    async def get_listings_by_ids(
+            self,
+            ids: Sequence[int],
+            fields: frozenset[str] | None = None,
+            ) -> list[ListingCard]:
+        """Get listing cards by ids in the order of ids"""
+        return await self._load_listing_cards(ids, fields)
+
+    async def _load_listing_cards(
+            self,
+            ids: Sequence[int],
+            fields: frozenset[str] | None = None,
+            ) -> list[ListingCard]:
+        """
+        Loads listing cards by ids preserving the order of ids, their
+        properties sparse given `fields`
+        """
+        if not ids:
+            return []
+
+        result = await self.session.execute(cards.listing_cards_stmt(ids))
+        rows = {row.id: row for row in result}
+        images = cards.group_by_parent(await self.session.execute(
+            cards.listing_images_stmt(list(rows))))
+        result = await self.session.execute(
+            cards.listing_properties_stmt(list(rows)))
+        property_ids = cards.group_by_parent(result)
+        properties = {prop.id: prop for prop in await self._load_cards(
+            [id for ids in property_ids.values() for id in ids], fields=fields)}
+        return [
+            cards.listing_card(rows[id], images[id], [
+                properties[property_id] for property_id in property_ids[id]
+                if property_id in properties
+            ])
+            for id in ids if id in rows
+        ]
 
     async def get_listings_count(
             self,
             ) -> int:
         """Get listings count"""
-        subquery = (
-            select(Listing.id)
-            .join(Listing.properties)
-            .group_by(Listing.id)
-            .having(func.count(Property.id) > 0)
-            .subquery()
-        )
-
         result = await self.session.execute(
-            select(func.count(Listing.id))
-            .filter(Listing.id.in_(subquery))
+            self._listings_page_stmt()
+            .order_by(None)
+            .with_only_columns(func.count(Listing.id))
         )
 
         return result.scalar()
@@ -288,41 +521,68 @@ class PropertyRepository(BaseRepository[Property]):
         )
         return result.scalars().all()
 
-    async def get_properties_page(
+    async def get_properties_page_ids(
             self,
             limit: int,
             offset: int,
             filters: list[tuple],
-            ) -> Sequence[Property]:
-        """Get properties page"""
-        filter_conditions = PropertyRepository._get_filter_conditions(filters)
-        print(filter_conditions)
+            sort: str = "newest",
+            cursor: str | None = None,
+            ) -> Sequence[int]:
+        """
+        Get the property ids of a properties page.
 
+        With a cursor the page starts right after it (keyset pagination)
+        and offset is ignored.
+        """
+        stmt = order_page(
+            apply_filters(select(PropertySearch.property_id), filters),
+            sort, cursor, search_rank(filters))
         result = await self.session.execute(
-            select(Property)
-            # Explicitly join or outerjoin the relationships you want to filter on
-            .join(Property.info, isouter=True)
-            .join(Property.location, isouter=True)
-            .join(Property.building, isouter=True)
-            # Then use joinedload to eagerly load data in one round trip
-            .options(
-                joinedload(Property.owner
-                           ).joinedload(Agent.user).load_only(
-                    User.name, User.id, User.phone, User.email
-                ),
-                joinedload(Property.listing),
-                joinedload(Property.images),
-                joinedload(Property.location),
-                joinedload(Property.info),
-            )
-            .filter(
-                and_(*filter_conditions)
-            )
-            .order_by(Property.created_at.desc())
-            .limit(limit)
-            .offset(offset)
+            stmt.limit(limit).offset(0 if cursor else offset))
+        return result.scalars().all()
+
+    async def get_properties_page_ids_counted(
+            self,
+            limit: int,
+            offset: int,
+            filters: list[tuple],
+            sort: str = "newest",
+            ) -> tuple[Sequence[int], int]:
+        """Get the property ids of a properties page and total count in one round trip"""
+        stmt = order_page(
+            apply_filters(select(PropertySearch.property_id), filters),
+            sort, rank=search_rank(filters))
+        return await self._get_counted_ids(
+            stmt.limit(limit).offset(offset),
+            lambda: self.get_properties_count_filtered(filters),
         )
-        return result.scalars().unique().all()
+
+    async def get_properties_page(
+            self,
+            limit: int,
+            offset: int,
+            filters: list[tuple],
+            sort: str = "newest",
+            cursor: str | None = None,
+            fields: frozenset[str] | None = None,
+            ) -> list[PropertyCard | SparseProperty]:
+        """Get properties page, see `get_properties_page_ids`"""
+        return await self._load_cards(await self.get_properties_page_ids(
+            limit, offset, filters, sort, cursor), fields=fields)
+
+    async def get_properties_page_counted(
+            self,
+            limit: int,
+            offset: int,
+            filters: list[tuple],
+            sort: str = "newest",
+            fields: frozenset[str] | None = None,
+            ) -> tuple[list[PropertyCard | SparseProperty], int]:
+        """Get properties page and total count in one round trip"""
+        ids, count = await self.get_properties_page_ids_counted(
+            limit, offset, filters, sort)
+        return await self._load_cards(ids, fields=fields), count
 
     async def get_properties_page_admin(
             self,
@@ -348,15 +608,84 @@ class PropertyRepository(BaseRepository[Property]):
 
     async def get_properties_count_filtered(self, filters: list[tuple]) -> int:
         """Get the number of properties matching the given filters."""
-        filter_conditions = self._get_filter_conditions(filters)
+        result = await self.session.execute(
+            apply_filters(select(func.count(PropertySearch.property_id)), filters)
+        )
+        return result.scalar()
 
+    async def estimate_properties_count_filtered(
+            self,
+            filters: list[tuple],
+            ) -> int:
+        """
+        Estimate the number of properties matching the given filters from
+        the planner row estimate, without executing the query.
+        """
         result = await self.session.execute(
-            select(func.count(Property.id)).filter(
-                and_(*filter_conditions)
-            )
+            Explain(apply_filters(select(PropertySearch.property_id), filters))
+        )
+        return int(get_plan(result.scalar())["Plan Rows"])
+
+    async def get_facet_counts(
+            self,
+            filters: list[tuple],
+            ) -> dict:
+        """Get search sidebar facet counts for the given filters"""
+        result = await self.session.execute(facets_stmt(filters))
+        counts = facet_counts(result.all())
+
+        # City facet values are ids, report names in sidebar order
+        by_id = {facet["value"]: facet["count"] for facet in counts["facets"]["city"]}
+        cities = await self.session.execute(
+            select(City.id, City.name).order_by(City.position))
+        counts["facets"]["city"] = [
+            {"value": name, "count": by_id[id]}
+            for id, name in cities.all() if id in by_id
+        ]
+        return counts
+
+    async def get_cities_counted(self) -> Sequence[Row]:
+        """Get cities in sidebar order with their visible property counts"""
+        result = await self.session.execute(
+            select(City.name, City.is_area, func.count(PropertySearch.property_id))
+            .outerjoin(PropertySearch, PropertySearch.city_id == City.id)
+            .group_by(City.id)
+            .order_by(City.position)
         )
+        return result.all()
+
+    async def get_city_id(self, name: str) -> int | None:
+        """Get id of the city known by the name, None if unknown"""
+        result = await self.session.execute(
+            select(CityAlias.city_id).filter(CityAlias.key == fold_name(name)))
         return result.scalar()
 
+    async def get_city_ids(self, name: str) -> list[int]:
+        """
+        Get ids of the city known by the name and, for an area, of the
+        cities in it. Empty if the name is unknown.
+        """
+        city_id = (
+            select(CityAlias.city_id)
+            .filter(CityAlias.key == fold_name(name))
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            select(City.id)
+            .filter(or_(City.id == city_id, City.area_id == city_id))
+            .order_by(City.id)
+        )
+        return list(result.scalars())
+
+    async def _resolve_city_id(self, address: str | None) -> int | None:
+        """Id of the city named in the address, None if none is known"""
+        if not address:
+            return None
+        result = await self.session.execute(select(CityAlias.key, CityAlias.city_id))
+        aliases = dict(result.all())
+        key = find_city_key(address, list(aliases))
+        return aliases.get(key)
+
     async def get_my_listings(
             self):
         result = await self.session.execute(
@@ -374,29 +703,68 @@ class PropertyRepository(BaseRepository[Property]):
         )
         return result.scalars().unique().all()
 
+    async def get_properties_page_ids_by(
+            self,
+            limit: int,
+            offset: int,
+            **kwargs,
+            ) -> Sequence[int]:
+        """Get the property ids of a properties page"""
+        result = await self.session.execute(
+            self._properties_page_by_stmt(**kwargs)
+            .limit(limit)
+            .offset(offset)
+        )
+        return result.scalars().all()
+
+    async def get_properties_page_ids_by_counted(
+            self,
+            limit: int,
+            offset: int,
+            **kwargs,
+            ) -> tuple[Sequence[int], int]:
+        """Get the property ids of a properties page and total count in one round trip"""
+        return await self._get_counted_ids(
+            self._properties_page_by_stmt(**kwargs)
+            .limit(limit)
+            .offset(offset),
+            lambda: self.get_properties_page_by_count(**kwargs),
+        )
+
     async def get_properties_page_by(
             self,
             limit: int,
             offset: int,
+            fields: frozenset[str] | None = None,
             **kwargs,
-            ) -> Sequence[Property]:
+            ) -> list[PropertyCard | SparseProperty]:
         """Get properties page"""
-        result = await self.session.execute(
-            select(Property).
-            options(
-            joinedload(Property.owner),
-            joinedload(Property.images),
-            joinedload(Property.location),
-            joinedload(Property.info)
-            )
+        return await self._load_cards(await self.get_properties_page_ids_by(
+            limit, offset, **kwargs), fields=fields)
+
+    async def get_properties_page_by_counted(
+            self,
+            limit: int,
+            offset: int,
+            fields: frozenset[str] | None = None,
+            **kwargs,
+            ) -> tuple[list[PropertyCard | SparseProperty], int]:
+        """Get properties page and total count in one round trip"""
+        ids, count = await self.get_properties_page_ids_by_counted(
+            limit, offset, **kwargs)
+        return await self._load_cards(ids, fields=fields), count
+
+    @staticmethod
+    def _properties_page_by_stmt(**kwargs) -> Select:
+        """Property ids matching the given fields, newest first"""
+        return (
+            select(Property.id)
             .filter_by(**kwargs)
             .order_by(
-                Property.created_at.desc()
+                Property.created_at.desc(),
+                Property.id.desc(),
             )
-            .limit(limit)
-            .offset(offset)
         )
-        return result.scalars().unique().all()
 
     async def get_properties_page_by_count(
             self,
@@ -405,12 +773,7 @@ class PropertyRepository(BaseRepository[Property]):
         """Get properties page count"""
         result = await self.session.execute(
             select(func.count(Property.id)).
-            filter_by(
-                is_active = True, 
-                is_sold = False,
-                approved = True,
-                **kwargs
-            )
+            filter_by(**kwargs)
         )
         return result.scalar()
 
@@ -455,6 +818,66 @@ class PropertyRepository(BaseRepository[Property]):
             raise exceptions.PropertyNotFound
         return property_obj
 
+    async def get_detail(
+            self,
+            property_id: int,
+            fields: frozenset[str] | None = None,
+            ) -> PropertyDetail | SparseProperty:
+        """
+        Get property detail by id or raise 404, a sparse property of just
+        the given `fields` if any
+        """
+        result = await self.session.execute(
+            cards.detail_stmt(property_id, fields or cards.DETAIL_FIELDS))
+        row = result.first()
+        if row is None:
+            raise exceptions.PropertyNotFound
+        urls = await self._load_urls(
+            [property_id], fields or (cards.IMAGES, cards.DOCUMENTS))
+        if fields is None:
+            return cards.property_detail(
+                row, urls[cards.IMAGES][property_id], urls[cards.DOCUMENTS][property_id])
+        return cards.sparse_property(
+            row, {name: values[property_id] for name, values in urls.items()})
+
+    async def get_detail_version(
+            self,
+            property_id: int,
+            ) -> Row:
+        """Get the version row and status of a property or raise 404"""
+        result = await self.session.execute(versions.detail_version_stmt(property_id))
+        row = result.first()
+        if row is None:
+            raise exceptions.PropertyNotFound
+        return row
+
+    async def get_versions(
+            self,
+            ids: Sequence[int],
+            ) -> list[Row]:
+        """Get the version rows of the properties in the order of ids"""
+        if not ids:
+            return []
+        result = await self.session.execute(versions.property_versions_stmt(ids))
+        rows = {row.id: row for row in result}
+        return [rows[id] for id in ids if id in rows]
+
+    async def get_listing_versions(
+            self,
+            ids: Sequence[int],
+            ) -> list[Row]:
+        """
+        Get the version rows of the listings in the order of ids, followed
+        by those of their properties
+        """
+        if not ids:
+            return []
+        result = await self.session.execute(versions.listing_versions_stmt(ids))
+        rows = {row.id: row for row in result}
+        result = await self.session.execute(
+            versions.listing_property_versions_stmt(list(rows)))
+        return [rows[id] for id in ids if id in rows] + list(result)
+
     async def get_properties_count(
             self,
             ) -> int:
@@ -504,57 +927,52 @@ class PropertyRepository(BaseRepository[Property]):
                 ))
         return bool(result.scalars().first())
 
-    async def get_favorites_page(
+    async def get_favorites_keys(
             self,
             user_id: int,
             limit: int,
-            offset: int,
-            ) -> Sequence[Property]:
-        """Get favorites page"""
+            cursor: str | None = None,
+            ) -> Sequence[Row]:
+        """
+        Get a page of the user's likes, newest first, as rows of
+        `property_id`, `created_at` and `id` of the like
+        """
         result = await self.session.execute(
-            select(Property)
-            .join(Property.likes)
-            .options(
-                joinedload(Property.owner),
-                joinedload(Property.images),
-                joinedload(Property.location),
-                joinedload(Property.info)
-            )
-            .filter(
-                PropertyLike.user_id == user_id
+            order_likes(
+                select(PropertyLike.property_id, PropertyLike.created_at,
+                       PropertyLike.id)
+                .filter(PropertyLike.user_id == user_id),
+                cursor,
             )
-            .order_by(PropertyLike.created_at.desc())
             .limit(limit)
-            .offset(offset)
         )
-        return result.scalars().unique().all()
+        return result.all()
+
+    async def get_favorites_count(
+            self,
+            user_id: int,
+            ) -> int:
+        """Get number of properties the user liked"""
+        result = await self.session.execute(
+            select(func.count())
+            .select_from(PropertyLike)
+            .filter(PropertyLike.user_id == user_id)
+        )
+        return result.scalar_one()
 
-    async def get_popular_properties(
+    async def get_popular_ids(
             self,
             limit: int,
             offset: int,
-            ) -> Sequence[Property]:
-        """Get popular properties"""
+            city_id: int | None = None,
+            ) -> Sequence[int]:
+        """Get ids of the most viewed properties, of all cities or one"""
+        stmt = select(PropertySearch.property_id)
+        if city_id is not None:
+            stmt = stmt.where(PropertySearch.city_id == city_id)
         result = await self.session.execute(
-            select(Property)
-            .options(
-                joinedload(Property.owner),
-                joinedload(Property.images),
-                joinedload(Property.location),
-                joinedload(Property.info)
-            )
-            .filter(
-                and_(
-                    Property.is_active == True,
-                    Property.is_sold == False,
-                    Property.approved == True,
-                )
-            )
-            .order_by(Property.views.desc())
-            .limit(limit)
-            .offset(offset)
-        )
-        return result.scalars().unique().all()
+            order_page(stmt, "popular").limit(limit).offset(offset))
+        return result.scalars().all()
 
     async def get_favorites_ids(
             self,
@@ -568,15 +986,15 @@ class PropertyRepository(BaseRepository[Property]):
 
         return result.scalars().all()
 
-    async def viewed_property(
+    async def add_views(
             self,
-            property_id: int,
+            counts: Mapping[int, int],
             ) -> None:
-        """Viewed property"""
-        property_obj = await self.get_or_404(property_id)
-        property_obj.viewed()
+        """Adds view counts by property id, without loading the properties"""
+        for stmt in views.add_views_stmts(counts):
+            await self.session.execute(stmt)
         await self.commit()
-    
+
     async def create_listing(
             self,
             schema: CreateListingSchema,
@@ -667,6 +1085,7 @@ class PropertyRepository(BaseRepository[Property]):
         """Delete listing"""
         listing = await self.get_listing_join_property(id=listing_id)
         self._deactivate_listing(listing)
+        await self._refresh_search([prop.id for prop in listing.properties])
         await self.commit()
         queue_delete_property.delay(listing_id)
 
@@ -745,6 +1164,7 @@ class PropertyRepository(BaseRepository[Property]):
                 swimming_pool=schema.swimmingPool,
                 gym=schema.gym
             ),
+            city_id=await self._resolve_city_id(schema.address),
             owner_id=agent_id)
 
         self.add(property_obj)
@@ -752,6 +1172,7 @@ class PropertyRepository(BaseRepository[Property]):
         await self.refresh(property_obj)
         await self._add_images_to_property(property_obj, images, user_id)
         await self._add_documents_to_property(property_obj, documents, user_id)
+        await self._refresh_search([property_obj.id])
         await self.commit()
         return property_obj
 
@@ -763,6 +1184,7 @@ class PropertyRepository(BaseRepository[Property]):
             ) -> None:
         """Add image to property"""
         await self._add_images_to_property(property_obj, images, user_id)
+        await self._refresh_search([property_obj.id])
         await self.commit()
 
     async def _add_documents_to_property(
@@ -811,6 +1233,10 @@ class PropertyRepository(BaseRepository[Property]):
                     setattr(getattr(property_obj, key), k, v)
             else:
                 setattr(property_obj, key, value)
+        if "location" in payload:
+            property_obj.city_id = await self._resolve_city_id(
+                property_obj.location.address)
+        await self._refresh_search([property_id])
         await self.commit()
         return property_obj
 
@@ -821,7 +1247,30 @@ class PropertyRepository(BaseRepository[Property]):
         """Approve property"""
         property_obj = await self.get_or_404(property_id)
         property_obj.approve()
-        await self.session.commit()
+        await self._refresh_search([property_id])
+        await self.commit()
+        return property_obj
+
+    async def disapprove_property(
+            self,
+            property_id: int,
+            ) -> Property:
+        """Disapprove property"""
+        property_obj = await self.get_or_404(property_id)
+        property_obj.disapprove()
+        await self._refresh_search([property_id])
+        await self.commit()
+        return property_obj
+
+    async def deactivate_property(
+            self,
+            property_id: int,
+            ) -> Property:
+        """Deactivate property"""
+        property_obj = await self.get_or_404(property_id)
+        property_obj.deactivate()
+        await self._refresh_search([property_id])
+        await self.commit()
         return property_obj
 
     async def delete_image_from_property(
@@ -832,6 +1281,7 @@ class PropertyRepository(BaseRepository[Property]):
         image = await self._get_property_image(image_id)
         self.staticFilesManager.delete(image.image_url)
         await self.delete(image)
+        await self._refresh_search([image.property_id])
         await self.commit()
 
     async def delete_property(
@@ -845,6 +1295,8 @@ class PropertyRepository(BaseRepository[Property]):
         property_obj.is_sold = is_sold
         if not is_sold:
             await self.delete(property_obj)
+        # Drops the property from search, deleted or sold
+        await self._refresh_search([property_id])
         await self.commit()
 
         queue_delete_property.delay(property_id)
@@ -855,44 +1307,112 @@ class PropertyRepository(BaseRepository[Property]):
             ) -> None:
         """Delete property"""
         prop.deactivate()
+        await self._refresh_search([prop.id])
         await self.commit()
         queue_delete_property.delay(prop.id)
 
-    async def like_property(
-        self,
-        property_id: int,
-        user_id: int,
-        ) -> None:
-        """Like property"""
-        like = PropertyLike(
-            property_id=property_id,
-            user_id=user_id
-        )
-        self.add(like)
-        await self.commit()
-
-    async def unlike_property(
-            self,
+    @staticmethod
+    def _like_stmt(
             property_id: int,
             user_id: int,
-    ) -> None:
-        """Unlike property"""
-        await self.session.execute(
-            select(PropertyLike)
-            .filter(
-                and_(
-                    PropertyLike.property_id == property_id,
-                    PropertyLike.user_id == user_id
-                )
+            add: bool,
+            remove: bool,
+            ) -> Select:
+        """
+        Single statement inserting and/or deleting the like of the user and
+        moving the property's `likes_count` by the rows changed. With both
+        it toggles: the like is only inserted when none was deleted.
+
+        Selects `(liked, added, likes_count)` after the change, `added` being
+        whether a like was inserted, no row when the property does not exist.
+        """
+        def changed(cte) -> ColumnElement:
+            if cte is None:
+                return literal(0)
+            return select(func.count()).select_from(cte).scalar_subquery()
+
+        removed = added = None
+        if remove:
+            removed = (
+                delete(PropertyLike)
+                .where(PropertyLike.user_id == user_id,
+                       PropertyLike.property_id == property_id)
+                .returning(PropertyLike.id)
+                .cte("removed")
             )
-        )
-        await self.session.execute(
-            delete(PropertyLike)
-            .where(
-                and_(
-                    PropertyLike.property_id == property_id,
-                    PropertyLike.user_id == user_id
-                )
+        if add:
+            source = select(literal(user_id), Property.id).where(Property.id == property_id)
+            if removed is not None:
+                source = source.where(~exists(select(removed.c.id)))
+            added = (
+                pg_insert(PropertyLike)
+                .from_select(["user_id", "property_id"], source)
+                .on_conflict_do_nothing(
+                    index_elements=[PropertyLike.user_id, PropertyLike.property_id])
+                .returning(PropertyLike.id)
+                .cte("added")
             )
+        counted = (
+            update(Property)
+            .where(Property.id == property_id)
+            .values(likes_count=Property.likes_count + changed(added) - changed(removed))
+            .returning(Property.likes_count)
+            .cte("counted")
         )
+        if not add:
+            liked = literal(False)
+        elif removed is None:
+            liked = literal(True)
+        else:
+            liked = changed(removed) == 0
+        return select(
+            liked.label("liked"),
+            (changed(added) > 0).label("added"),
+            counted.c.likes_count,
+        )
+
+    async def _change_like(
+            self,
+            property_id: int,
+            user_id: int,
+            add: bool,
+            remove: bool,
+            ) -> Row:
+        """Runs `_like_stmt` and commits, raises 404 on a missing property or user"""
+        try:
+            result = await self.session.execute(
+                self._like_stmt(property_id, user_id, add, remove))
+        except IntegrityError:
+            # Only the user foreign key can fail, the property was selected
+            await self.session.rollback()
+            raise auth_exceptions.UserNotFound
+        row = result.first()
+        if row is None:
+            await self.session.rollback()
+            raise exceptions.PropertyNotFound
         await self.commit()
+        return row
+
+    async def like_property(
+            self,
+            property_id: int,
+            user_id: int,
+            ) -> Row:
+        """Like property, liking it again changes nothing"""
+        return await self._change_like(property_id, user_id, add=True, remove=False)
+
+    async def unlike_property(
+            self,
+            property_id: int,
+            user_id: int,
+            ) -> Row:
+        """Unlike property, unliking it again changes nothing"""
+        return await self._change_like(property_id, user_id, add=False, remove=True)
+
+    async def toggle_like(
+            self,
+            property_id: int,
+            user_id: int,
+            ) -> Row:
+        """Likes the property, or unlikes it when already liked"""
+        return await self._change_like(property_id, user_id, add=True, remove=True)
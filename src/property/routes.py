@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Query
+from fastapi import APIRouter, Depends, UploadFile, File, Query, Header, Request
 from typing import Optional
 
+from src.base.responses import ModelJSONResponse
 from src.property.service import PropertyService
 from src.property.dependencies import get_property_service
+from src.property.pins import accepts_pins
+from src.property.views import visitor_key
 from src.auth.dependencies import get_current_user, get_current_user_optional
 from src.auth.schemas import TokenData
-from src.property.schemas import CreatePropertySchema, SearchPropertySchema, MapSearchSchema
+from src.property.schemas import (CreatePropertySchema, SearchPropertySchema,
+                                  MapSearchSchema, MapViewSchema, NearbySchema)
 
 
 router = APIRouter(
@@ -16,56 +20,105 @@ router = APIRouter(
 @router.get("/")
 async def get_properties_page(
     schema: SearchPropertySchema = Depends(SearchPropertySchema),
-    property_service: PropertyService = Depends(get_property_service)
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    property_service: PropertyService = Depends(get_property_service),
+    current_user: Optional[TokenData] = Depends(get_current_user_optional),
     ):
     return await property_service.get_properties_page(
-        schema)
+        schema, current_user, fields, if_none_match)
 
 @router.get("/popular")
 async def get_popular_properties(
     elements: int = Query(10),
     page: int = Query(1),
-    property_service: PropertyService = Depends(get_property_service)
+    city: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    property_service: PropertyService = Depends(get_property_service),
+    current_user: Optional[TokenData] = Depends(get_current_user_optional),
     ):
     return await property_service.get_popular_properties(
-        limit=elements, offset=(page-1)*elements)
+        limit=elements, offset=(page-1)*elements, city=city,
+        current_user=current_user, fields=fields, if_none_match=if_none_match)
 
 @router.get("/map")
 async def get_map_locations(
+    schema: MapViewSchema = Depends(MapViewSchema),
+    accept: Optional[str] = Header(None),
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    # The format follows Accept, caches have to keep the two apart
+    headers = {"Vary": "Accept"}
+    if accepts_pins(accept):
+        response = await property_service.get_map_pins(schema)
+        response.headers.update(headers)
+        return response
+    return ModelJSONResponse(await property_service.get_map(schema), headers=headers)
+
+@router.get("/map/tile/{zoom}/{x}/{y}")
+async def get_map_tile(
+    zoom: int,
+    x: int,
+    y: int,
     schema: MapSearchSchema = Depends(MapSearchSchema),
+    if_none_match: Optional[str] = Header(None),
     property_service: PropertyService = Depends(get_property_service)
     ):
-    result = await property_service.get_map_locations(schema)
-    print("RESULT ", result)
-    return result
+    return await property_service.get_map_tile(
+        schema, zoom, x, y, if_none_match)
+
+@router.get("/nearby")
+async def get_nearby_properties(
+    schema: NearbySchema = Depends(NearbySchema),
+    fields: Optional[str] = Query(None),
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    return ModelJSONResponse(await property_service.get_nearby(schema, fields))
+
+@router.get("/facets")
+async def get_facets(
+    schema: MapSearchSchema = Depends(MapSearchSchema),
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    return await property_service.get_facets(schema)
 
 @router.get("/fav")
 async def get_fav_properties(
+    elements: int = Query(10),
+    cursor: Optional[str] = Query(None),
+    ids_only: bool = Query(False),
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
     user: TokenData = Depends(get_current_user),
     property_service: PropertyService = Depends(get_property_service)
     ):
-    offset = 0
-    limit = 10
-    return await property_service.property_repository.get_favorites_page(
-        user.user_id, limit, offset)
+    return await property_service.get_favorites_page(
+        user, elements, cursor, ids_only, fields, if_none_match)
 
 @router.get("/record/{id}")
 async def get_property_by_id(
     id: int,
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
     property_service: PropertyService = Depends(get_property_service),
     current_user: Optional[TokenData] = Depends(get_current_user_optional),
     ):
-    return await property_service.get_property_by_id(id, current_user)
+    return await property_service.get_property_by_id(
+        id, current_user, fields, if_none_match)
 
 @router.get("/agent/{agent_id}/page")
 async def get_properties_by_agent_page(
     agent_id: int,
     page: int = Query(1),
     elements: int = Query(10),
-    property_service: PropertyService = Depends(get_property_service)
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    property_service: PropertyService = Depends(get_property_service),
+    current_user: Optional[TokenData] = Depends(get_current_user_optional),
     ):
     return await property_service.get_properties_by_agent_page(
-        agent_id, page, elements)
+        agent_id, page, elements, current_user, fields, if_none_match)
 
 @router.get("/me/liked")
 async def get_user_liked_properties(
@@ -75,37 +128,10 @@ async def get_user_liked_properties(
     return await property_service.get_favorites_ids(user.user_id)
 
 @router.get("/areas")
-async def get_areas():
-    return {
-        "cities": [
-        "Lefkoşa",
-        "Girne",
-        "Gazimağusa",
-        "Güzelyurt",
-        "İskele",
-        "Lefke",
-        "Lapta",
-        "Koruçam",
-        "Alsancak",
-        "Değirmenlik",
-        "Esentepe",
-        "Dikmen",
-        "Mehmetçik",
-        "Karpaz",
-        "Dipkarpaz",
-        "Yeni Erenköy",
-        "Geçitkale",
-        "Beşparmak"
-        ],
-        "areas": [
-            "Lefkoşa",
-            "Girne",
-            "Gazimağusa",
-            "Güzelyurt",
-            "İskele",
-            "Lefke"
-        ]
-    }
+async def get_areas(
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    return await property_service.get_areas()
 
 @router.post("/create")
 async def create_property(
@@ -140,13 +166,47 @@ async def like_property(
     return await property_service.like_property(
         property_id, user.user_id)
 
+@router.put("/like/{property_id}")
+async def set_like_property(
+    property_id: int,
+    user: TokenData = Depends(get_current_user),
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    return await property_service.set_like(
+        property_id, user.user_id, liked=True)
+
+@router.delete("/like/{property_id}")
+async def unlike_property(
+    property_id: int,
+    user: TokenData = Depends(get_current_user),
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    return await property_service.set_like(
+        property_id, user.user_id, liked=False)
+
 @router.post("/view/{property_id}")
 async def view_property(
     property_id: int,
+    request: Request,
+    user_agent: Optional[str] = Header(None),
+    current_user: Optional[TokenData] = Depends(get_current_user_optional),
     property_service: PropertyService = Depends(get_property_service)
     ):
+    visitor = visitor_key(
+        current_user.user_id if current_user else None,
+        request.client.host if request.client else None,
+        user_agent,
+    )
     return await property_service.viewed_property(
-        property_id)
+        property_id, visitor)
+
+@router.get("/record/{id}/views")
+async def get_property_view_stats(
+    id: int,
+    days: int = Query(7),
+    property_service: PropertyService = Depends(get_property_service)
+    ):
+    return await property_service.get_view_stats(id, days)
 
 @router.put("update/{id}")
 async def update_property(
@@ -1,8 +1,14 @@
-from typing import Optional
+import json
+from datetime import datetime
+from typing import Any, ClassVar, Literal, Optional
 
+import numpy as np
 from pydantic import BaseModel
 
 from src.base.schemas import as_form
+from src.config import Settings
+from src.property import exceptions
+from src.user.schemas import AgentCard
 
 
 @as_form
@@ -47,6 +53,9 @@ class MapSearchSchema(BaseModel):
     roomNumber: Optional[str] = None  # Comma-separated string
     city: Optional[str] = None
     category: Optional[str] = None
+    q: Optional[str] = None  # Free text over title, address and description
+    # GeoJSON ring [[longitude, latitude], ...] or Polygon geometry
+    polygon: Optional[str] = None
 
     livingAreaFrom: Optional[float] = None
     livingAreaTo: Optional[float] = None
@@ -66,105 +75,198 @@ class MapSearchSchema(BaseModel):
     gym: Optional[bool] = None
     swimmingPool: Optional[bool] = None
 
+    # (field, "relationship.column" path, operator) triples, compiled by
+    # src.property.filters which validates every path at import time
+    FILTER_FIELDS: ClassVar[tuple[tuple[str, str, str], ...]] = (
+        ("areaFrom", "info.total_area", ">="),
+        ("areaTo", "info.total_area", "<="),
+        ("priceRangeMin", "price", ">="),
+        ("priceRangeMax", "price", "<="),
+        ("roomNumber", "info.bedrooms", "in"),
+        ("category", "info.category", "=="),
+        ("city", "location.address", "ilike"),
+        ("q", "document", "search"),
+        ("livingAreaFrom", "info.living_area", ">="),
+        ("livingAreaTo", "info.living_area", "<="),
+        ("minFloor", "info.floor", ">="),
+        ("maxFloor", "info.floor", "<="),
+        ("notFirstFloor", "info.floor", "not_first"),
+        ("notLastFloor", "info.floor", "not_last"),
+        ("lastFloor", "info.floor", "last"),
+        ("year", "building.year_built", "=="),
+        ("livingRooms", "info.living_rooms", "=="),
+        ("bathrooms", "info.bathrooms", "=="),
+        ("balconies", "info.balcony", "=="),
+        ("bedrooms", "info.bedrooms", "=="),
+        ("installment", "building.installment", "=="),
+        ("elevator", "building.elevators", "=="),
+        ("parkingSlot", "building.parking", "=="),
+        ("gym", "building.gym", "=="),
+        ("swimmingPool", "building.swimming_pool", "=="),
+    )
+    # Operators that only switch a predicate on, their value is ignored
+    FLAG_OPERATORS: ClassVar[frozenset[str]] = frozenset(
+        ("not_first", "not_last", "last"))
+
     def get_filters(self) -> list[tuple]:
         """
         Returns a list of tuples:
           (value, "dot.notation.path", operator)
-        that can be processed by _get_filter_conditions().
+        that can be processed by src.property.filters.
 
         Skips any numeric fields set to 0, and any fields that are None.
         """
         filters = []
 
-        # If min_area is set and not 0
-        if self.areaFrom is not None and self.areaFrom > 0:
-            filters.append((self.areaFrom, "info.total_area", ">="))
-
-        # If max_area is set and not 0
-        if self.areaTo is not None and self.areaTo > 0:
-            filters.append((self.areaTo, "info.total_area", "<="))
-
-        # If min_price is set and not 0
-        if self.priceRangeMin is not None and self.priceRangeMin > 0:
-            filters.append((self.priceRangeMin, "price", ">="))
-
-        # If max_price is set and not 0
-        if self.priceRangeMax is not None and self.priceRangeMax > 0:
-            filters.append((self.priceRangeMax, "price", "<="))
-
-        # If roomNumber is set and not empty
-        if self.roomNumber:
-            room_numbers = [int(x) for x in self.roomNumber.split(",")]
-            print(room_numbers)
-            filters.append((room_numbers, "info.bedrooms", "in"))
-
-        # If category is set (string)
-        if self.category:
-            filters.append((self.category, "info.category", "=="))
-
-        # If city is set (string)
-        if self.city:
-            print(self.city)
-            filters.append((self.city, "location.address", "ilike"))
-
-        if self.livingAreaFrom is not None and self.livingAreaFrom > 0:
-            filters.append((self.livingAreaFrom, "info.living_area", ">="))
+        for field, path, op in self.FILTER_FIELDS:
+            value = getattr(self, field)
+            if value is None or value == "":
+                continue
 
-        if self.livingAreaTo is not None and self.livingAreaTo > 0:
-            filters.append((self.livingAreaTo, "info.living_area", "<="))
+            if op in self.FLAG_OPERATORS:
+                if value:
+                    filters.append((True, path, op))
+            elif field == "roomNumber":
+                room_numbers = [int(x) for x in value.split(",")]
+                filters.append((room_numbers, path, op))
+            elif isinstance(value, (bool, str)) or value > 0:
+                filters.append((value, path, op))
 
-        if self.minFloor is not None and self.minFloor > 0:
-            print(self.minFloor)
-            filters.append((self.minFloor, "info.floor", ">="))
-
-        if self.maxFloor is not None and self.maxFloor > 0:
-            print(self.maxFloor)
-            filters.append((self.maxFloor, "info.floor", "<="))
-
-        if self.notFirstFloor:
-            filters.append(("NotFirstFloor", "info.floor", ">"))
-
-        # If notLastFloor is set
-        if self.notLastFloor:
-            filters.append(("NotLastFloor", "info.floor", "<"))
-
-        # If lastFloor is set
-        if self.lastFloor:
-            filters.append(("LastFloor", "info.floor", "=="))
-
-        if self.year is not None and self.year > 0:
-            filters.append((self.year, "info.year", "=="))
-
-        if self.livingRooms is not None and self.livingRooms > 0:
-            filters.append((self.livingRooms, "info.living_rooms", "=="))
+        return filters
 
-        if self.bathrooms is not None and self.bathrooms > 0:
-            filters.append((self.bathrooms, "info.bathrooms", "=="))
+    def get_polygon(self) -> np.ndarray | None:
+        """
+        Parses the polygon into an `(n, 2)` array of longitude, latitude
+        vertices without the closing one, raising on a malformed polygon.
+        Holes of a Polygon geometry are ignored.
+        """
+        if not self.polygon:
+            return None
+        try:
+            coordinates = json.loads(self.polygon)
+            if isinstance(coordinates, dict):
+                coordinates = coordinates["coordinates"][0]
+            ring = np.array(coordinates, dtype=np.float64)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise exceptions.InvalidPolygon from e
+        if ring.ndim != 2 or ring.shape[1] != 2 or not np.isfinite(ring).all():
+            raise exceptions.InvalidPolygon
+        if len(ring) > 1 and (ring[0] == ring[-1]).all():
+            ring = ring[:-1]
+        if not 3 <= len(ring) <= Settings.POLYGON_MAX_VERTICES:
+            raise exceptions.InvalidPolygon
+        if not ((np.abs(ring[:, 0]) <= 180).all() and (np.abs(ring[:, 1]) <= 90).all()):
+            raise exceptions.InvalidPolygon
+        return ring
+
+class MapViewSchema(MapSearchSchema):
+    bbox: Optional[str] = None  # "west,south,east,north" in degrees
+    zoom: Optional[int] = None
+
+    def get_bbox(self) -> tuple[float, float, float, float]:
+        """Parses the bounding box, raising on a malformed one"""
+        try:
+            west, south, east, north = (float(x) for x in self.bbox.split(","))
+        except ValueError as e:
+            raise exceptions.InvalidMapViewport from e
+        if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+            raise exceptions.InvalidMapViewport
+        return west, south, east, north
+
+class NearbySchema(MapSearchSchema):
+    latitude: float
+    longitude: float
+    radius: Optional[float] = None  # km, NEARBY_MAX_RADIUS_KM if not given
+    elements: int = 10
 
-        if self.balconies is not None and self.balconies > 0:
-            filters.append((self.balconies, "info.balcony", "=="))
+class SearchPropertySchema(MapSearchSchema):
+    page: int = 1
+    elements: int = 50
+    sort: Literal[
+        "newest", "oldest", "cheapest", "expensive", "popular", "relevance"
+    ] = "newest"
+    cursor: Optional[str] = None  # Opaque `next_cursor`, takes precedence over page
 
-        if self.bedrooms is not None and self.bedrooms > 0:
-            filters.append((self.bedrooms, "info.bedrooms", "=="))
 
-        if self.installment is not None:
-            filters.append((self.installment, "building.installment", "=="))
 
-        if self.elevator is not None:
-            filters.append((self.elevator, "building.elevator", "=="))
+class LocationCard(BaseModel):
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
-        if self.parkingSlot is not None:
-            filters.append((self.parkingSlot, "building.parking_slot", "=="))
 
-        if self.gym is not None:
-            filters.append((self.gym, "building.gym", "=="))
+class InfoCard(BaseModel):
+    category: Optional[str] = None
+    rooms: Optional[int] = None
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    total_area: Optional[float] = None
+    floor: Optional[int] = None
+    floors: Optional[int] = None
 
-        if self.swimmingPool is not None:
-            filters.append((self.swimmingPool, "building.swimming_pool", "=="))
 
-        return filters
+class InfoDetail(InfoCard):
+    renovation: Optional[str] = None
+    living_area: Optional[float] = None
+    living_rooms: Optional[int] = None
+    balcony: Optional[int] = None
+    apartment_stories: Optional[int] = None
 
-class SearchPropertySchema(MapSearchSchema):
-    page: int = 1
-    elements: int = 50
 
+class BuildingDetail(BaseModel):
+    year_built: Optional[int] = None
+    elevators: Optional[bool] = None
+    parking: Optional[bool] = None
+    gym: Optional[bool] = None
+    installment: Optional[bool] = None
+    swimming_pool: Optional[bool] = None
+
+
+class PropertyCard(BaseModel):
+    """Property as shown on result pages, see `src.property.cards`"""
+
+    id: int
+    title: str
+    price: float
+    currency: str
+    original_price: Optional[float] = None
+    views: Optional[int] = None
+    likes_count: int = 0
+    created_at: Optional[datetime] = None
+    owner_id: int
+    listing_id: Optional[int] = None
+    city_id: Optional[int] = None
+    location: LocationCard
+    info: InfoCard
+    owner: Optional[AgentCard] = None
+    images: list[str] = []  # First `CARD_IMAGES_LIMIT` image urls
+    is_liked: bool = False
+
+
+class PropertyDetail(PropertyCard):
+    """Property as shown on its own page"""
+
+    description: Optional[str] = None
+    approved: Optional[bool] = None
+    is_active: Optional[bool] = None
+    is_sold: Optional[bool] = None
+    info: InfoDetail
+    building: BuildingDetail
+    images: list[str] = []
+    documents: list[str] = []
+
+
+class SparseProperty(dict):
+    """
+    Property of only the fields requested with `fields=`, nested like
+    `PropertyDetail`. Attributes read and set its keys.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self[name] = value
@@ -1,19 +1,30 @@
 from dataclasses import dataclass
-from typing import Sequence
+from functools import partial
+from typing import Any, Sequence
 
 from fastapi import UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import Row
 
+from src.base.responses import (ModelJSONResponse, etag_matches, not_modified,
+                                version_headers)
 from src.config import Settings
 from src.property.repository import PropertyRepository
-from src.property import exceptions
-from src.property.models import Property, PropertyLocation
+from src.property.filters import cache_key
+from src.property import (cards, clustering, columnar, exceptions, facets,
+                          likes, pagination, pins, trending, views)
+from src.property.models import Property
 from src.listing.models import Listing
-from src.property.schemas import CreatePropertySchema, SearchPropertySchema, MapSearchSchema
+from src.property.schemas import (CreatePropertySchema, SearchPropertySchema,
+                                  MapSearchSchema, MapViewSchema, NearbySchema,
+                                  PropertyCard, SparseProperty)
 from src.listing.schemas import CreateListingSchema
 from src.user.repository import UserRepository
 from src.auth.schemas import TokenData
 from src.auth import exceptions as auth_exceptions
 from src.listing import exceptions as listing_exceptions
+from src.redis_client import get_redis
 
 @dataclass
 class PropertyService:
@@ -26,75 +37,408 @@ class PropertyService:
             self,
             property_id: int,
             current_user: TokenData,
-            ) -> Property:
-        """Get property by id"""
-        prop = await self.property_repository.get_or_404(property_id)
-        available = False in (prop.is_active, prop.is_sold, prop.approved)
+            fields: str | None = None,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get property by id, only the requested `fields` if given. Answers
+        304 from the version row when the entity tag matches.
+        """
+        fieldset = cards.parse_fields(fields)
+        # Read before the detail, so the tag is never newer than the body
+        version = await self.property_repository.get_detail_version(property_id)
+        available = False in (version.is_active, version.is_sold, version.approved)
         if not available:
-            if current_user:
-                user = await self.user_repository.get_or_401(current_user.user_id)
-                if user.agent and user.agent.id == prop.owner_id:
-                    return prop
-            raise auth_exceptions.Unauthorized
-        return prop
+            if not current_user:
+                raise auth_exceptions.Unauthorized
+            user = await self.user_repository.get_or_401(current_user.user_id)
+            if not user.agent or user.agent.id != version.owner_id:
+                raise auth_exceptions.Unauthorized
+        headers = version_headers([version], fields)
+        headers["Vary"] = "Cookie"
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        prop = await self.property_repository.get_detail(property_id, fieldset)
+        return ModelJSONResponse(prop, headers=headers)
+
+    async def _get_filters(
+            self,
+            schema: MapSearchSchema,
+            ) -> list[tuple]:
+        """
+        Search filters, with a known city name resolved to its id, and an
+        area to its id and those of its cities. Unknown names keep matching
+        the address text.
+
+        A polygon is resolved to the ids of the matching properties inside
+        it, so it composes with every query taking filters.
+        """
+        filters = schema.get_filters()
+        ring = schema.get_polygon()
+        if schema.city:
+            city_ids = await self.property_repository.get_city_ids(schema.city)
+            if city_ids:
+                filters = [
+                    (city_ids, "city_id", "in") if path == "location.address"
+                    else (value, path, op)
+                    for value, path, op in filters
+                ]
+        if ring is None:
+            return filters
+        search_index = None if schema.q else columnar.get_search_index()
+        if search_index is not None:
+            ids = search_index.ids_in_polygon(filters, ring)
+        else:
+            ids = await self.property_repository.get_ids_in_polygon(filters, ring)
+        return filters + [(ids, "property_id", "in")]
 
     async def get_properties_page(
             self,
             schema: SearchPropertySchema,
-            ) -> dict[str, int | Sequence]:
-        """Get properties page"""
+            current_user: TokenData | None = None,
+            fields: str | None = None,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get properties page, only the requested `fields` if given. Answers
+        304 from the versions of the page's properties when the entity tag
+        matches, without loading them.
+        """
         offset = (schema.page - 1) * schema.elements
-        filters = schema.get_filters()
-
-        print(filters)
-
-        properties = await self.property_repository.get_properties_page(
-            schema.elements, offset, filters)
-        count = await self.property_repository.get_properties_count_filtered(
-            filters)
-
-        return {
+        filters = await self._get_filters(schema)
+        # The next cursor is read from the sort key of the last property
+        sort_key = pagination.SORT_ORDERS.get(schema.sort, (None,))[0]
+        sort_keys = () if sort_key is None else (sort_key.key,)
+        fieldset = cards.parse_fields(fields)
+        load, internal = cards.with_fields(fieldset, *sort_keys)
+
+        # The columnar index holds no text, free text search runs in SQL
+        search_index = None
+        if not schema.q and schema.sort != "relevance":
+            search_index = columnar.get_search_index()
+        estimate = None
+        if Settings.APPROXIMATE_COUNT and search_index is None:
+            estimate = await self.property_repository.estimate_properties_count_filtered(
+                filters)
+            if estimate < Settings.APPROXIMATE_COUNT_THRESHOLD:
+                estimate = None
+
+        if search_index is not None:
+            ids, count = search_index.search(
+                filters, schema.sort, schema.elements, offset, schema.cursor)
+        # The window count would only cover rows after the cursor
+        elif estimate is None and Settings.COMBINED_PAGE_COUNT and not schema.cursor:
+            ids, count = await self.property_repository.get_properties_page_ids_counted(
+                schema.elements, offset, filters, schema.sort)
+        else:
+            ids = await self.property_repository.get_properties_page_ids(
+                schema.elements, offset, filters, schema.sort, schema.cursor)
+            count = estimate
+            if count is None:
+                count = await self.property_repository.get_properties_count_filtered(
+                    filters)
+
+        versions = await self.property_repository.get_versions(ids)
+        headers = self._page_headers(
+            versions, current_user, count, estimate is not None, schema.sort,
+            schema.elements, fields)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        properties = await self.property_repository.get_properties_by_ids(
+            ids, fields=load)
+        next_cursor = pagination.next_cursor(schema.sort, properties, schema.elements)
+        cards.drop_fields(properties, internal)
+        await self._mark_liked(properties, current_user, fieldset)
+        return ModelJSONResponse({
             "properties": properties,
             "results": count,
-        }
+            "results_is_estimate": estimate is not None,
+            "next_cursor": next_cursor,
+        }, headers=headers)
+
+    @staticmethod
+    def _page_headers(
+            versions: Sequence[Row],
+            current_user: TokenData | None,
+            *variant: Any,
+            ) -> dict[str, str]:
+        """
+        Validator headers of a page of the records of `versions`, varying
+        with the user `is_liked` is set for
+        """
+        headers = version_headers(
+            versions, current_user and current_user.user_id, *variant)
+        headers["Vary"] = "Cookie"
+        return headers
 
     async def get_properties_by_agent_page(
             self,
             agent_id: int,
             page: int,
             elements: int,
-            ) -> dict[str, int | Sequence]:
-        """Get properties by agent page"""
+            current_user: TokenData | None = None,
+            fields: str | None = None,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get properties by agent page, only the requested `fields` if given.
+        Answers 304 like `get_properties_page`.
+        """
         offset = (page - 1) * elements
-        properties = await self.property_repository.get_properties_page_by(
-            limit=elements, offset=offset, owner_id=agent_id)
-        count = await self.property_repository.get_properties_page_by_count(
-            owner_id=agent_id)
+        fieldset = cards.parse_fields(fields)
+        filters = {
+            "owner_id": agent_id,
+            "is_active": True,
+            "is_sold": False,
+            "approved": True,
+        }
 
-        return {
+        if Settings.COMBINED_PAGE_COUNT:
+            ids, count = await self.property_repository.get_properties_page_ids_by_counted(
+                limit=elements, offset=offset, **filters)
+        else:
+            ids = await self.property_repository.get_properties_page_ids_by(
+                limit=elements, offset=offset, **filters)
+            count = await self.property_repository.get_properties_page_by_count(
+                **filters)
+
+        versions = await self.property_repository.get_versions(ids)
+        headers = self._page_headers(versions, current_user, count, fields)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        properties = await self.property_repository.get_properties_by_ids(
+            ids, fields=fieldset)
+        await self._mark_liked(properties, current_user, fieldset)
+        return ModelJSONResponse({
             "properties": properties,
             "results": count,
-        }
+        }, headers=headers)
 
     async def get_popular_properties(
             self,
             limit: int,
             offset: int,
-            ) -> Sequence[Property]:
-        """Get popular properties"""
+            city: str | None = None,
+            current_user: TokenData | None = None,
+            fields: str | None = None,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get trending properties, from the Redis leaderboard of all cities
+        or of the given one. Falls back to the most viewed properties
+        without Redis or before the leaderboard has any score. Only the
+        requested `fields` if given. Answers 304 like `get_properties_page`.
+        """
+        fieldset = cards.parse_fields(fields)
         if offset < 0:
             offset = 0
-        return await self.property_repository.get_popular_properties(
-            limit, offset)
+        city_id = None
+        if city:
+            city_id = await self.property_repository.get_city_id(city)
+        ids, ranked = [], False
+        if not city or city_id is not None:
+            ids, ranked = await self._get_popular_ids(limit, offset, city_id)
+
+        versions = await self.property_repository.get_versions(ids)
+        headers = self._page_headers(versions, current_user, fields)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        # Skips properties of the leaderboard hidden since the last
+        # `refresh_trending` run
+        properties = await self.property_repository.get_properties_by_ids(
+            ids, visible=ranked, fields=fieldset)
+        await self._mark_liked(properties, current_user, fieldset)
+        return ModelJSONResponse(properties, headers=headers)
+
+    async def _get_popular_ids(
+            self,
+            limit: int,
+            offset: int,
+            city_id: int | None,
+            ) -> tuple[Sequence[int], bool]:
+        """
+        Ids of the trending properties, and whether they come from the
+        Redis leaderboard rather than the most viewed fallback
+        """
+        redis = get_redis()
+        if redis is not None:
+            ids = await trending.get_top(redis, limit, offset, city_id)
+            if ids or offset > 0:
+                return ids, True
+        ids = await self.property_repository.get_popular_ids(limit, offset, city_id)
+        return ids, False
 
     async def get_map_locations(
             self,
             schema: MapSearchSchema,
-            ) -> Sequence[PropertyLocation]:
-        """Get map locations"""
-        filters = schema.get_filters()
-        return await self.property_repository.get_map_locations(filters)
+            ) -> list[dict]:
+        """Get map locations, shaped like `ColumnarIndex.locations`"""
+        filters = await self._get_filters(schema)
+        search_index = None if schema.q else columnar.get_search_index()
+        if search_index is not None:
+            return search_index.locations(filters)
+        return [
+            {
+                "property_id": location.property_id,
+                "latitude": location.latitude,
+                "longitude": location.longitude,
+                "address": location.address,
+            }
+            for location in await self.property_repository.get_map_locations(filters)
+        ]
     
+    async def get_areas(self) -> dict[str, list[str] | dict[str, int]]:
+        """Get cities, areas and their visible property counts"""
+        cities = await self.property_repository.get_cities_counted()
+        return {
+            "cities": [name for name, _, _ in cities],
+            "areas": [name for name, is_area, _ in cities if is_area],
+            "counts": {name: count for name, _, count in cities},
+        }
+
+    async def _get_tiles(
+            self,
+            schema: MapSearchSchema,
+            zoom: int,
+            tiles: list[clustering.Tile],
+            ) -> list[dict[str, Any]]:
+        """
+        Map clusters of the tiles, or individual pins from `MAP_POINTS_ZOOM`
+        on. Tiles are cached per filter set, only the tiles missing from the
+        cache are queried, at once.
+        """
+        filters = await self._get_filters(schema)
+        key = (cache_key(filters), zoom)
+        contents = {tile: clustering.tiles_cache.get((key, tile)) for tile in tiles}
+        missing = [tile for tile, items in contents.items() if items is None]
+        if missing:
+            bbox = clustering.tiles_bounds(zoom, missing)
+            search_index = columnar.get_search_index()
+            if search_index is not None and not schema.q:
+                found = search_index.points(filters, bbox)
+            else:
+                found = await self.property_repository.get_map_points(filters, bbox)
+            by_tile = (clustering.points_by_tile if zoom >= Settings.MAP_POINTS_ZOOM
+                       else clustering.clusters_by_tile)(found, zoom)
+            for tile in missing:
+                contents[tile] = by_tile.get(tile, [])
+                clustering.tiles_cache.set((key, tile), contents[tile])
+        return [item for tile in tiles for item in contents[tile]]
+
+    @staticmethod
+    def _get_viewport_tiles(schema: MapViewSchema) -> list[clustering.Tile]:
+        """Tiles of the viewport, raising on a malformed or too large one"""
+        if not 0 <= schema.zoom <= Settings.MAP_MAX_ZOOM:
+            raise exceptions.InvalidMapViewport
+        tiles = clustering.tiles_in(schema.get_bbox(), schema.zoom)
+        if len(tiles) > Settings.MAP_MAX_TILES:
+            raise exceptions.InvalidMapViewport
+        return tiles
+
+    async def get_map(
+            self,
+            schema: MapViewSchema,
+            ) -> dict[str, Any] | list[dict]:
+        """
+        Get map clusters of the viewport, or individual pins from
+        `MAP_POINTS_ZOOM` on. Without a viewport returns every location.
+        """
+        if schema.bbox is None or schema.zoom is None:
+            return await self.get_map_locations(schema)
+        items = await self._get_tiles(
+            schema, schema.zoom, self._get_viewport_tiles(schema))
+        points = schema.zoom >= Settings.MAP_POINTS_ZOOM
+        return {
+            "zoom": schema.zoom,
+            "points" if points else "clusters": items,
+        }
+
+    async def get_map_pins(
+            self,
+            schema: MapViewSchema,
+            ) -> Response:
+        """`get_map` in the binary pin format of `src.property.pins`"""
+        if schema.bbox is None or schema.zoom is None:
+            filters = await self._get_filters(schema)
+            search_index = None if schema.q else columnar.get_search_index()
+            if search_index is not None:
+                found = search_index.points(filters, clustering.WORLD)
+            else:
+                found = await self.property_repository.get_map_points(
+                    filters, clustering.WORLD)
+            content = pins.encode_points(found)
+        else:
+            items = await self._get_tiles(
+                schema, schema.zoom, self._get_viewport_tiles(schema))
+            content = pins.encode_items(
+                items, clustered=schema.zoom < Settings.MAP_POINTS_ZOOM)
+        return Response(content, media_type=pins.MEDIA_TYPE)
+
+    async def get_map_tile(
+            self,
+            schema: MapSearchSchema,
+            zoom: int,
+            x: int,
+            y: int,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get the clusters or pins of one tile in the binary pin format,
+        cacheable by HTTP caches. Answers 304 when the entity tag matches.
+        """
+        if not (0 <= zoom <= Settings.MAP_MAX_ZOOM
+                and 0 <= x < 1 << zoom and 0 <= y < 1 << zoom):
+            raise exceptions.InvalidMapViewport
+        items = await self._get_tiles(schema, zoom, [(x, y)])
+        content = pins.encode_items(items, clustered=zoom < Settings.MAP_POINTS_ZOOM)
+        headers = {
+            "ETag": pins.etag(content),
+            "Cache-Control": f"public, max-age={Settings.MAP_CACHE_SECONDS}",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        return Response(content, media_type=pins.MEDIA_TYPE, headers=headers)
+
+    async def get_nearby(
+            self,
+            schema: NearbySchema,
+            fields: str | None = None,
+            ) -> dict[str, list]:
+        """Get the matching properties nearest to a point, with their
+        distances in km, only the requested `fields` if given"""
+        fieldset = cards.parse_fields(fields)
+        radius = schema.radius
+        if radius is None:
+            radius = Settings.NEARBY_MAX_RADIUS_KM
+        if not (-90 <= schema.latitude <= 90 and -180 <= schema.longitude <= 180
+                and 0 < radius <= Settings.NEARBY_MAX_RADIUS_KM
+                and 0 < schema.elements <= Settings.NEARBY_MAX_RESULTS):
+            raise exceptions.InvalidLocation
+        filters = await self._get_filters(schema)
+        rows = await self.property_repository.get_nearest(
+            filters, schema.latitude, schema.longitude, schema.elements, radius)
+        distances = {id: distance for id, distance in rows}
+        properties = await self.property_repository.get_properties_by_ids(
+            [id for id, _ in rows], fields=fieldset)
+        return {
+            "properties": properties,
+            "distances": [distances[prop.id] for prop in properties],
+        }
+
+    async def get_facets(
+            self,
+            schema: MapSearchSchema,
+            ) -> dict:
+        """Get search sidebar facet counts, cached per filter set"""
+        filters = await self._get_filters(schema)
+        key = cache_key(filters)
+        counts = facets.facets_cache.get(key)
+        if counts is None:
+            counts = await self.property_repository.get_facet_counts(filters)
+            facets.facets_cache.set(key, counts)
+        return counts
+
     async def get_at_location(
             self,
             latitude: float,
@@ -112,13 +456,23 @@ class PropertyService:
     async def get_listing_by_id(
             self,
             id: int,
-            ) -> Listing:
-        """Get listing by id"""
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get listing by id. Answers 304 from the versions of the listing and
+        its properties when the entity tag matches.
+        """
+        versions = await self.property_repository.get_listing_versions([id])
+        if not versions:
+            raise listing_exceptions.ListingNotFound
+        headers = version_headers(versions)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
         listing = await self.property_repository.get_listing(id)
 
         if not listing:
             raise listing_exceptions.ListingNotFound
-        return listing
+        return JSONResponse(jsonable_encoder(listing), headers=headers)
 
     async def get_user_listings(
             self,
@@ -132,25 +486,72 @@ class PropertyService:
             self,
             page: int,
             elements: int,
-            ) -> dict[str, int | Sequence]:
-        """Get listings page"""
+            current_user: TokenData | None = None,
+            fields: str | None = None,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """Get listings page, only the requested `fields` of their properties
+        if given. Answers 304 from the versions of the listings and their
+        properties when the entity tag matches."""
         offset = (page - 1) * elements
+        fieldset = cards.parse_fields(fields)
 
         if offset < 0:
             offset = 0
 
-        listings = await self.property_repository.get_listings_page(
-            elements, offset)
-        count = await self.property_repository.get_listings_count()
-
-        return {
+        if Settings.COMBINED_PAGE_COUNT:
+            ids, count = await self.property_repository.get_listings_page_ids_counted(
+                elements, offset)
+        else:
+            ids = await self.property_repository.get_listings_page_ids(
+                elements, offset)
+            count = await self.property_repository.get_listings_count()
+
+        versions = await self.property_repository.get_listing_versions(ids)
+        headers = self._page_headers(versions, current_user, count, fields)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        listings = await self.property_repository.get_listings_by_ids(ids, fieldset)
+        await self._mark_liked(
+            [prop for listing in listings for prop in listing.properties],
+            current_user, fieldset)
+        return ModelJSONResponse({
             "listings": listings,
             "results": count,
-        }
+        }, headers=headers)
 
-    async def viewed_property(self, property_id: int) -> None:
-        """Viewed property"""
-        return await self.property_repository.viewed_property(property_id)
+    async def viewed_property(
+            self,
+            property_id: int,
+            visitor: str,
+            ) -> None:
+        """
+        Counts a view of the property and its visitor. Views are buffered
+        in Redis and applied in batches by the `flush_property_views` task,
+        written through only when Redis is not configured.
+        """
+        redis = get_redis()
+        if redis is None:
+            await self.property_repository.add_views({property_id: 1})
+            views.record_unique_local(property_id, visitor)
+        else:
+            await views.record_view(redis, property_id, visitor)
+        search_index = columnar.get_search_index()
+        if search_index is not None:
+            search_index.viewed(property_id)
+
+    async def get_view_stats(
+            self,
+            property_id: int,
+            days: int,
+            ) -> dict:
+        """Get estimated unique visitors of the property"""
+        if not 1 <= days <= Settings.UNIQUE_VIEWS_DAYS:
+            raise exceptions.InvalidViewStatsPeriod
+        redis = get_redis()
+        if redis is None:
+            return views.get_unique_views_local(property_id, days)
+        return await views.get_unique_views(redis, property_id, days)
 
     async def get_favorites_ids(
             self,
@@ -159,6 +560,75 @@ class PropertyService:
         """Get favorite properties"""
         return await self.property_repository.get_favorites_ids(user_id)
 
+    async def get_favorites_page(
+            self,
+            current_user: TokenData,
+            elements: int,
+            cursor: str | None = None,
+            ids_only: bool = False,
+            fields: str | None = None,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get a page of the user's favorites, most recently liked first.
+        `ids_only` skips loading the properties, `fields` loads only the
+        requested ones. Answers 304 like `get_properties_page`.
+        """
+        fieldset = cards.parse_fields(fields)
+        rows = await self.property_repository.get_favorites_keys(
+            current_user.user_id, elements, cursor)
+        count = await self.property_repository.get_favorites_count(
+            current_user.user_id)
+        page = {
+            "results": count,
+            "next_cursor": pagination.next_likes_cursor(rows, elements),
+        }
+        ids = [row.property_id for row in rows]
+
+        versions = await self.property_repository.get_versions(ids)
+        headers = self._page_headers(
+            versions, current_user, ids, count, ids_only, fields)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        if ids_only:
+            return ModelJSONResponse({"ids": ids, **page}, headers=headers)
+
+        properties = await self.property_repository.get_properties_by_ids(
+            ids, fields=fieldset)
+        if fieldset is None or cards.IS_LIKED in fieldset:
+            for prop in properties:
+                prop.is_liked = True
+        return ModelJSONResponse({"properties": properties, **page}, headers=headers)
+
+    async def _mark_liked(
+            self,
+            properties: Sequence[PropertyCard | SparseProperty],
+            current_user: TokenData | None,
+            fields: frozenset[str] | None = None,
+            ) -> None:
+        """
+        Sets `is_liked` on the properties, checked against the cached set
+        of the user's likes in one batch. Always False for anonymous users.
+        Skipped when `fields` are requested without it.
+        """
+        if fields is not None and cards.IS_LIKED not in fields:
+            return
+        if current_user is None:
+            for prop in properties:
+                prop.is_liked = False
+            return
+
+        ids = [prop.id for prop in properties]
+        user_id = current_user.user_id
+        load = partial(self.property_repository.get_favorites_ids, user_id)
+        redis = get_redis()
+        if redis is None:
+            liked = await likes.get_liked_local(user_id, ids, load)
+        else:
+            liked = await likes.get_liked(redis, user_id, ids, load)
+        for prop, is_liked in zip(properties, liked):
+            prop.is_liked = is_liked
+
     async def create_property(
             self,
             schema: CreatePropertySchema,
@@ -332,14 +802,39 @@ class PropertyService:
             property_id: int,
             user_id: int,
             ) -> dict:
-        """Like property"""
-        user = await self.user_repository.get_or_401(user_id)
-        property_obj = await self.property_repository.get_or_404(property_id)
-        liked = await self.property_repository.get_like(user_id, property_id)
+        """Like property, or unlike it when already liked"""
+        row = await self.property_repository.toggle_like(property_id, user_id)
+        return await self._liked_response(property_id, user_id, row)
 
+    async def set_like(
+            self,
+            property_id: int,
+            user_id: int,
+            liked: bool,
+            ) -> dict:
+        """Like or unlike property, repeating it changes nothing"""
         if liked:
-            await self.property_repository.unlike_property(property_obj.id, user.id)
-            return {"detail": "Property unliked successfully"}
+            row = await self.property_repository.like_property(property_id, user_id)
+        else:
+            row = await self.property_repository.unlike_property(property_id, user_id)
+        return await self._liked_response(property_id, user_id, row)
 
-        await self.property_repository.like_property(property_obj.id, user.id)
-        return {"detail": "Property liked successfully"}
+    async def _liked_response(
+            self,
+            property_id: int,
+            user_id: int,
+            row: Row,
+            ) -> dict:
+        """
+        Drops the user's cached likes, scores a new like as trending and
+        describes the like state
+        """
+        redis = get_redis()
+        await likes.invalidate(redis, user_id)
+        if row.added and redis is not None:
+            await trending.record_event(redis, property_id, trending.LIKE_WEIGHT)
+        return {
+            "detail": f"Property {'liked' if row.liked else 'unliked'} successfully",
+            "liked": row.liked,
+            "likes_count": row.likes_count,
+        }
@@ -0,0 +1,165 @@
+"""
+Module with the time-decayed trending leaderboard of properties.
+
+Scores use forward decay: an event of weight `w` at time `t` adds
+`w * 2 ** ((t - epoch) / half_life)`, so older events weigh exponentially
+less without touching the stored scores. The `refresh_trending` task moves
+the epoch forward, scaling every score down, before they grow too large.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterable
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from src.config import Settings
+
+TRENDING_KEY = "property:trending"
+# Time the scores are relative to, unix seconds
+EPOCH_KEY = "property:trending:epoch"
+# Creation time of the newest property given its listing score
+SEEDED_KEY = "property:trending:seeded"
+# Names of the per-city leaderboards
+CITY_KEYS = "property:trending:cities"
+
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 5.0
+# A new listing starts as if it had this many views
+LISTING_WEIGHT = 20.0
+
+# KEYS: epoch, leaderboard; ARGV: event time, half life, weight, member
+INCREMENT_SCRIPT = """
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    epoch = tonumber(ARGV[1])
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+local increment = tonumber(ARGV[3]) * 2 ^ ((tonumber(ARGV[1]) - epoch) / tonumber(ARGV[2]))
+return redis.call('ZINCRBY', KEYS[2], tostring(increment), ARGV[4])
+"""
+
+# KEYS: epoch, leaderboard; ARGV: new epoch, half life, min score, max size
+RESCALE_SCRIPT = """
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    return 0
+end
+local factor = 2 ^ ((epoch - tonumber(ARGV[1])) / tonumber(ARGV[2]))
+redis.call('ZUNIONSTORE', KEYS[2], 1, KEYS[2], 'WEIGHTS', tostring(factor))
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[3])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[4]) - 1)
+redis.call('SET', KEYS[1], ARGV[1])
+return redis.call('ZCARD', KEYS[2])
+"""
+
+
+def city_key(city_id: int) -> str:
+    """Key of the leaderboard of a city"""
+    return f"{TRENDING_KEY}:city:{city_id}"
+
+
+def _half_life() -> float:
+    return Settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+
+def _timestamp(value: datetime) -> float:
+    """Unix time of a database timestamp, naive ones are UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+async def record_event(
+        redis: AsyncRedis,
+        property_id: int,
+        weight: float,
+        ) -> None:
+    """Adds an event of the property happening now, `redis` may be a pipeline"""
+    await redis.register_script(INCREMENT_SCRIPT)(
+        keys=[EPOCH_KEY, TRENDING_KEY],
+        args=[time.time(), _half_life(), weight, property_id],
+    )
+
+
+async def get_top(
+        redis: AsyncRedis,
+        limit: int,
+        offset: int,
+        city_id: int | None = None,
+        ) -> list[int]:
+    """Ids of a page of the leaderboard, all cities or one"""
+    key = TRENDING_KEY if city_id is None else city_key(city_id)
+    ids = await redis.zrevrange(key, offset, offset + limit - 1)
+    return [int(id) for id in ids]
+
+
+def rescale(redis: Redis) -> int:
+    """
+    Moves the epoch to now, scaling every score, and drops the scores too
+    small to matter. Returns the leaderboard size.
+    """
+    return redis.register_script(RESCALE_SCRIPT)(
+        keys=[EPOCH_KEY, TRENDING_KEY],
+        args=[time.time(), _half_life(), Settings.TRENDING_MIN_SCORE,
+              Settings.TRENDING_MAX_SIZE],
+    )
+
+
+def seeded_since(redis: Redis) -> datetime:
+    """Creation time after which properties still need a listing score"""
+    seeded = redis.get(SEEDED_KEY)
+    if seeded is None:
+        # Older listings would have decayed below the minimum score anyway
+        seeded = time.time() - 10 * _half_life()
+    return datetime.fromtimestamp(float(seeded), timezone.utc).replace(tzinfo=None)
+
+
+def seed_listings(redis: Redis, listings: Iterable[tuple[int, datetime]]) -> None:
+    """Scores `(property_id, created_at)` listings as of their creation"""
+    increment = redis.register_script(INCREMENT_SCRIPT)
+    newest = None
+    for property_id, created_at in listings:
+        created = _timestamp(created_at)
+        increment(keys=[EPOCH_KEY, TRENDING_KEY],
+                  args=[created, _half_life(), LISTING_WEIGHT, property_id])
+        newest = max(created, newest or created)
+    if newest is not None:
+        redis.set(SEEDED_KEY, newest)
+
+
+def get_scores(redis: Redis) -> dict[int, float]:
+    """Every score of the leaderboard"""
+    return {int(id): score
+            for id, score in redis.zrange(TRENDING_KEY, 0, -1, withscores=True)}
+
+
+def rebuild_cities(
+        redis: Redis,
+        scores: dict[int, float],
+        cities: dict[int, int | None],
+        ) -> None:
+    """
+    Removes the properties missing from `cities`, no longer visible, and
+    rewrites the per-city leaderboards from the scores.
+    """
+    by_city: dict[int, dict[int, float]] = defaultdict(dict)
+    for id, score in scores.items():
+        if cities.get(id) is not None:
+            by_city[cities[id]][id] = score
+    gone = [id for id in scores if id not in cities]
+
+    keys = {city_key(city_id) for city_id in by_city}
+    stale = {key.decode() for key in redis.smembers(CITY_KEYS)} - keys
+    with redis.pipeline() as pipe:
+        if gone:
+            pipe.zrem(TRENDING_KEY, *gone)
+        for key in stale:
+            pipe.delete(key)
+            pipe.srem(CITY_KEYS, key)
+        for city_id, city_scores in by_city.items():
+            pipe.delete(city_key(city_id))
+            pipe.zadd(city_key(city_id), city_scores)
+            pipe.sadd(CITY_KEYS, city_key(city_id))
+        pipe.execute()
@@ -0,0 +1,34 @@
+"""Module contains utility functions for the property src."""
+import re
+import unicodedata
+
+# Turkish dotted/dotless i fold to a plain i regardless of case
+TURKISH_I = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+
+def fold_name(text: str) -> str:
+    """
+    Folds a place name into its lookup key: lowercase, without diacritics
+    and punctuation, single spaced. "İskele", "Iskele" and "iskele" all
+    fold to "iskele", "Gazimağusa" to "gazimagusa".
+    """
+    text = unicodedata.normalize("NFKD", text.translate(TURKISH_I))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+
+def find_city_key(address: str, keys: list[str]) -> str | None:
+    """
+    Returns the key of `keys` found as whole words earliest in the address,
+    the longest one on a tie. Addresses are written "city, neighbourhood",
+    so the first place named is taken as the city.
+    """
+    folded = f" {fold_name(address)} "
+    found = None
+    for key in keys:
+        position = folded.find(f" {key} ")
+        if position < 0:
+            continue
+        if found is None or (position, -len(key)) < (found[0], -len(found[1])):
+            found = (position, key)
+    return found[1] if found else None
@@ -0,0 +1,63 @@
+"""
+Module with the version rows conditional GETs are answered from.
+
+`updated_at` of properties, listings and agents is set by database
+triggers, which also touch the parent row when one of its child rows
+(images, info, location, building, documents; the agent's user, image
+and reviews) changes. The `(id, updated_at)` rows of the top level
+records served thus version everything serialized with them.
+"""
+from typing import Sequence
+
+from sqlalchemy import Select, select
+
+from src.listing.models import Listing
+from src.property.models import Property
+from src.user.models import Agent
+
+
+def _property_versions() -> Select:
+    """Selects `(id, updated_at, owner_id, owner_updated_at)` of properties"""
+    return (
+        select(
+            Property.id,
+            Property.updated_at,
+            Property.owner_id,
+            Agent.updated_at.label("owner_updated_at"),
+        )
+        .outerjoin(Property.owner)
+    )
+
+
+def property_versions_stmt(ids: Sequence[int]) -> Select:
+    """Selects the version rows of the properties"""
+    return _property_versions().where(Property.id.in_(ids))
+
+
+def detail_version_stmt(property_id: int) -> Select:
+    """`property_versions_stmt` of one property, with its status columns"""
+    return property_versions_stmt([property_id]).add_columns(
+        Property.is_active, Property.is_sold, Property.approved)
+
+
+def listing_versions_stmt(ids: Sequence[int]) -> Select:
+    """Selects `(id, updated_at, agent_id, agent_updated_at)` of the listings"""
+    return (
+        select(
+            Listing.id,
+            Listing.updated_at,
+            Listing.agent_id,
+            Agent.updated_at.label("agent_updated_at"),
+        )
+        .outerjoin(Listing.agent)
+        .where(Listing.id.in_(ids))
+    )
+
+
+def listing_property_versions_stmt(ids: Sequence[int]) -> Select:
+    """Selects the version rows of the properties of the listings"""
+    return (
+        _property_versions()
+        .where(Property.listing_id.in_(ids))
+        .order_by(Property.listing_id, Property.id)
+    )
@@ -0,0 +1,217 @@
+"""
+Module with the write-behind property view counter and the unique
+visitor sketches of properties
+"""
+import hashlib
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Mapping
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from sqlalchemy import Delete, Insert, Integer, Update, column, delete, func, update, values
+from sqlalchemy.dialects.postgresql import insert
+
+from src.base.hyperloglog import HyperLogLog
+from src.config import Settings
+from src.property import trending
+from src.property.models import Property, PropertySearch, ViewBatch
+
+# Hash of property id -> views not applied to the database yet
+PENDING_KEY = "property:views"
+# Views taken by a flush, deleted once applied
+FLUSHING_KEY = "property:views:flushing"
+# Field of the taken views holding the id of their batch
+BATCH_FIELD = "batch"
+# Applied batch ids are kept this long, so a batch left taken by a flush
+# that stopped after its commit is recognized by the next flushes
+VIEW_BATCHES_KEPT = timedelta(days=7)
+
+# KEYS: pending, flushing; ARGV: batch field, new batch id
+TAKE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+# KEYS: flushing; ARGV: batch field, batch id
+RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Unique visitor sketches by (property id, day), None for all time, used
+# when Redis is not configured
+local_sketches: dict[tuple[int, date | None], HyperLogLog] = {}
+
+
+def visitor_key(
+        user_id: int | None,
+        client_host: str | None,
+        user_agent: str | None,
+        ) -> str:
+    """Identifies a visitor by user id, else by a hash of the client"""
+    if user_id is not None:
+        return f"user:{user_id}"
+    fingerprint = hashlib.sha256(f"{client_host}|{user_agent}".encode())
+    return f"client:{fingerprint.hexdigest()[:32]}"
+
+
+def today() -> date:
+    """Current UTC day, the unit of daily unique views"""
+    return datetime.now(timezone.utc).date()
+
+
+def uniques_key(property_id: int, day: date | None = None) -> str:
+    """Redis key of the unique visitors sketch of the day, or all time"""
+    if day is None:
+        return f"property:uniques:{property_id}"
+    return f"property:uniques:{property_id}:{day.isoformat()}"
+
+
+async def record_view(
+        redis: AsyncRedis,
+        property_id: int,
+        visitor: str,
+        ) -> None:
+    """
+    Buffers one view of the property, adds the visitor to its all time
+    and daily sketches and scores the view as trending, in one round trip.
+    Daily sketches expire after `UNIQUE_VIEWS_DAYS`.
+    """
+    day_key = uniques_key(property_id, today())
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hincrby(PENDING_KEY, str(property_id), 1)
+        pipe.pfadd(uniques_key(property_id), visitor)
+        pipe.pfadd(day_key, visitor)
+        pipe.expire(day_key, timedelta(days=Settings.UNIQUE_VIEWS_DAYS + 1))
+        await trending.record_event(pipe, property_id, trending.VIEW_WEIGHT)
+        await pipe.execute()
+
+
+def record_unique_local(property_id: int, visitor: str) -> None:
+    """Adds the visitor to the in-process sketches of the property"""
+    day = today()
+    if (property_id, day) not in local_sketches:
+        oldest = day - timedelta(days=Settings.UNIQUE_VIEWS_DAYS)
+        for key in [key for key in local_sketches if key[1] and key[1] <= oldest]:
+            del local_sketches[key]
+    for key in ((property_id, None), (property_id, day)):
+        sketch = local_sketches.setdefault(
+            key, HyperLogLog(Settings.LOCAL_SKETCH_PRECISION))
+        sketch.add(visitor)
+
+
+def last_days(days: int) -> list[date]:
+    """The last `days` days, oldest first, ending today"""
+    end = today()
+    return [end - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+async def get_unique_views(
+        redis: AsyncRedis,
+        property_id: int,
+        days: int,
+        ) -> dict:
+    """
+    Unique visitors of all time, of each of the last days and of the
+    whole period, counted by merging the daily sketches.
+    """
+    period = last_days(days)
+    day_keys = [uniques_key(property_id, day) for day in period]
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.pfcount(uniques_key(property_id))
+        pipe.pfcount(*day_keys)
+        for key in day_keys:
+            pipe.pfcount(key)
+        total, merged, *daily = await pipe.execute()
+    return _unique_views(total, merged, zip(period, daily))
+
+
+def get_unique_views_local(property_id: int, days: int) -> dict:
+    """`get_unique_views` from the in-process sketches"""
+    period = last_days(days)
+    merged = HyperLogLog(Settings.LOCAL_SKETCH_PRECISION)
+    daily = []
+    for day in period:
+        sketch = local_sketches.get((property_id, day))
+        if sketch is not None:
+            merged.merge(sketch)
+        daily.append((day, sketch.count() if sketch else 0))
+    total = local_sketches.get((property_id, None))
+    return _unique_views(total.count() if total else 0, merged.count(), daily)
+
+
+def _unique_views(total: int, merged: int, daily) -> dict:
+    return {
+        "unique_views": total,
+        "unique_views_period": merged,
+        "daily": [{"date": day.isoformat(), "unique_views": count}
+                  for day, count in daily],
+    }
+
+
+def take_pending(redis: Redis) -> tuple[str | None, dict[int, int]]:
+    """
+    Atomically moves the pending views aside as a new batch and returns
+    its id and views. Views of a batch not released yet are returned
+    again instead, new views stay pending. `(None, {})` without views.
+    """
+    taken = redis.register_script(TAKE_SCRIPT)(
+        keys=[PENDING_KEY, FLUSHING_KEY], args=[BATCH_FIELD, uuid.uuid4().hex])
+    fields = dict(zip(taken[::2], taken[1::2]))
+    batch_id = fields.pop(BATCH_FIELD.encode(), None)
+    if batch_id is None:
+        return None, {}
+    return batch_id.decode(), {int(id): int(count) for id, count in fields.items()}
+
+
+def release_pending(redis: Redis, batch_id: str) -> None:
+    """Drops the views taken by `take_pending` once their batch is applied"""
+    redis.register_script(RELEASE_SCRIPT)(
+        keys=[FLUSHING_KEY], args=[BATCH_FIELD, batch_id])
+
+
+def record_batch_stmt(batch_id: str) -> Insert:
+    """
+    Statement recording the batch as applied, returning its id only when
+    it was not yet. A concurrent flush of the same batch waits for the
+    recording transaction and gets no row once it commits.
+    """
+    return (
+        insert(ViewBatch)
+        .values(batch_id=batch_id)
+        .on_conflict_do_nothing(index_elements=[ViewBatch.batch_id])
+        .returning(ViewBatch.batch_id)
+    )
+
+
+def prune_batches_stmt() -> Delete:
+    """Statement forgetting batches applied before `VIEW_BATCHES_KEPT`"""
+    return delete(ViewBatch).where(
+        ViewBatch.applied_at < func.now() - VIEW_BATCHES_KEPT)
+
+
+def add_views_stmts(counts: Mapping[int, int]) -> list[Update]:
+    """
+    Statements adding view counts to `Property` and `PropertySearch`,
+    each one `UPDATE ... FROM (VALUES ...)` for the whole batch.
+    """
+    batch = values(
+        column("id", Integer), column("views", Integer), name="pending",
+    ).data(sorted(counts.items()))
+    return [
+        update(Property)
+        .where(Property.id == batch.c.id)
+        .values(views=Property.views + batch.c.views),
+        update(PropertySearch)
+        .where(PropertySearch.property_id == batch.c.id)
+        .values(views=PropertySearch.views + batch.c.views),
+    ]
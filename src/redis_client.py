@@ -0,0 +1,24 @@
+from redis.asyncio import Redis
+
+from src.config import Settings
+
+# Global client, initialized later
+client: Redis | None = None
+
+async def initialize_redis():
+    """
+    Connects the Redis client when REDIS_URL is set.
+    This function should be called on application startup.
+    """
+    global client
+    if Settings.REDIS_URL:
+        client = Redis.from_url(Settings.REDIS_URL)
+
+def get_redis() -> Redis | None:
+    """Returns the Redis client, None when Redis is not configured"""
+    return client
+
+async def close_redis():
+    """Close Redis client."""
+    if client is not None:
+        await client.aclose()
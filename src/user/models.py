@@ -3,7 +3,7 @@ from typing import TYPE_CHECKING
 from sqlalchemy import Float, ForeignKey, Integer, String, Boolean
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.base.models import CustomBase, CreateTimestampMixin, ImageMixin
+from src.base.models import CreateTimestampMixin, ImageMixin, UpdateTimestampMixin
 from src.auth import utils
 
 if TYPE_CHECKING:
@@ -84,13 +84,13 @@ class UserProfileImage(ImageMixin):
     user: Mapped["User"] = relationship("User", back_populates="image")
 
 
-class Agent(CustomBase):
+class Agent(UpdateTimestampMixin):
     """Agent model."""
 
     __tablename__ = "AgentModel"
 
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("UserModel.id"), nullable=False
+        Integer, ForeignKey("UserModel.id"), nullable=False, index=True
     )
     serial_number: Mapped[str] = mapped_column(String, nullable=False)
     company: Mapped[str] = mapped_column(String, nullable=True)
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 from typing import Sequence
 
-from sqlalchemy import func
+from sqlalchemy import Row, func, literal, union_all
 from sqlalchemy.orm import joinedload
 from sqlalchemy.future import select
 
@@ -102,6 +102,27 @@ class UserRepository(BaseRepository[User]):
             raise exception
         return agent
 
+    async def get_agent_versions(
+            self,
+            agent_id: int,
+            ) -> list[Row]:
+        """
+        Get `(kind, id, updated_at)` versions of the agent and its properties
+        and listings, the agent first. Empty if there is no such agent.
+        """
+        result = await self.session.execute(
+            union_all(
+                select(literal(0).label("kind"), Agent.id, Agent.updated_at)
+                .where(Agent.id == agent_id),
+                select(literal(1), Property.id, Property.updated_at)
+                .where(Property.owner_id == agent_id),
+                select(literal(2), Listing.id, Listing.updated_at)
+                .where(Listing.agent_id == agent_id),
+            )
+            .order_by("kind", "id")
+        )
+        return result.all()
+
     async def get_agent_by_or_404(
             self,
             **kwargs,
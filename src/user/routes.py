@@ -1,5 +1,7 @@
 """User routes module."""
-from fastapi import Depends, APIRouter, File, UploadFile
+from typing import Optional
+
+from fastapi import Depends, APIRouter, File, UploadFile, Header
 
 from src.user.service import UserService
 from src.user.dependencies import get_user_service
@@ -35,10 +37,11 @@ async def get_user(
 @router.get("/agent/{agent_id}")
 async def get_agent(
     agent_id: int,
+    if_none_match: Optional[str] = Header(None),
     user_service: UserService = Depends(get_user_service)
     ):
-    return await user_service.user_repository.get_agent_by(
-        id=agent_id,
+    return await user_service.get_agent(
+        agent_id, if_none_match,
         )
 
 @router.get("/page/agents")
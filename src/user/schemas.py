@@ -34,3 +34,12 @@ class ReviewSchema(BaseModel):
     agent_id: int
     rating: int
     comment: Optional[str] = None
+
+class AgentCard(BaseModel):
+    id: int
+    user_id: int
+    name: str
+    email: str
+    phone: Optional[str] = None
+    company: Optional[str] = None
+    image_url: Optional[str] = None
@@ -2,7 +2,10 @@ from dataclasses import dataclass
 from typing import Sequence
 
 from fastapi import UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 
+from src.base.responses import etag_matches, not_modified, version_headers
 from src.base.utils import send_email
 from src.auth import exceptions
 from src.user.repository import UserRepository
@@ -31,6 +34,24 @@ class UserService:
         user = await self.user_repository.get_or_401(id)
         return user.dict()
 
+    async def get_agent(
+            self,
+            agent_id: int,
+            if_none_match: str | None = None,
+            ) -> Response:
+        """
+        Get agent with their properties and listings. Answers 304 from
+        their versions when the entity tag matches.
+        """
+        versions = await self.user_repository.get_agent_versions(agent_id)
+        if not versions:
+            raise exceptions.AgentNotFound
+        headers = version_headers(versions)
+        if etag_matches(headers["ETag"], if_none_match):
+            return not_modified(headers)
+        agent = await self.user_repository.get_agent_by_or_404(id=agent_id)
+        return JSONResponse(jsonable_encoder(agent), headers=headers)
+
     async def get_agents_page(
             self,
             page: int,
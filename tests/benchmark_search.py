@@ -0,0 +1,78 @@
+"""
+Compares property search latency of the SQL and the columnar backends.
+
+Run against a populated database:
+
+    python -m tests.benchmark_search [repeats]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import src.main  # noqa: F401 - configures every mapper
+from src.config import Settings
+from src.property.columnar import ColumnarIndex
+from src.property.filters import apply_filters
+from src.property.models import PropertySearch
+from src.property.pagination import order_page
+from src.property.repository import PropertyRepository
+from src.property.schemas import SearchPropertySchema
+
+from .test_columnar_search import SEARCHES
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1000
+    p95 = timings[int(len(timings) * 0.95)] * 1000
+    print(f"  {name:<9} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms")
+
+
+async def main(repeats: int) -> None:
+    engine = create_async_engine(Settings.DATABASE_URL)
+    async with AsyncSession(engine) as session:
+        repository = PropertyRepository(session, None)
+
+        start = time.perf_counter()
+        index = await ColumnarIndex.load(session)
+        print(f"loaded {len(index)} properties in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+        for params in SEARCHES:
+            schema = SearchPropertySchema(**params)
+            filters = schema.get_filters()
+            offset = (schema.page - 1) * schema.elements
+            sql, numpy = [], []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                await repository._get_counted_ids(
+                    page_stmt(filters, schema, offset),
+                    lambda: repository.get_properties_count_filtered(filters))
+                sql.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                index.search(filters, schema.sort, schema.elements, offset)
+                numpy.append(time.perf_counter() - start)
+
+            print(params or "{}")
+            report("sql", sql)
+            report("columnar", numpy)
+    await engine.dispose()
+
+
+def page_stmt(
+        filters: list[tuple],
+        schema: SearchPropertySchema,
+        offset: int,
+        ) -> Select:
+    """The id page statement of the SQL backend, without hydration"""
+    return order_page(
+        apply_filters(select(PropertySearch.property_id), filters), schema.sort
+    ).limit(schema.elements).offset(offset)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from src.base.responses import ModelJSONResponse
+from src.property import cards
+from src.property.exceptions import InvalidFields
+from src.property.schemas import (BuildingDetail, InfoCard, InfoDetail,
+                                  LocationCard, PropertyCard, PropertyDetail)
+from src.user.schemas import AgentCard
+
+NESTED = {"location": LocationCard, "info": InfoCard, "owner": AgentCard}
+LOADED = {"images", "documents", "is_liked"}
+
+
+def field_paths(model, nested) -> set[str]:
+    paths = set()
+    for name in model.model_fields:
+        if name in nested:
+            paths |= {f"{name}.{field}" for field in nested[name].model_fields}
+        elif name not in LOADED:
+            paths.add(name)
+    return paths
+
+
+def test_card_fields_cover_every_card_field():
+    assert (field_paths(PropertyCard, NESTED) - {"owner.image_url"}
+            == set(cards.CARD_FIELDS))
+
+
+def test_detail_fields_cover_every_detail_field():
+    nested = {**NESTED, "info": InfoDetail, "building": BuildingDetail}
+    assert field_paths(PropertyDetail, nested) == set(cards.DETAIL_FIELDS)
+
+
+def test_parse_fields_expands_groups_and_keeps_id():
+    fields = cards.parse_fields("price, building,is_liked")
+    assert fields == {"id", "price", "is_liked"} | {
+        f"building.{name}" for name in BuildingDetail.model_fields}
+    assert cards.parse_fields(None) is None
+    with pytest.raises(InvalidFields):
+        cards.parse_fields("price,password")
+
+
+def test_fields_stmt_joins_only_requested_relationships():
+    sql = str(cards.fields_stmt(cards.parse_fields("price,info.bedrooms")))
+    assert '"PropertyInfoModel"' in sql
+    assert '"PropertyLocationModel"' not in sql and '"UserModel"' not in sql
+    sql = str(cards.fields_stmt(cards.parse_fields("owner.name")))
+    assert '"AgentModel"' in sql and '"UserModel"' in sql
+    assert '"PropertyInfoModel"' not in sql
+
+
+def test_card_response_is_plain_json():
+    card = PropertyCard(
+        id=1, title="Flat", price=1000.0, currency="$", owner_id=2,
+        location=LocationCard(address="Girne"), info=InfoCard(rooms=2),
+        images=["a.jpg"], is_liked=True)
+    body = json.loads(ModelJSONResponse({"properties": [card], "results": 1}).body)
+    assert body["properties"][0]["location"] == {
+        "address": "Girne", "latitude": None, "longitude": None}
+    assert body["properties"][0]["images"] == ["a.jpg"]
+    assert body["properties"][0]["is_liked"] is True
@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.property.clustering import (
+    MapPoints, clusters_by_tile, points_by_tile, tile_bounds, tiles_in)
+
+
+def make_points(coordinates, prices):
+    latitude, longitude = zip(*coordinates)
+    return MapPoints(
+        ids=np.arange(1, len(prices) + 1),
+        latitude=np.array(latitude, dtype=float),
+        longitude=np.array(longitude, dtype=float),
+        price=np.array(prices, dtype=float),
+    )
+
+
+def test_tiles_in():
+    assert tiles_in((-180, -85, 180, 85), 1) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    west, south, east, north = tile_bounds(10, 600, 400)
+    assert tiles_in((west + 1e-6, south + 1e-6, east - 1e-6, north - 1e-6), 10) == [(600, 400)]
+
+
+def test_clusters_by_tile():
+    points = make_points(
+        [(35.33, 33.31), (35.3301, 33.3101), (35.0, 34.0)], [100, 300, 50])
+    tiles = clusters_by_tile(points, 8)
+    clusters = [cluster for items in tiles.values() for cluster in items]
+    assert sum(cluster["count"] for cluster in clusters) == len(points)
+
+    pair = next(cluster for cluster in clusters if cluster["count"] == 2)
+    assert (pair["min_price"], pair["max_price"]) == (100, 300)
+    assert "property_id" not in pair
+    single = next(cluster for cluster in clusters if cluster["count"] == 1)
+    assert single["property_id"] == 3
+
+    # The same pins are found in the same tiles when not clustered
+    assert points_by_tile(points, 8).keys() == tiles.keys()
+    assert clusters_by_tile(MapPoints(*(np.empty(0),) * 4), 8) == {}
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import src.main  # noqa: F401 - configures every mapper
+from src.config import Settings
+from src.property import pagination
+from src.property.columnar import ColumnarIndex, read_current_version
+from src.property.repository import PropertyRepository
+from src.property.schemas import SearchPropertySchema
+from src.property.service import PropertyService
+
+
+SEARCHES = [
+    {},
+    {"sort": "oldest"},
+    {"sort": "cheapest", "page": "3"},
+    {"sort": "expensive"},
+    {"sort": "popular"},
+    {"category": "Apartment", "roomNumber": "1,2"},
+    {"priceRangeMin": "50000", "priceRangeMax": "300000", "notFirstFloor": "true"},
+    {"notLastFloor": "true", "elevator": "true", "sort": "cheapest"},
+    {"lastFloor": "true", "areaFrom": "40"},
+    {"city": "girne"},
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", SEARCHES)
+async def test_columnar_search_matches_sql(params):
+    engine = create_async_engine(Settings.DATABASE_URL)
+    try:
+        async with AsyncSession(engine) as session:
+            repository = PropertyRepository(session, None)
+            index = await ColumnarIndex.load(session)
+
+            schema = SearchPropertySchema(elements=7, **params)
+            filters = schema.get_filters()
+            offset = (schema.page - 1) * schema.elements
+
+            page, count = await repository.get_properties_page_counted(
+                schema.elements, offset, filters, schema.sort)
+            ids, columnar_count = index.search(
+                filters, schema.sort, schema.elements, offset)
+            assert ids == [prop.id for prop in page]
+            assert columnar_count == await repository.get_properties_count_filtered(
+                filters)
+
+            cursor = pagination.next_cursor(schema.sort, page, schema.elements)
+            if cursor:
+                page = await repository.get_properties_page(
+                    schema.elements, 0, filters, schema.sort, cursor)
+                ids, _ = index.search(
+                    filters, schema.sort, schema.elements, cursor=cursor)
+                assert ids == [prop.id for prop in page]
+
+            locations = await repository.get_map_locations(filters)
+            assert ([pin["property_id"] for pin in index.locations(filters)]
+                    == [location.property_id for location in locations])
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_area_filter_includes_its_cities():
+    engine = create_async_engine(Settings.DATABASE_URL)
+    try:
+        async with AsyncSession(engine) as session:
+            repository = PropertyRepository(session, None)
+            index = await ColumnarIndex.load(session)
+            service = PropertyService(repository, None)
+
+            filters = await service._get_filters(SearchPropertySchema(city="Kyrenia"))
+            city_ids = await repository.get_city_ids("Girne")
+            assert filters == [(city_ids, "city_id", "in")]
+            assert await repository.get_city_id("Alsancak") in city_ids
+            assert await repository.get_city_ids("Alsancak") == [
+                await repository.get_city_id("Alsancak")]
+
+            count = await repository.get_properties_count_filtered(filters)
+            assert count == sum([
+                await repository.get_properties_count_filtered(
+                    [(city_id, "city_id", "==")])
+                for city_id in city_ids
+            ])
+            assert index.search(filters, "newest", 1, 0)[1] == count
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_columnar_snapshot_round_trip(tmp_path):
+    engine = create_async_engine(Settings.DATABASE_URL)
+    try:
+        async with AsyncSession(engine) as session:
+            index = await ColumnarIndex.load(session)
+    finally:
+        await engine.dispose()
+
+    assert ColumnarIndex.open_snapshot(str(tmp_path)) is None
+    first = index.save_snapshot(str(tmp_path))
+    snapshot = ColumnarIndex.open_snapshot(str(tmp_path))
+    assert snapshot.version == first
+    assert isinstance(snapshot.columns["price"], np.memmap)
+    assert len(snapshot) == len(index)
+
+    for params in SEARCHES:
+        schema = SearchPropertySchema(**params)
+        filters = schema.get_filters()
+        assert (snapshot.search(filters, schema.sort, 10)
+                == index.search(filters, schema.sort, 10))
+        assert snapshot.locations(filters) == index.locations(filters)
+
+    # Mapped arrays are read-only, updates work on private copies
+    property_id = next(iter(snapshot.positions))
+    snapshot.viewed(property_id)
+    snapshot.remove([property_id])
+    assert property_id not in snapshot.positions
+
+    index.save_snapshot(str(tmp_path))
+    third = index.save_snapshot(str(tmp_path))
+    assert read_current_version(str(tmp_path)) == third
+    assert first not in {path.name for path in tmp_path.iterdir()}
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import src.main  # noqa: F401 - configures every mapper
+from src.config import Settings
+from src.property.facets import FLAG_FACETS, GROUPED_FACETS
+from src.property.repository import PropertyRepository
+from src.property.schemas import MapSearchSchema
+
+
+SEARCHES = [
+    {},
+    {"category": "Villa"},
+    {"roomNumber": "1,2", "gym": "true", "priceRangeMax": "400000"},
+    {"installment": "true", "notFirstFloor": "true"},
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", SEARCHES)
+async def test_facet_counts_match_toggled_searches(params):
+    engine = create_async_engine(Settings.DATABASE_URL)
+    try:
+        async with AsyncSession(engine) as session:
+            repository = PropertyRepository(session, None)
+            filters = MapSearchSchema(**params).get_filters()
+            counts = await repository.get_facet_counts(filters)
+
+            async def toggled(path: str, value, op: str) -> int:
+                own = [f for f in filters if f[1] != path]
+                return await repository.get_properties_count_filtered(
+                    own + [(value, path, op)])
+
+            assert counts["results"] == await repository.get_properties_count_filtered(
+                filters)
+            for field, path in GROUPED_FACETS:
+                for facet in counts["facets"][field]:
+                    value = facet["value"]
+                    if field == "city":
+                        value = await repository.get_city_id(value)
+                    assert facet["count"] == await toggled(path, value, "==")
+            for field, path in FLAG_FACETS:
+                assert counts["facets"][field] == await toggled(path, True, "==")
+    finally:
+        await engine.dispose()
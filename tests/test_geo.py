@@ -0,0 +1,72 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from src.property.exceptions import InvalidPolygon
+from src.property.geo import (
+    CELLS_PER_DEGREE, EARTH_RADIUS_KM, cell_of, cell_ranges, points_in_polygon,
+    polygon_bbox, radius_bbox)
+from src.property.schemas import MapSearchSchema
+
+
+def destination(latitude, longitude, distance_km, bearing):
+    """Point reached going `distance_km` from the point along the bearing"""
+    angle = distance_km / EARTH_RADIUS_KM
+    lat, lon, bearing = map(math.radians, (latitude, longitude, bearing))
+    end = math.asin(math.sin(lat) * math.cos(angle)
+                    + math.cos(lat) * math.sin(angle) * math.cos(bearing))
+    end_lon = lon + math.atan2(math.sin(bearing) * math.sin(angle) * math.cos(lat),
+                               math.cos(angle) - math.sin(lat) * math.sin(end))
+    return math.degrees(end), math.degrees(end_lon)
+
+
+def test_cell_ranges_cover_bbox():
+    bbox = (33.31, 35.12, 33.47, 35.29)
+    ranges = cell_ranges(bbox)
+    assert len(ranges) == 18
+    step = 1 / CELLS_PER_DEGREE / 3
+    for i in range(int((bbox[3] - bbox[1]) / step) + 1):
+        for j in range(int((bbox[2] - bbox[0]) / step) + 1):
+            cell = cell_of(bbox[1] + i * step, bbox[0] + j * step)
+            assert any(low <= cell <= high for low, high in ranges)
+    assert not any(low <= cell_of(35.2, 33.5) <= high for low, high in ranges)
+    # Tall viewports fall back to one range
+    assert len(cell_ranges((33.0, 34.0, 34.0, 36.0))) == 1
+    assert cell_of(90, 180) == cell_of(89.999, 179.999)
+
+
+def test_radius_bbox_holds_circle():
+    for latitude, longitude in ((35.2, 33.4), (-60.0, 10.0), (0.0, 0.0)):
+        west, south, east, north = radius_bbox(latitude, longitude, 25)
+        for bearing in range(0, 360, 5):
+            lat, lon = destination(latitude, longitude, 25, bearing)
+            assert south - 1e-9 <= lat <= north + 1e-9
+            assert west - 1e-9 <= lon <= east + 1e-9
+    assert radius_bbox(89.9, 0.0, 50)[::2] == (-180.0, 180.0)
+
+
+def test_points_in_polygon():
+    # A "U" shape, its notch is outside
+    ring = MapSearchSchema(polygon=json.dumps(
+        [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3], [0, 0]]
+    )).get_polygon()
+    assert len(ring) == 8
+    assert polygon_bbox(ring) == (0.0, 0.0, 3.0, 3.0)
+    longitude = np.array([0.5, 1.5, 2.5, 1.5, 3.5, 0.5])
+    latitude = np.array([2.5, 2.5, 2.5, 0.5, 0.5, -0.5])
+    assert points_in_polygon(latitude, longitude, ring).tolist() == [
+        True, False, True, True, False, False]
+
+
+@pytest.mark.parametrize("polygon", [
+    "[[0, 0], [1, 1], [0, 0]]",
+    "[[0, 0], [1, 1], [200, 0]]",
+    '{"type": "Polygon"}',
+    "[[0, 0, 0], [1, 1, 1], [1, 0, 1]]",
+    "not json",
+])
+def test_invalid_polygon(polygon):
+    with pytest.raises(InvalidPolygon):
+        MapSearchSchema(polygon=polygon).get_polygon()
@@ -0,0 +1,29 @@
+import pytest
+
+from src.base.hyperloglog import HyperLogLog
+
+
+@pytest.mark.parametrize("count", [0, 1, 100, 5000, 200000])
+def test_count_within_error(count):
+    sketch = HyperLogLog(precision=12)
+    for i in range(count):
+        sketch.add(f"user:{i}")
+    # Repeated items do not count
+    for i in range(min(count, 1000)):
+        assert not sketch.add(f"user:{i}")
+    # Four standard errors of 1.04 / sqrt(4096)
+    assert abs(sketch.count() - count) <= 0.065 * count
+
+
+def test_merge_is_union():
+    first, second = HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        first.add(str(i))
+    for i in range(20000, 60000):
+        second.add(str(i))
+    first.merge(second)
+    assert abs(first.count() - 60000) <= 0.02 * 60000
+    assert first.registers.nbytes == 1 << 14
+
+    with pytest.raises(ValueError):
+        first.merge(HyperLogLog(precision=10))
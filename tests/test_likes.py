@@ -0,0 +1,37 @@
+import pytest
+
+from src.property import likes
+
+
+@pytest.mark.asyncio
+async def test_local_liked_set_is_loaded_once_until_invalidated():
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return [9, 3, 5]
+
+    likes.local_liked.clear()
+    assert await likes.get_liked_local(1, [3, 4, 9], load) == [True, False, True]
+    assert await likes.get_liked_local(1, [5], load) == [True]
+    assert len(loads) == 1
+
+    await likes.invalidate(None, 1)
+    assert await likes.get_liked_local(1, [4], load) == [False]
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_liked_set_loaded_across_an_invalidation_is_not_cached():
+    liked = [3]
+
+    async def load():
+        loaded = list(liked)
+        # The user likes another property while the set is being read
+        liked.append(4)
+        await likes.invalidate(None, 2)
+        return loaded
+
+    likes.local_liked.clear()
+    assert await likes.get_liked_local(2, [3, 4], load) == [True, False]
+    assert likes.local_liked.get(2) is None
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.property import pins
+from src.property.clustering import MapPoints
+
+
+def test_pins_round_trip():
+    points = MapPoints(
+        ids=np.array([7, 3, 12]),
+        latitude=np.array([35.3401234, 35.1, -12.5]),
+        longitude=np.array([33.3199999, -179.9, 150.25]),
+        price=np.array([250000.0, 500.0, np.nan]),
+    )
+    message = pins.encode_points(points)
+    assert len(message) == pins.HEADER.size + 13 * len(points)
+
+    decoded = pins.decode(message)
+    # Ordered by latitude
+    assert decoded["property_id"].tolist() == [12, 3, 7]
+    assert np.allclose(decoded["latitude"], [-12.5, 35.1, 35.3401234], atol=1e-6)
+    assert np.allclose(decoded["longitude"], [150.25, -179.9, 33.3199999], atol=1e-6)
+    assert "count" not in decoded
+    low = pins.PRICE_BUCKET_BASE * 2 ** (
+        decoded["price_bucket"][2] / pins.PRICE_BUCKETS_PER_DOUBLING)
+    assert low <= 250000 < low * 2 ** (1 / pins.PRICE_BUCKETS_PER_DOUBLING)
+    assert decoded["price_bucket"][:2].tolist() == [0, 0]
+
+
+def test_clusters_round_trip():
+    items = [
+        {"count": 4, "latitude": 35.2, "longitude": 33.1,
+         "min_price": 1000.0, "max_price": 9000.0},
+        {"count": 1, "latitude": 35.0, "longitude": 33.5,
+         "min_price": 2000.0, "max_price": 2000.0, "property_id": 42},
+    ]
+    decoded = pins.decode(pins.encode_items(items, clustered=True))
+    assert decoded["count"].tolist() == [1, 4]
+    assert decoded["property_id"].tolist() == [42, 0]
+    assert decoded["price_bucket"].tolist() == [8, 0]
+
+
+def test_accepts_pins():
+    assert pins.accepts_pins(f"{pins.MEDIA_TYPE}, application/json;q=0.5")
+    assert pins.accepts_pins(f"application/json;q=0.5,{pins.MEDIA_TYPE};q=1")
+    assert not pins.accepts_pins("application/json")
+    assert not pins.accepts_pins(None)
@@ -50,6 +50,23 @@ async def test_property_search_2():
     print(response.json())
     assert response.status_code == 200
 
+@pytest.mark.asyncio
+async def test_property_facets():
+    params = {
+        "category": "Apartment",
+        "gym": "true",
+    }
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            "http://localhost:5001/api/v1/property/facets",
+            params=params,
+        )
+
+    print("TEST PROPERTY FACETS")
+    print(response.json())
+    assert response.status_code == 200
+    assert set(response.json()["facets"]) >= {"roomNumber", "category", "city", "gym"}
+
 @pytest.mark.asyncio
 async def test_property_search_by_id():
     property_id = 19
@@ -143,6 +160,94 @@ async def test_filtering_properties_2():
     print(response.json())
     assert response.status_code == 200
 
+@pytest.mark.asyncio
+async def test_filtering_properties_joined():
+    params = {
+        "page": "1",
+        "elements": "10",
+        "roomNumber": "1,2,3",
+        "notLastFloor": "true",
+        "elevator": "true",
+        "parkingSlot": "false",
+        "year": "2020",
+    }
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            "http://localhost:5001/api/v1/property/",
+            params=params
+        )
+
+    print("TEST FILTERING PROPERTIES JOINED")
+    print(response.json())
+    assert response.status_code == 200
+    assert len(response.json()["properties"]) <= response.json()["results"]
+
+@pytest.mark.asyncio
+async def test_property_search_cursor():
+    params = {
+        "elements": "5",
+        "sort": "cheapest",
+    }
+
+    async with httpx.AsyncClient() as client:
+        first = await client.get(
+            "http://localhost:5001/api/v1/property/",
+            params=params
+        )
+        cursor = first.json()["next_cursor"]
+        second = await client.get(
+            "http://localhost:5001/api/v1/property/",
+            params={**params, "cursor": cursor} if cursor else params
+        )
+
+    print("TEST PROPERTY SEARCH CURSOR")
+    print(second.json())
+    assert first.status_code == 200
+    assert second.status_code == 200
+    if cursor:
+        first_ids = {prop["id"] for prop in first.json()["properties"]}
+        assert not first_ids & {prop["id"] for prop in second.json()["properties"]}
+
+@pytest.mark.asyncio
+async def test_property_search_invalid_cursor():
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            "http://localhost:5001/api/v1/property/",
+            params={"cursor": "invalid"}
+        )
+
+    print("TEST PROPERTY SEARCH INVALID CURSOR")
+    print(response.json())
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_favorites_cursor():
+    cookies = agent_response.cookies
+    headers = {"Authorization": f"Bearer {cookies['access_token']}"}
+
+    async with httpx.AsyncClient() as client:
+        first = await client.get(
+            "http://localhost:5001/api/v1/property/fav",
+            params={"elements": "2", "ids_only": "true"},
+            headers=headers
+        )
+        cursor = first.json()["next_cursor"]
+        second = await client.get(
+            "http://localhost:5001/api/v1/property/fav",
+            params={"elements": "2", "ids_only": "true", "cursor": cursor}
+            if cursor else {"elements": "2", "ids_only": "true"},
+            headers=headers
+        )
+
+    print("TEST FAVORITES CURSOR")
+    print(second.json())
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert len(first.json()["ids"]) <= first.json()["results"]
+    if cursor:
+        assert not set(first.json()["ids"]) & set(second.json()["ids"])
+
 @pytest.mark.asyncio
 async def test_map():
     async with httpx.AsyncClient() as client:
@@ -169,6 +274,26 @@ async def test_listings():
     print("TEST LISTINGS")
     assert response.status_code == 200
 
+@pytest.mark.asyncio
+async def test_listings_sparse_is_liked():
+    cookies = client_response.cookies
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            "http://localhost:5001/api/v1/listing/page",
+            params={
+                "page": 1,
+                "elements": 10,
+                "fields": "id,is_liked"
+            },
+            headers={"Authorization": f"Bearer {cookies['access_token']}"}
+        )
+
+    print("TEST LISTINGS SPARSE IS_LIKED")
+    assert response.status_code == 200
+    for listing in response.json()["listings"]:
+        for prop in listing["properties"]:
+            assert set(prop) == {"id", "is_liked"}
+
 @pytest.mark.asyncio
 async def test_listings_creation():
     files = generate_images_as_bytes(5)
@@ -0,0 +1,18 @@
+from src.property.utils import find_city_key, fold_name
+
+
+def test_fold_name():
+    assert fold_name("İskele") == fold_name("Iskele") == fold_name("ıskele") == "iskele"
+    assert fold_name("Gazimağusa") == "gazimagusa"
+    assert fold_name("  Yeni   Erenköy, ") == "yeni erenkoy"
+    assert fold_name("LEFKOŞA") == "lefkosa"
+
+
+def test_find_city_key():
+    keys = ["girne", "kyrenia", "alsancak", "erenkoy", "yeni erenkoy"]
+    assert find_city_key("Kyrenia harbour", keys) == "kyrenia"
+    # The first place named wins, then the longest key
+    assert find_city_key("Girne, Alsancak", keys) == "girne"
+    assert find_city_key("Yeni Erenköy beach", keys) == "yeni erenkoy"
+    # Whole words only
+    assert find_city_key("Girnes road", keys) is None
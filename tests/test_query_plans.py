@@ -0,0 +1,174 @@
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.sql import Executable
+
+import src.main  # noqa: F401 - configures every mapper
+from src.config import Settings
+from src.property.pagination import next_likes_cursor
+from src.property.repository import PropertyRepository
+from src.property.schemas import SearchPropertySchema
+
+
+# Tables that must never be read with a sequential scan
+BIG_TABLES = {
+    "PropertyModel",
+    "PropertyInfoModel",
+    "PropertyLocationModel",
+    "PropertyBuildingModel",
+    "PropertyImageModel",
+    "PropertyLikeModel",
+    "PropertySearchModel",
+}
+
+SEARCHES = [
+    {},
+    {"sort": "cheapest"},
+    {"sort": "popular"},
+    {"category": "Apartment", "roomNumber": "1,2"},
+    {"priceRangeMax": "100000", "notLastFloor": "true", "elevator": "true"},
+    {"city": "Girne"},
+    {"q": "girne villa", "sort": "relevance"},
+]
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """Relations of the big tables read by a Seq Scan anywhere in the plan"""
+    found = []
+    if plan["Node Type"] == "Seq Scan" and plan.get("Relation Name") in BIG_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain_repository_queries(run) -> dict[str, list[str]]:
+    """
+    Runs `run(repository)`, then EXPLAINs every statement it executed with
+    sequential scans disabled, so a Seq Scan in the plan means no index can
+    serve the query. Returns statements mapped to the offending tables.
+    """
+    engine = create_async_engine(Settings.DATABASE_URL)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("EXPLAIN", "SET")):
+            statements.append((statement, parameters))
+
+    try:
+        async with AsyncSession(engine) as session:
+            await run(PropertyRepository(session, None))
+        return await explain(engine, statements)
+    finally:
+        await engine.dispose()
+
+
+async def explain_statements(stmts: list[Executable]) -> dict[str, list[str]]:
+    """
+    `explain_repository_queries` of statements compiled without running
+    them, for statements that write
+    """
+    engine = create_async_engine(Settings.DATABASE_URL)
+    statements = []
+    for stmt in stmts:
+        compiled = stmt.compile(dialect=engine.dialect)
+        statements.append((str(compiled), tuple(
+            compiled.params[name] for name in compiled.positiontup)))
+    try:
+        return await explain(engine, statements)
+    finally:
+        await engine.dispose()
+
+
+async def explain(engine: AsyncEngine, statements: list[tuple]) -> dict[str, list[str]]:
+    """
+    EXPLAINs `(statement, parameters)` with sequential scans disabled,
+    without executing them. Returns statements mapped to the offending tables.
+    """
+    offenders = {}
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            tables = seq_scans(plan[0]["Plan"])
+            if tables:
+                offenders[statement] = tables
+    return offenders
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", SEARCHES)
+async def test_search_queries_use_indexes(params):
+    async def run(repository: PropertyRepository):
+        schema = SearchPropertySchema(**params)
+        filters = schema.get_filters()
+        await repository.get_properties_page(10, 0, filters, schema.sort)
+        await repository.get_properties_page_counted(10, 20, filters, schema.sort)
+        await repository.get_properties_count_filtered(filters)
+        await repository.get_map_locations(filters)
+
+    offenders = await explain_repository_queries(run)
+    assert not offenders, offenders
+
+
+@pytest.mark.asyncio
+async def test_page_queries_use_indexes():
+    async def run(repository: PropertyRepository):
+        await repository.get_popular_ids(10, 0)
+        await repository.get_properties_page_by_counted(
+            10, 0, owner_id=1, is_active=True, is_sold=False, approved=True)
+        rows = await repository.get_favorites_keys(1, 1)
+        if rows:
+            await repository.get_favorites_keys(
+                1, 10, next_likes_cursor(rows, 1))
+        await repository.get_favorites_count(1)
+        await repository.get_favorites_ids(1)
+        await repository.get_like(1, 1)
+        await repository.get_listings_page_counted(10, 0)
+        await repository.count_property_images(1)
+
+    offenders = await explain_repository_queries(run)
+    assert not offenders, offenders
+
+
+@pytest.mark.asyncio
+async def test_record_queries_use_indexes():
+    async def run(repository: PropertyRepository):
+        page = await repository.get_properties_page(1, 0, [])
+        if page:
+            await repository.get_or_404(page[0].id)
+            await repository.get_detail(page[0].id)
+            await repository.get_detail_version(page[0].id)
+            await repository.get_versions([prop.id for prop in page])
+        await repository.get_listing_versions([1])
+
+    offenders = await explain_repository_queries(run)
+    assert not offenders, offenders
+
+
+@pytest.mark.asyncio
+async def test_spatial_queries_use_indexes():
+    async def run(repository: PropertyRepository):
+        await repository.get_nearest([], 35.2, 33.4, 10, 50)
+        await repository.get_map_points([], (33.3, 35.1, 33.5, 35.3))
+        await repository.get_at_location(35.2, 33.4)
+
+    offenders = await explain_repository_queries(run)
+    assert not offenders, offenders
+
+
+@pytest.mark.asyncio
+async def test_like_queries_use_indexes():
+    # Toggle, like and unlike, explained without changing any like
+    offenders = await explain_statements([
+        PropertyRepository._like_stmt(1, 1, add, remove)
+        for add, remove in ((True, True), (True, False), (False, True))
+    ])
+    assert not offenders, offenders
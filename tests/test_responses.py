@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from src.base.responses import etag_matches, not_modified, version_headers
+
+VERSIONS = [(1, datetime(2026, 10, 18, 9, 30)), (2, datetime(2026, 10, 18, 11, 5))]
+
+
+def test_version_headers_tag_versions_in_order_and_variant():
+    headers = version_headers(VERSIONS, "price")
+    assert headers["Last-Modified"] == "Sun, 18 Oct 2026 11:05:00 GMT"
+    assert headers["ETag"] == version_headers(VERSIONS, "price")["ETag"]
+    assert headers["ETag"] != version_headers(VERSIONS[::-1], "price")["ETag"]
+    assert headers["ETag"] != version_headers(VERSIONS, None)["ETag"]
+    touched = [VERSIONS[0], (2, datetime(2026, 10, 18, 11, 6))]
+    assert headers["ETag"] != version_headers(touched, "price")["ETag"]
+
+
+def test_etag_matches_any_listed_tag_weakly():
+    etag = version_headers(VERSIONS)["ETag"]
+    assert etag_matches(etag, f'"other", W/{etag}')
+    assert etag_matches(etag, "*")
+    assert not etag_matches(etag, '"other"')
+    assert not etag_matches(etag, None)
+
+
+def test_not_modified_has_no_body():
+    response = not_modified(version_headers(VERSIONS))
+    assert response.status_code == 304
+    assert response.body == b""
+    assert "etag" in response.headers
@@ -0,0 +1,19 @@
+from sqlalchemy.dialects import postgresql
+
+from src.property.views import add_views_stmts, record_batch_stmt
+
+
+def test_add_views_is_one_update_per_table():
+    stmts = add_views_stmts({5: 2, 1: 7})
+    assert len(stmts) == 2
+    for stmt in stmts:
+        sql = str(stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert sql.startswith("UPDATE")
+        assert "FROM (VALUES (1, 7), (5, 2)) AS pending (id, views)" in sql
+
+
+def test_batch_is_recorded_once():
+    sql = str(record_batch_stmt("abc").compile(dialect=postgresql.dialect()))
+    assert 'INSERT INTO "ViewBatchModel"' in sql
+    assert "ON CONFLICT (batch_id) DO NOTHING RETURNING" in sql